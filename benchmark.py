@@ -0,0 +1,832 @@
+import argparse
+import copy
+import itertools
+import os
+import random
+import time
+
+import numpy as np
+
+from gamestate import GameState
+from hand_counts import NUM_TILE_TYPES, NUM_RANKED_TYPES, SET, RUN, PAIR
+from scoring import COLOR_INDICES, DIRECTION_TO_INDEX
+from reference_rules import reference_compute_reward
+from shanten import shanten
+from tile_utils import is_set, is_run, is_winning_hand
+
+
+def legacy_is_winning_hand(gamestate: GameState, player: str):
+    '''
+    Original brute force implementation of tile_utils.is_winning_hand, kept as a reference for benchmarking
+    '''
+    gamestate.sort_player_hand(player)
+    player_hand = copy.deepcopy(gamestate.players[player])
+
+    groups = list(itertools.combinations(player_hand, 3))
+    valid_groups = []
+    for group in groups:
+        if is_set(group[0], group[1], group[2]):
+            valid_groups.append(group)
+        elif is_run(group[0], group[1], group[2]):
+            valid_groups.append(group)
+
+    if len(valid_groups) < 4:
+        return False, None
+
+    for grouped_hand in itertools.combinations(valid_groups, 4):
+        player_hand = copy.deepcopy(gamestate.players[player])
+        win_possible = True
+        for tile in [tile for group in grouped_hand for tile in group]:
+            if tile in player_hand:
+                player_hand.remove(tile)
+            else:
+                win_possible = False
+                break
+
+        if win_possible and is_set(player_hand[0], player_hand[1]):
+            return True, grouped_hand + ((player_hand[0], player_hand[1]),)
+
+    return False, None
+
+
+def random_gamestates(num_hands: int, seed: int) -> list[GameState]:
+    '''
+    Deals random 14-tile hands to 'player1' of num_hands separate games
+    '''
+    random.seed(seed)
+    gamestates = []
+    for _ in range(num_hands):
+        gamestate = GameState()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+        gamestates.append(gamestate)
+    return gamestates
+
+
+def time_per_call(func, gamestates: list[GameState], player: str) -> float:
+    '''
+    Returns the average time in seconds of func(gamestate, player) over all gamestates
+    '''
+    start_time = time.perf_counter()
+    for gamestate in gamestates:
+        func(gamestate, player)
+    return (time.perf_counter() - start_time) / len(gamestates)
+
+
+def bench_win(args) -> None:
+    '''
+    Compares the count-vector win detector against the original brute force search on random 14-tile hands
+    '''
+    gamestates = random_gamestates(args.num_hands, args.seed)
+
+    for gamestate in gamestates:
+        legacy_result, _ = legacy_is_winning_hand(gamestate, 'player1')
+        result, _ = is_winning_hand(gamestate, 'player1')
+        if legacy_result != result:
+            raise RuntimeError(f"Mismatch for hand {gamestate.players['player1']}")
+
+    legacy_time = time_per_call(legacy_is_winning_hand, gamestates, 'player1')
+    new_time = time_per_call(is_winning_hand, gamestates, 'player1')
+
+    print(f"Random 14-tile hands: {args.num_hands}")
+    print(f"Brute force is_winning_hand: {legacy_time * 1e6:.1f} us/hand")
+    print(f"Count-vector is_winning_hand: {new_time * 1e6:.1f} us/hand")
+    print(f"Speedup: {legacy_time / new_time:.1f}x")
+
+
+def random_counts(num_hands: int, hand_sizes: tuple[int, ...], seed: int) -> list[list[int]]:
+    '''
+    Draws num_hands random hands from a full set of 136 tiles as 34-slot count vectors
+    '''
+    rng = random.Random(seed)
+    wall = [index for index in range(NUM_TILE_TYPES) for _ in range(4)]
+    hands = []
+    for _ in range(num_hands):
+        counts = [0] * NUM_TILE_TYPES
+        for index in rng.sample(wall, rng.choice(hand_sizes)):
+            counts[index] += 1
+        hands.append(counts)
+    return hands
+
+
+def bench_shanten(args) -> None:
+    '''
+    Measures single-core shanten throughput on random 13-tile and 14-tile hands
+    '''
+    hands = random_counts(args.num_hands, (13, 14), args.seed)
+
+    start_time = time.perf_counter()
+    for counts in hands:
+        shanten(counts)
+    cold_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for counts in hands:
+        shanten(counts)
+    warm_time = time.perf_counter() - start_time
+
+    print(f"Random 13/14-tile hands: {args.num_hands}")
+    print(f"Cold caches: {args.num_hands / cold_time:,.0f} hands/s")
+    print(f"Warm caches: {args.num_hands / warm_time:,.0f} hands/s ({warm_time / args.num_hands * 1e6:.2f} us/hand)")
+
+
+def bench_clone(args) -> None:
+    '''
+    Compares GameState.clone and snapshot/restore against copy.deepcopy on freshly dealt games
+    '''
+    gamestates = random_gamestates(args.num_hands, args.seed)
+
+    for gamestate in gamestates:
+        if vars(gamestate.clone()).keys() != vars(copy.deepcopy(gamestate)).keys():
+            raise RuntimeError("GameState.clone does not copy every instance attribute")
+
+    start_time = time.perf_counter()
+    for gamestate in gamestates:
+        copy.deepcopy(gamestate)
+    deepcopy_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    start_time = time.perf_counter()
+    for gamestate in gamestates:
+        gamestate.clone()
+    clone_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    snapshots = [gamestate.snapshot() for gamestate in gamestates]
+    start_time = time.perf_counter()
+    for gamestate in gamestates:
+        gamestate.snapshot()
+    snapshot_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    start_time = time.perf_counter()
+    for gamestate, snapshot in zip(gamestates, snapshots):
+        gamestate.restore(snapshot)
+    restore_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    print(f"Dealt games: {args.num_hands}")
+    print(f"copy.deepcopy: {deepcopy_time * 1e6:.1f} us/game")
+    print(f"GameState.clone: {clone_time * 1e6:.1f} us/game ({deepcopy_time / clone_time:.0f}x faster)")
+    print(f"GameState.snapshot: {snapshot_time * 1e6:.1f} us/game")
+    print(f"GameState.restore: {restore_time * 1e6:.1f} us/game")
+
+
+def bench_env(args) -> None:
+    '''
+    Compares rollout throughput of DummyVecEnv(MahjongEnv) against VecMahjongEnv with random actions
+    '''
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from gamestate_env import MahjongEnv
+    from vec_gamestate_env import VecMahjongEnv
+
+    rng = np.random.default_rng(args.seed)
+    num_steps = max(args.num_hands // 10, 1)
+
+    env = DummyVecEnv([lambda: MahjongEnv()])
+    env.seed(args.seed)
+    env.reset()
+    start_time = time.perf_counter()
+    for _ in range(num_steps):
+        env.step(rng.integers(0, 14, size=1))
+    single_rate = num_steps / (time.perf_counter() - start_time)
+
+    print(f"DummyVecEnv(MahjongEnv): {single_rate:,.0f} steps/s")
+    for num_envs in (64, 1024):
+        env = VecMahjongEnv(num_envs=num_envs, seed=args.seed)
+        env.reset()
+        start_time = time.perf_counter()
+        for _ in range(num_steps):
+            env.step(rng.integers(0, 14, size=num_envs))
+        rate = num_steps * num_envs / (time.perf_counter() - start_time)
+        print(f"VecMahjongEnv({num_envs} games): {rate:,.0f} steps/s ({rate / single_rate:.0f}x)")
+
+
+def bench_env_obs(args) -> None:
+    '''
+    Compares MahjongEnv's incrementally patched observations against encoding every observation in full
+    '''
+    from gamestate_env import MahjongEnv
+    from preprocessing import encode_observation
+
+    class FullObsEnv(MahjongEnv):
+        def _get_obs(self):
+            return encode_observation(self.state, self.player)
+
+    num_steps = max(args.num_hands, 1)
+    results = {}
+    for name, env_class in (('Full encode_observation', FullObsEnv), ('Incremental MahjongEnv._get_obs', MahjongEnv)):
+        random.seed(args.seed)
+        env = env_class()
+        env.reset()
+
+        # Time only the observation calls
+        obs_time = 0.0
+        get_obs = env._get_obs
+        def timed_get_obs():
+            nonlocal obs_time
+            start_time = time.perf_counter()
+            observation = get_obs()
+            obs_time += time.perf_counter() - start_time
+            return observation
+        env._get_obs = timed_get_obs
+
+        for _ in range(num_steps):
+            _, _, terminated, truncated, _ = env.step(random.randrange(14))
+            if terminated or truncated:
+                env.reset()
+        results[name] = obs_time / num_steps
+
+    full_time = results['Full encode_observation']
+    print(f"Steps: {num_steps}")
+    for name, obs_time in results.items():
+        print(f"{name}: {obs_time * 1e6:.1f} us/observation ({full_time / obs_time:.1f}x)")
+
+
+def bench_reward(args) -> None:
+    '''
+    Compares the count-vector discard reward against the original triple-enumerating reward,
+    per call and in MahjongEnv steps per second
+    '''
+    from gamestate_env import MahjongEnv
+    from rewards import discard_reward
+
+    gamestates = random_gamestates(args.num_hands, args.seed)
+    actions = [random.randrange(14) for _ in gamestates]
+    for gamestate, action in zip(gamestates, actions):
+        legacy_reward = reference_compute_reward(gamestate, 'player1', action)
+        reward = discard_reward(gamestate.hand_counts['player1'], gamestate.discard_counts, gamestate.players['player1'][action].id)
+        if abs(legacy_reward - reward) > 1e-9:
+            raise RuntimeError(f"Reward mismatch for hand {gamestate.players['player1']} and action {action}")
+
+    start_time = time.perf_counter()
+    for gamestate, action in zip(gamestates, actions):
+        reference_compute_reward(gamestate, 'player1', action)
+    legacy_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    start_time = time.perf_counter()
+    for gamestate, action in zip(gamestates, actions):
+        discard_reward(gamestate.hand_counts['player1'], gamestate.discard_counts, gamestate.players['player1'][action].id)
+    new_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    class LegacyRewardEnv(MahjongEnv):
+        def _compute_reward(self, action, player, info):
+            return reference_compute_reward(self.state, player, action), {}
+
+    num_steps = max(args.num_hands // 4, 1)
+    rates = []
+    for env_class in (LegacyRewardEnv, MahjongEnv):
+        random.seed(args.seed)
+        env = env_class()
+        env.reset()
+        start_time = time.perf_counter()
+        for _ in range(num_steps):
+            _, _, terminated, truncated, _ = env.step(random.randrange(14))
+            if terminated or truncated:
+                env.reset()
+        rates.append(num_steps / (time.perf_counter() - start_time))
+
+    print(f"Random 14-tile hands: {args.num_hands}")
+    print(f"Original _compute_reward: {legacy_time * 1e6:.1f} us/call")
+    print(f"rewards.discard_reward: {new_time * 1e6:.2f} us/call ({legacy_time / new_time:.0f}x)")
+    print(f"MahjongEnv with the original reward: {rates[0]:,.0f} steps/s")
+    print(f"MahjongEnv with rewards.discard_reward: {rates[1]:,.0f} steps/s ({rates[1] / rates[0]:.1f}x)")
+
+
+def legacy_opponent_turns(gamestate: GameState) -> None:
+    '''
+    Original MahjongEnv opponent turns: a full is_winning_hand after every draw and a shuffle of the hand to discard
+    '''
+    for player in ['player2', 'player3', 'player4']:
+        draw_tile = gamestate.draw_pool[0]
+        gamestate.add_tile_to_hand(draw_tile, player)
+        gamestate.remove_tile_from_draw_pool(draw_tile)
+        is_winning, _ = is_winning_hand(gamestate, player)
+        if is_winning:
+            break
+        random.shuffle(gamestate.players[player])
+        discard_tile = gamestate.players[player][0]
+        gamestate.remove_tile_from_hand(discard_tile, player)
+        gamestate.add_tile_to_discard_pool(discard_tile)
+
+
+def bench_opponents(args) -> None:
+    '''
+    Compares MahjongEnv's opponent turns (wait-set win check and pluggable policies) against the original
+    per-player is_winning_hand and shuffle, over the three opponent turns following player1's first discard
+    '''
+    from opponents import RandomOpponent, ShantenOpponent
+    from suit_table import waiting_tiles
+
+    gamestates = random_gamestates(args.num_hands, args.seed)
+    for gamestate in gamestates:
+        discard_tile = gamestate.players['player1'][0]
+        gamestate.remove_tile_from_hand(discard_tile, 'player1')
+        gamestate.add_tile_to_discard_pool(discard_tile)
+    players = ('player2', 'player3', 'player4')
+
+    def opponent_turns(gamestate, opponent, waits):
+        for player in players:
+            draw_tile = gamestate.draw_tile(player)
+            if draw_tile.id in waits[player]:
+                break
+            discard_tile = gamestate.players[player][opponent.choose_discard(gamestate, player)]
+            gamestate.remove_tile_from_hand(discard_tile, player)
+            gamestate.add_tile_to_discard_pool(discard_tile)
+            waits[player] = waiting_tiles(gamestate.hand_counts[player])
+
+    clones = [gamestate.clone() for gamestate in gamestates]
+    start_time = time.perf_counter()
+    for gamestate in clones:
+        legacy_opponent_turns(gamestate)
+    legacy_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    times = {}
+    for name, opponent in (('RandomOpponent', RandomOpponent()), ('ShantenOpponent', ShantenOpponent())):
+        clones = [gamestate.clone() for gamestate in gamestates]
+        waits = [{player: waiting_tiles(gamestate.hand_counts[player]) for player in players} for gamestate in clones]
+        start_time = time.perf_counter()
+        for gamestate, game_waits in zip(clones, waits):
+            opponent_turns(gamestate, opponent, game_waits)
+        times[name] = (time.perf_counter() - start_time) / len(gamestates)
+
+    print(f"Games: {args.num_hands}")
+    print(f"Original opponent turns: {legacy_time * 1e6:.1f} us/step")
+    for name, new_time in times.items():
+        print(f"{name} turns: {new_time * 1e6:.1f} us/step ({legacy_time / new_time:.1f}x)")
+
+
+def legacy_save_winner_data(conn, game_id, winner_history, player, score) -> None:
+    '''
+    Original implementation of training_data_utils.save_winner_data (one INSERT per turn), kept as a reference for benchmarking
+    '''
+    cursor = conn.cursor()
+    for turn, gamestate_tensor in enumerate(winner_history):
+        gamestate_blob = gamestate_tensor.numpy().tobytes()
+        cursor.execute("INSERT INTO winner_history (game_id, player, turn, gamestate_tensor, final_score) VALUES (?, ?, ?, ?, ?)",
+                       (game_id, player, turn, gamestate_blob, score))
+    conn.commit()
+
+
+def bench_db_write(args) -> None:
+    '''
+    Compares per-game INSERT/commit with the default journal against the buffered WAL-mode WinnerHistoryWriter
+    '''
+    import sqlite3
+    import tempfile
+    import torch
+    from training_data_utils import configure_connection, create_winner_history_table, WinnerHistoryWriter
+
+    # Random one-hot-like histories of 20 turns, the length of a typical winning game
+    rng = np.random.default_rng(args.seed)
+    histories = [torch.from_numpy((rng.random((20, 1851)) < 0.05).astype(np.float32)) for _ in range(args.num_hands)]
+    num_rows = sum(len(history) for history in histories)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = sqlite3.connect(os.path.join(tmp_dir, 'legacy.db'))
+        create_winner_history_table(conn)
+        start_time = time.perf_counter()
+        for game_id, history in enumerate(histories):
+            legacy_save_winner_data(conn, game_id, history, 'player1', 4)
+        legacy_rate = num_rows / (time.perf_counter() - start_time)
+        conn.close()
+
+        conn = sqlite3.connect(os.path.join(tmp_dir, 'writer.db'))
+        configure_connection(conn)
+        create_winner_history_table(conn)
+        start_time = time.perf_counter()
+        with WinnerHistoryWriter(conn) as writer:
+            for game_id, history in enumerate(histories):
+                writer.add(game_id, history, 'player1', 4)
+        writer_rate = num_rows / (time.perf_counter() - start_time)
+        conn.close()
+
+    print(f"Winning games: {args.num_hands} ({num_rows} rows)")
+    print(f"save_winner_data, default journal: {legacy_rate:,.0f} rows/s")
+    print(f"WinnerHistoryWriter, WAL: {writer_rate:,.0f} rows/s ({writer_rate / legacy_rate:.1f}x)")
+
+
+def legacy_load_training_data(conn, decay=0.95):
+    '''
+    Original implementation of training_data_utils.load_training_data (fetchall, a COUNT query per game,
+    and torch.stack), kept as a reference for benchmarking
+    '''
+    import torch
+    from training_data_utils import decode_gamestate
+
+    cursor = conn.cursor()
+    cursor.execute('SELECT game_id, turn, gamestate_tensor, final_score FROM winner_history ORDER BY game_id, turn')
+    rows = cursor.fetchall()
+
+    data = []
+    targets = []
+    current_game_id = None
+    turn_count = 0
+    for game_id, turn, tensor_blob, final_score in rows:
+        if game_id != current_game_id:
+            current_game_id = game_id
+            turn_count = cursor.execute('SELECT COUNT(*) FROM winner_history WHERE game_id = ?', (game_id,)).fetchone()[0]
+        data.append(decode_gamestate(tensor_blob))
+        targets.append(final_score * (decay ** (turn_count - turn - 1)))
+
+    return torch.stack(data), torch.tensor(targets, dtype=torch.float32)
+
+
+def bench_load(args) -> None:
+    '''
+    Compares the original load_training_data against the single-query streaming loader on a bit-packed database
+    '''
+    import sqlite3
+    import tempfile
+    import torch
+    from training_data_utils import create_winner_history_table, load_training_data, WinnerHistoryWriter
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'load.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE winner_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, game_id INTEGER, player TEXT, turn INTEGER,
+                gamestate_tensor BLOB, final_score INTEGER
+            )
+        ''')
+        with WinnerHistoryWriter(conn) as writer:
+            for game_id in range(args.num_hands):
+                history = torch.from_numpy((rng.random((20, 1851)) < 0.05).astype(np.float32))
+                writer.add(game_id, history, 'player1', 4)
+        num_rows = args.num_hands * 20
+
+        # The legacy loader runs against the table without the (game_id, turn) index
+        start_time = time.perf_counter()
+        legacy_data, legacy_targets = legacy_load_training_data(conn)
+        legacy_time = time.perf_counter() - start_time
+
+        create_winner_history_table(conn)
+        start_time = time.perf_counter()
+        data, targets = load_training_data(conn)
+        new_time = time.perf_counter() - start_time
+        conn.close()
+
+    if not (torch.equal(data, legacy_data) and torch.allclose(targets, legacy_targets)):
+        raise RuntimeError("Streaming loader does not match the original loader")
+
+    print(f"Winning games: {args.num_hands} ({num_rows} rows)")
+    print(f"Original load_training_data: {num_rows / legacy_time:,.0f} rows/s")
+    print(f"Streaming load_training_data: {num_rows / new_time:,.0f} rows/s ({legacy_time / new_time:.1f}x)")
+
+
+def legacy_prepare_input(gamestate: GameState, player: str):
+    '''
+    Original prepare_input: encodes every tile separately and stacks the parts with torch.hstack
+    '''
+    import torch
+    from preprocessing import TILE_ENCODING_LEN, encode_tile, encode_tile_batch, encode_macro_direction, encode_micro_direction
+
+    tiles_in_hand_tensor = encode_tile_batch(gamestate, gamestate.players[player])
+    if len(gamestate.discard_pool) == 0:
+        tiles_in_discard_pool_tensor = torch.empty(0)
+    elif len(gamestate.discard_pool) == 1:
+        tiles_in_discard_pool_tensor = torch.from_numpy(encode_tile(gamestate, gamestate.discard_pool[0])).float()
+    else:
+        tiles_in_discard_pool_tensor = encode_tile_batch(gamestate, gamestate.discard_pool)
+    tiles_in_draw_pool_tensor = torch.zeros(len(gamestate.draw_pool) * TILE_ENCODING_LEN)
+    return torch.hstack((tiles_in_hand_tensor, tiles_in_discard_pool_tensor, tiles_in_draw_pool_tensor,
+                         encode_macro_direction(gamestate), encode_micro_direction(gamestate)))
+
+
+def bench_prepare_input(args) -> None:
+    '''
+    Compares the lookup-table observation encoders (one at a time and batched) against the original per-tile prepare_input
+    on games part of the way through (random discards by player1 after each draw)
+    '''
+    import torch
+    from preprocessing import encode_observation, prepare_input, prepare_input_batch
+
+    gamestates = random_gamestates(args.num_hands, args.seed)
+    rng = random.Random(args.seed)
+    for gamestate in gamestates:
+        gamestate.randomize_macro_direction(rng)
+        gamestate.randomize_micro_direction(rng)
+        for _ in range(rng.randint(0, 60)):
+            hand = gamestate.players['player1']
+            tile = hand[rng.randrange(len(hand))]
+            gamestate.add_tile_to_discard_pool(tile)
+            gamestate.remove_tile_from_hand(tile, 'player1')
+            gamestate.draw_tile('player1')
+
+    for gamestate in gamestates:
+        if not torch.equal(prepare_input(gamestate, 'player1'), legacy_prepare_input(gamestate, 'player1')):
+            raise RuntimeError("Lookup-table prepare_input does not match the original encoding")
+
+    legacy_time = time_per_call(legacy_prepare_input, gamestates, 'player1')
+    new_time = time_per_call(prepare_input, gamestates, 'player1')
+    int8_time = time_per_call(encode_observation, gamestates, 'player1')
+
+    buffer = np.empty(len(encode_observation(gamestates[0], 'player1')), dtype=np.int8)
+    start_time = time.perf_counter()
+    for gamestate in gamestates:
+        encode_observation(gamestate, 'player1', out=buffer)
+    buffer_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    # Games of player1 all hold 97 tiles between the hand and the pools, so they can be encoded in one batch
+    if not np.array_equal(prepare_input_batch(gamestates, 'player1'),
+                          np.stack([encode_observation(gamestate, 'player1') for gamestate in gamestates])):
+        raise RuntimeError("prepare_input_batch does not match encode_observation")
+    start_time = time.perf_counter()
+    prepare_input_batch(gamestates, 'player1')
+    batch_time = (time.perf_counter() - start_time) / len(gamestates)
+
+    print(f"Games: {args.num_hands}")
+    print(f"Original prepare_input: {legacy_time * 1e6:.1f} us/observation")
+    print(f"Lookup-table prepare_input (float32 tensor): {new_time * 1e6:.1f} us/observation ({legacy_time / new_time:.0f}x)")
+    print(f"encode_observation (int8 array): {int8_time * 1e6:.1f} us/observation ({legacy_time / int8_time:.0f}x)")
+    print(f"encode_observation into a reused buffer: {buffer_time * 1e6:.1f} us/observation ({legacy_time / buffer_time:.0f}x)")
+    print(f"prepare_input_batch (int8 array): {batch_time * 1e6:.1f} us/observation ({legacy_time / batch_time:.0f}x)")
+
+
+def bench_logging(args) -> None:
+    '''
+    Compares MahjongEnv step time with the default logging configuration (gamestate_env logs every step at debug
+    level) against the 'performance' logging mode
+    '''
+    import tempfile
+    import logging_config
+    from gamestate_env import MahjongEnv
+
+    num_steps = max(args.num_hands, 1)
+    original_mode = logging_config.get_logging_mode()
+    original_log_dir = logging_config.LOG_DIR
+    results = {}
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Write the benchmark's logs outside of logs/
+        logging_config.LOG_DIR = log_dir
+        try:
+            for mode in ('default', 'performance'):
+                logging_config.configure_logging(mode)
+                random.seed(args.seed)
+                env = MahjongEnv()
+                env.reset()
+                start_time = time.perf_counter()
+                for _ in range(num_steps):
+                    _, _, terminated, truncated, _ = env.step(random.randrange(14))
+                    if terminated or truncated:
+                        env.reset()
+                results[mode] = (time.perf_counter() - start_time) / num_steps
+        finally:
+            logging_config.LOG_DIR = original_log_dir
+            logging_config.configure_logging(original_mode)
+
+    performance_time = results['performance']
+    print(f"Steps: {num_steps}")
+    for mode, step_time in results.items():
+        print(f"Logging mode '{mode}': {step_time * 1e6:.1f} us/step "
+              f"(logging overhead {(step_time - performance_time) * 1e6:.1f} us/step)")
+
+
+def import_time(statement: str, repeats: int) -> tuple[float, list[str]]:
+    '''
+    Runs a statement in fresh interpreters with python -X importtime and returns the lowest total import time in
+    seconds, with the heavy packages it loaded
+    '''
+    import subprocess
+    import sys
+
+    heavy = ('torch', 'gymnasium', 'stable_baselines3', 'numpy')
+    code = f"import sys; {statement}; print(','.join(name for name in {heavy!r} if name in sys.modules))"
+    best_time = None
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        # Sum the cumulative times of the top-level imports (nested imports are indented)
+        total = 0
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+                if not fields[2][1:].startswith(' '):
+                    total += int(fields[1])
+        if best_time is None or total < best_time:
+            best_time = total
+        loaded = [name for name in result.stdout.strip().split(',') if name]
+    return best_time / 1e6, loaded
+
+
+def bench_startup(args) -> None:
+    '''
+    Reports the import time of the game modules in fresh interpreters (python -X importtime), next to the same
+    imports with torch loaded eagerly and logging.handlers imported, as preprocessing and every module's
+    logging setup used to do
+    '''
+    repeats = 5
+    cases = (
+        ('tile_utils', 'import tile_utils'),
+        ('player_utils', 'import player_utils'),
+        ('preprocessing', 'import preprocessing'),
+        ('opponents', 'import opponents'),
+        ('gamestate_env', 'import gamestate_env'),
+    )
+    print(f"Best of {repeats} runs")
+    for name, statement in cases:
+        lazy_time, loaded = import_time(statement, repeats)
+        eager_statement = 'import logging.handlers; ' + statement
+        if name in ('preprocessing', 'opponents', 'gamestate_env'):
+            eager_statement = 'import torch; ' + eager_statement
+        eager_time, _ = import_time(eager_statement, repeats)
+        print(f"{name}: {lazy_time * 1e3:.0f} ms (eager imports: {eager_time * 1e3:.0f} ms, "
+              f"{eager_time / lazy_time:.1f}x), loads {', '.join(loaded) or 'no heavy packages'}")
+
+
+def legacy_score_decomposition(groups: tuple[int, ...], macro_direction: str, micro_direction: str) -> int:
+    '''
+    scoring.score_decomposition before the lookup tables, walking the groups once per rule
+    '''
+    kinds = []
+    indices = []
+    double_index = None
+    for group in groups:
+        kind, index = divmod(group, NUM_TILE_TYPES)
+        if kind == PAIR:
+            double_index = index
+        else:
+            kinds.append(kind)
+            indices.append(index)
+
+    if double_index >= NUM_RANKED_TYPES:
+        return 2
+
+    score = 2
+    suit = double_index // 9
+    if all(index // 9 == suit for index in indices if index < NUM_RANKED_TYPES):
+        score += 3
+
+    ranked_kinds = [kind for kind, index in zip(kinds, indices) if index < NUM_RANKED_TYPES]
+    if ranked_kinds:
+        if all(kind != RUN for kind in ranked_kinds):
+            score += 3
+        elif all(kind == RUN for kind in ranked_kinds):
+            score += 1
+
+    score += sum(index in COLOR_INDICES for index in indices)
+    if DIRECTION_TO_INDEX[macro_direction] in indices:
+        score += 1
+    if DIRECTION_TO_INDEX[micro_direction] in indices:
+        score += 1
+    return score
+
+
+def bench_score(args) -> None:
+    '''
+    Compares table-based scoring (one decomposition at a time and batched) against walking the groups once per rule,
+    and compute_score against scoring through best_grouped_hand on random 14-tile hands
+    '''
+    from scoring import score_decomposition, score_decompositions, DIRECTIONS
+    from suit_table import enumerate_decompositions
+    from tile_utils import best_grouped_hand, compute_score
+
+    # Random winning hands: four sets/runs and a double
+    rng = random.Random(args.seed)
+    decompositions = []
+    while len(decompositions) < args.num_hands:
+        counts = [0] * NUM_TILE_TYPES
+        for _ in range(4):
+            low = rng.randrange(NUM_TILE_TYPES)
+            if low < 27 and low % 9 <= 6 and rng.random() < 0.5:
+                for index in range(low, low + 3):
+                    counts[index] += 1
+            else:
+                counts[low] += 3
+        counts[rng.randrange(NUM_TILE_TYPES)] += 2
+        if max(counts) <= 4:
+            directions = (rng.choice(DIRECTIONS), rng.choice(DIRECTIONS))
+            decompositions.extend((groups,) + directions for groups in enumerate_decompositions(counts))
+
+    for decomposition in decompositions:
+        if score_decomposition(*decomposition) != legacy_score_decomposition(*decomposition):
+            raise RuntimeError(f"Mismatch for decomposition {decomposition}")
+
+    results = {}
+    for name, func in (('Per-rule score_decomposition', legacy_score_decomposition),
+                       ('Table score_decomposition', score_decomposition)):
+        start_time = time.perf_counter()
+        for decomposition in decompositions:
+            func(*decomposition)
+        results[name] = (time.perf_counter() - start_time) / len(decompositions)
+
+    groups = np.array([groups for groups, _, _ in decompositions])
+    macro_directions = np.array([DIRECTIONS.index(macro_direction) for _, macro_direction, _ in decompositions])
+    micro_directions = np.array([DIRECTIONS.index(micro_direction) for _, _, micro_direction in decompositions])
+    score_decompositions(groups, macro_directions, micro_directions)
+    start_time = time.perf_counter()
+    scores = score_decompositions(groups, macro_directions, micro_directions)
+    results['Batched score_decompositions'] = (time.perf_counter() - start_time) / len(decompositions)
+    if scores.tolist() != [score_decomposition(*decomposition) for decomposition in decompositions]:
+        raise RuntimeError("Batched scores differ from score_decomposition")
+
+    legacy_time = results['Per-rule score_decomposition']
+    print(f"Winning decompositions: {len(decompositions)}")
+    for name, score_time in results.items():
+        print(f"{name}: {score_time * 1e9:.0f} ns/hand ({legacy_time / score_time:.1f}x)")
+
+    # compute_score on every draw of generate_training_data is mostly called on hands that are not winning
+    gamestates = random_gamestates(args.num_hands, args.seed)
+    grouped_time = time_per_call(lambda gamestate, player: best_grouped_hand(gamestate, player)[0], gamestates, 'player1')
+    score_time = time_per_call(compute_score, gamestates, 'player1')
+    print(f"Random 14-tile hands: {len(gamestates)}")
+    print(f"Score through best_grouped_hand: {grouped_time * 1e6:.2f} us/hand")
+    print(f"compute_score: {score_time * 1e6:.2f} us/hand ({grouped_time / score_time:.1f}x)")
+
+
+def bench_hand_cache(args) -> None:
+    '''
+    Compares scoring every hand of random self-play rounds directly against looking the hands up in a HandCache,
+    on the first pass over the rounds and on a replay of the same rounds, and on hands that can all be winning hands
+    '''
+    from generate_training_data import round_rng
+    from hand_cache import HandCache
+    from scoring import best_decomposition
+
+    # Every hand scored by generate_training_data.play_round, as (counts, macro direction, micro direction)
+    hands = []
+    num_rounds = max(args.num_hands // 50, 1)
+    for round_index in range(num_rounds):
+        rng = round_rng(args.seed, round_index)
+        gamestate = GameState()
+        gamestate.randomize_macro_direction(rng)
+        gamestate.randomize_micro_direction(rng)
+        gamestate.initialize_draw_pool(rng)
+        gamestate.deal_tiles()
+        player_index = 3
+        while len(gamestate.draw_pool) != 0:
+            player_index = (player_index + 1) % 4
+            player = f"player{player_index + 1}"
+            if len(gamestate.players[player]) < 14:
+                gamestate.draw_tile(player)
+            counts = gamestate.hand_counts[player][:]
+            hands.append((counts, gamestate.macro_direction[0], gamestate.micro_direction[player_index]))
+            score, _ = best_decomposition(counts, *hands[-1][1:])
+            discard_tile = gamestate.players[player][rng.randint(0, len(gamestate.players[player]) - 1)]
+            gamestate.add_tile_to_discard_pool(discard_tile)
+            gamestate.remove_tile_from_hand(discard_tile, player)
+            if score != 0:
+                break
+
+    # Winning hands, which every lookup has to enumerate and score, drawn from a small pool so that they repeat
+    rng = random.Random(args.seed)
+    winning_hands = []
+    while len(winning_hands) < 500:
+        counts = [0] * NUM_TILE_TYPES
+        for _ in range(4):
+            low = rng.randrange(NUM_TILE_TYPES)
+            if low < 27 and low % 9 <= 6 and rng.random() < 0.5:
+                for index in range(low, low + 3):
+                    counts[index] += 1
+            else:
+                counts[low] += 3
+        counts[rng.randrange(NUM_TILE_TYPES)] += 2
+        if max(counts) <= 4:
+            winning_hands.append((counts, rng.choice(GameState.directions), rng.choice(GameState.directions)))
+    winning_hands = [rng.choice(winning_hands) for _ in range(len(hands))]
+
+    for name, hand_set in ((f"Self-play hands ({num_rounds} rounds)", hands), ("Repeated winning hands", winning_hands)):
+        start_time = time.perf_counter()
+        for counts, macro_direction, micro_direction in hand_set:
+            best_decomposition(counts, macro_direction, micro_direction)
+        direct_time = (time.perf_counter() - start_time) / len(hand_set)
+
+        print(f"{name}: {len(hand_set)}")
+        print(f"  best_decomposition: {direct_time * 1e6:.2f} us/hand")
+        cache = HandCache()
+        for pass_name in ('first pass', 'replay'):
+            cache.reset_stats()
+            start_time = time.perf_counter()
+            for counts, macro_direction, micro_direction in hand_set:
+                cache.lookup(counts, macro_direction, micro_direction)
+            cache_time = (time.perf_counter() - start_time) / len(hand_set)
+            stats = cache.stats()
+            print(f"  HandCache, {pass_name}: {cache_time * 1e6:.2f} us/hand ({direct_time / cache_time:.1f}x), "
+                  f"{stats['rejects']} rejects, {stats['hits']} hits, {stats['misses']} misses")
+
+
+BENCHMARKS = {
+    'win': bench_win,
+    'shanten': bench_shanten,
+    'clone': bench_clone,
+    'env': bench_env,
+    'env_obs': bench_env_obs,
+    'reward': bench_reward,
+    'opponents': bench_opponents,
+    'db_write': bench_db_write,
+    'load': bench_load,
+    'prepare_input': bench_prepare_input,
+    'logging': bench_logging,
+    'startup': bench_startup,
+    'score': bench_score,
+    'hand_cache': bench_hand_cache,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the Mahjong game engine")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS), help="benchmark to run")
+    parser.add_argument('--num-hands', type=int, default=2000, help="number of random hands/games to use")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](args)
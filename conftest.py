@@ -0,0 +1,5 @@
+import os
+
+# Run the test suite with logging in performance mode (see logging_config), so tests do not write to logs/
+# Set MAHJONG_LOG_MODE=default to run them with file logging
+os.environ.setdefault('MAHJONG_LOG_MODE', 'performance')
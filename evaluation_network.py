@@ -1,10 +1,17 @@
 import torch
 import torch.nn as nn
 
+from preprocessing import OBS_LENGTH
+
 class EvaluationNet(nn.Module):
-    def __init__(self):
+    def __init__(self, input_size: int = OBS_LENGTH):
+        '''
+        Args:
+        input_size: number of values in an input observation, e.g. preprocessing.observation_length(encoding)
+        '''
         super(EvaluationNet, self).__init__()
-        self.fc1 = nn.Linear(1851, 1024)
+        self.input_size = input_size
+        self.fc1 = nn.Linear(input_size, 1024)
         self.fc2 = nn.Linear(1024, 512)
         self.fc3 = nn.Linear(512, 128)
         self.fc4 = nn.Linear(128, 1)
@@ -1,23 +1,110 @@
 import random
-from tile import Tile
+from array import array
+from tile import Tile, TILE_TYPES, PHYSICAL_TILES, NUM_COPIES, NUM_TILE_TYPES
 
 import random
 # random.seed(42)
 
-import logging
-from logging.handlers import RotatingFileHandler
-import os
+from logging_config import get_logger
 
 # Logging
-logger = logging.getLogger("gamestate_logger")
-logger.setLevel(logging.INFO)
+logger = get_logger("gamestate_logger", "gamestate_logging.log")
 
-log_file_path = "logs/gamestate_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
 
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+
+# Position of each tile id when a hand is sorted by suit name and then rank
+HAND_SORT_ORDER = [0] * NUM_TILE_TYPES
+for position, tile in enumerate(sorted(TILE_TYPES, key=lambda tile: (tile.suit, tile.rank or 0))):
+    HAND_SORT_ORDER[tile.id] = position
+
+
+class Wall:
+    '''
+    The draw pool, stored as an array of physical tile indices (tile id * NUM_COPIES + copy)
+    between a head and a tail cursor
+
+    Drawing from the front or the back of the wall only moves a cursor. The list operations used
+    on GameState.draw_pool (len, indexing, iteration, in, append, pop, remove) are supported.
+    '''
+    __slots__ = ('tiles', 'head', 'tail')
+
+    def __init__(self, tiles=()):
+        self.tiles = array('B', tiles)
+        self.head = 0
+        self.tail = len(self.tiles)
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    def _position(self, index: int) -> int:
+        if index < 0:
+            index += self.tail - self.head
+        if not 0 <= index < self.tail - self.head:
+            raise IndexError("draw pool index out of range")
+        return self.head + index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PHYSICAL_TILES[i] for i in self.tiles[self.head:self.tail][index]]
+        return PHYSICAL_TILES[self.tiles[self._position(index)]]
+
+    def __iter__(self):
+        for position in range(self.head, self.tail):
+            yield PHYSICAL_TILES[self.tiles[position]]
+
+    def __contains__(self, tile) -> bool:
+        return self._find(tile) is not None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def _find(self, tile):
+        # Tiles compare by tile type, so any copy of the type is a match
+        if not isinstance(tile, Tile):
+            return None
+        for position in range(self.head, self.tail):
+            if self.tiles[position] // NUM_COPIES == tile.id:
+                return position
+        return None
+
+    def append(self, tile: Tile) -> None:
+        if self.tail == len(self.tiles):
+            self.tiles.append(tile.id * NUM_COPIES + tile.copy)
+        else:
+            self.tiles[self.tail] = tile.id * NUM_COPIES + tile.copy
+        self.tail += 1
+
+    def pop(self, index: int = -1) -> Tile:
+        position = self._position(index)
+        tile = PHYSICAL_TILES[self.tiles[position]]
+        if position == self.head:
+            self.head += 1
+        elif position == self.tail - 1:
+            self.tail -= 1
+        else:
+            del self.tiles[position]
+            self.tail -= 1
+        return tile
+
+    def remove(self, tile: Tile) -> None:
+        if self.head < self.tail and self.tiles[self.head] // NUM_COPIES == tile.id:
+            self.head += 1
+            return
+        position = self._find(tile)
+        if position is None:
+            raise ValueError(f"Tile {tile} not found in draw_pool.")
+        self.pop(position - self.head)
+
+    def clear(self) -> None:
+        self.head = self.tail = 0
+        del self.tiles[:]
+
+    def copy(self) -> 'Wall':
+        wall = object.__new__(Wall)
+        wall.tiles = self.tiles[self.head:self.tail]
+        wall.head = 0
+        wall.tail = self.tail - self.head
+        return wall
 
 
 # Define GameState class to represent the state of the game
@@ -25,6 +112,29 @@ class GameState:
     '''
     A class to represent the state of a Mahjong game
     '''
+    # Static lookup tables, shared by every game instead of being rebuilt in __init__
+
+    # Define player as int
+    players_to_int = {
+        'player1': 0,
+        'player2': 1,
+        'player3': 2,
+        'player4': 3
+    }
+
+    # Define game suits and ranks for one-hot encoding of tiles
+    suits = ['stick', 'circle', '10k', 'red', 'green', 'white', 'east', 'south', 'west', 'north']
+    ranks = list(range(1, 10))
+    suit_to_idx = {suit: idx for idx, suit in enumerate(suits)}
+    idx_to_suit = {idx: suit for idx, suit in enumerate(suits)}
+    rank_to_idx = {rank: idx for idx, rank in enumerate(ranks)}
+    idx_to_rank = {idx: rank for idx, rank in enumerate(ranks)}
+
+    # Define one-hot encoding of directions
+    directions = ['east', 'south', 'west', 'north']
+    macro_direction_to_idx = {macro_direction: idx for idx, macro_direction in enumerate(directions)}
+    micro_direction_to_idx = {micro_direction: idx for idx, micro_direction in enumerate(directions)}
+
     def __init__(self):
         self.players = {
             'player1': [],
@@ -33,32 +143,70 @@ class GameState:
             'player4': []
         }
 
-        # Define player as int
-        self.players_to_int = {
-            'player1': 0,
-            'player2': 1,
-            'player3': 2,
-            'player4': 3
-        }
-
-        self.draw_pool = []
+        self.draw_pool = Wall()
         self.discard_pool = []
-        self.macro_direction = ['east', 'south', 'west', 'north']
-        self.micro_direction = ['east', 'south', 'west', 'north']
+
+        # 34-slot tile count vectors (indexed by tile id), kept in sync with each hand and the discard pool
+        self.hand_counts = {player: [0] * NUM_TILE_TYPES for player in self.players}
+        self.discard_counts = [0] * NUM_TILE_TYPES
+        self.macro_direction = list(self.directions)
+        self.micro_direction = list(self.directions)
         self.player_points = [50, 50, 50, 50]
 
-        # Define game suits and ranks for one-hot encoding of tiles
-        self.suits = ['stick', 'circle', '10k', 'red', 'green', 'white', 'east', 'south', 'west', 'north']
-        self.ranks = list(range(1, 10))
-        self.suit_to_idx = {suit: idx for idx, suit in enumerate(self.suits)}
-        self.idx_to_suit = {idx: suit for idx, suit in enumerate(self.suits)}
-        self.rank_to_idx = {rank: idx for idx, rank in enumerate(self.ranks)}
-        self.idx_to_rank = {idx: rank for idx, rank in enumerate(self.ranks)}
+
+    def snapshot(self) -> tuple:
+        '''
+        Returns an immutable copy of the mutable parts of the game state, to be passed to restore()
+
+        Hands and the discard pool are stored as tuples of interned tiles, count vectors as bytes,
+        and the draw pool as the bytes of its physical tile indices. A snapshot can be restored any number of times.
+        '''
+        draw_pool = self.draw_pool
+        return (
+            tuple(tuple(hand) for hand in self.players.values()),
+            tuple(bytes(counts) for counts in self.hand_counts.values()),
+            bytes(draw_pool.tiles[draw_pool.head:draw_pool.tail]),
+            tuple(self.discard_pool),
+            bytes(self.discard_counts),
+            tuple(self.macro_direction),
+            tuple(self.micro_direction),
+            tuple(self.player_points)
+        )
+
+
+    def restore(self, snapshot: tuple) -> None:
+        '''
+        Resets the game state to a snapshot returned by snapshot()
+        '''
+        hands, hand_counts, draw_pool, discard_pool, discard_counts, macro_direction, micro_direction, player_points = snapshot
+
+        for player, hand, counts in zip(self.players, hands, hand_counts):
+            self.players[player] = list(hand)
+            self.hand_counts[player] = list(counts)
+        self.draw_pool = Wall(draw_pool)
+        self.discard_pool = list(discard_pool)
+        self.discard_counts = list(discard_counts)
+        self.macro_direction = list(macro_direction)
+        self.micro_direction = list(micro_direction)
+        self.player_points = list(player_points)
 
 
-        # Define one-hot encoding of directions
-        self.macro_direction_to_idx = {macro_direction: idx for idx, macro_direction in enumerate(self.macro_direction)}
-        self.micro_direction_to_idx = {micro_direction: idx for idx, micro_direction in enumerate(self.micro_direction)}
+    def clone(self) -> 'GameState':
+        '''
+        Returns an independent copy of the game state
+
+        Tiles are immutable and shared, so only the hand, pool, direction, and point containers are copied.
+        '''
+        other = object.__new__(GameState)
+        other.players = {player: hand[:] for player, hand in self.players.items()}
+        other.hand_counts = {player: counts[:] for player, counts in self.hand_counts.items()}
+        other.draw_pool = self.draw_pool.copy()
+        other.discard_pool = self.discard_pool[:]
+        other.discard_counts = self.discard_counts[:]
+        other.macro_direction = self.macro_direction[:]
+        other.micro_direction = self.micro_direction[:]
+        other.player_points = self.player_points[:]
+        return other
 
 
     def add_tile_to_hand(self, tile: Tile, player: str) -> None:
@@ -70,6 +218,7 @@ class GameState:
             raise ValueError(f"Player {player} does not exist.")
         
         self.players[player].append(tile)
+        self.hand_counts[player][tile.id] += 1
 
 
     def remove_tile_from_hand(self, tile: Tile, player: str) -> None:
@@ -80,11 +229,12 @@ class GameState:
             logger.error(f"Error: cannot remove tile from hand. Player {player} does not exist.")
             raise ValueError(f"Player {player} does not exist.")
         
-        if tile not in self.players[player]:
+        if not isinstance(tile, Tile) or self.hand_counts[player][tile.id] == 0:
             logger.error(f"Error: cannot remove tile from hand. Tile {tile} not found in {player}'s hand.")
             raise ValueError(f"Tile {tile} not found in {player}'s hand.")
         
         self.players[player].remove(tile)
+        self.hand_counts[player][tile.id] -= 1
 
 
     def clear_hand(self, player: str) -> None:
@@ -96,6 +246,7 @@ class GameState:
           return
       
       self.players[player].clear()
+      self.hand_counts[player] = [0] * NUM_TILE_TYPES
     
 
 
@@ -114,11 +265,11 @@ class GameState:
             logger.debug('Cannot remove tile from draw pool because draw pool is empty.')
             return
         
-        if tile not in self.draw_pool:
+        try:
+            self.draw_pool.remove(tile)
+        except ValueError:
             logger.error('Cannot remove tile from draw pool because tile is not in draw pool.')
-            raise ValueError(f"Tile {tile} not found in draw_pool.")
-        
-        self.draw_pool.remove(tile)
+            raise
 
 
     def add_tile_to_discard_pool(self, tile: Tile) -> None:
@@ -126,6 +277,7 @@ class GameState:
         Adds a tile to the discard pool
         '''
         self.discard_pool.append(tile)
+        self.discard_counts[tile.id] += 1
 
 
     def remove_tile_from_discard_pool(self, tile: Tile) -> None:
@@ -136,11 +288,12 @@ class GameState:
             logger.debug('Cannot remove tile from discard pool because discard pool is empty.')
             return
         
-        if tile not in self.discard_pool:
+        if not isinstance(tile, Tile) or self.discard_counts[tile.id] == 0:
             logger.error('Cannot remove tile from discard pool because tile is not in discard pool.')
             raise ValueError(f"Tile {tile} not found in discard_pool.")
         
         self.discard_pool.remove(tile)
+        self.discard_counts[tile.id] -= 1
 
 
     def count(self, category: str) -> int:
@@ -168,7 +321,7 @@ class GameState:
         player_hand = self.players.get(player, [])
 
         # Sort the player's hand
-        sorted_hand = sorted(player_hand, key=lambda tile: (tile.suit, tile.rank))
+        sorted_hand = sorted(player_hand, key=lambda tile: HAND_SORT_ORDER[tile.id])
 
         # Update the player's hand with the sorted version
         self.players[player] = sorted_hand
@@ -199,37 +352,80 @@ class GameState:
         self.micro_direction = [self.micro_direction[-1]] + self.micro_direction[:-1]
 
 
-    def randomize_macro_direction(self) -> None:
+    def randomize_macro_direction(self, rng: random.Random = None) -> None:
         '''
         Shuffles the macrodirection of the game
+
+        Inputs:
+        rng: random number generator to shuffle with (defaults to the global random module)
         '''
-        random.shuffle(self.macro_direction)
+        (rng or random).shuffle(self.macro_direction)
 
 
-    def randomize_micro_direction(self) -> None:
+    def randomize_micro_direction(self, rng: random.Random = None) -> None:
         '''
         Shuffles the micro direction of the game
+
+        Inputs:
+        rng: random number generator to shuffle with (defaults to the global random module)
         '''
-        random.shuffle(self.micro_direction)
+        (rng or random).shuffle(self.micro_direction)
 
     
-    def initialize_draw_pool(self) -> None:
+    def initialize_draw_pool(self, rng: random.Random = None) -> None:
         '''
         Set up the game by adding all tiles to the draw pool and then shuffling them
+
+        Inputs:
+        rng: random number generator to shuffle with (defaults to the global random module)
         '''
         rank_suits = ['circle', 'stick', '10k']
         norank_suits = ['red', 'green', 'white', 'east', 'south', 'west', 'north']
 
+        tiles = []
         for suit in rank_suits:
             for rank in range(1, 10):
-                for _ in range(4):
-                    self.add_tile_to_draw_pool(Tile(suit, rank))
+                tile_id = Tile(suit, rank).id
+                tiles.extend(tile_id * NUM_COPIES + copy for copy in range(NUM_COPIES))
         
         for suit in norank_suits:
-            for _ in range(4):
-                self.add_tile_to_draw_pool(Tile(suit))
+            tile_id = Tile(suit).id
+            tiles.extend(tile_id * NUM_COPIES + copy for copy in range(NUM_COPIES))
+
+        (rng or random).shuffle(tiles)
+        self.draw_pool = Wall(tiles)
+
+
+    def draw_tile(self, player: str) -> Tile:
+        '''
+        Moves the tile at the front of the draw pool into the specified player's hand
+
+        Returns:
+        the drawn tile, or None if the draw pool is empty
+        '''
+        if len(self.draw_pool) == 0:
+            logger.debug('Cannot draw tile because draw pool is empty.')
+            return None
+
+        tile = self.draw_pool.pop(0)
+        self.add_tile_to_hand(tile, player)
+        return tile
+
+
+    def draw_tile_from_back(self, player: str) -> Tile:
+        '''
+        Moves the tile at the back of the draw pool into the specified player's hand (e.g. after a gon)
+
+        Returns:
+        the drawn tile, or None if the draw pool is empty
+        '''
+        if len(self.draw_pool) == 0:
+            logger.debug('Cannot draw tile because draw pool is empty.')
+            return None
 
-        random.shuffle(self.draw_pool)
+        tile = self.draw_pool.pop()
+        self.add_tile_to_hand(tile, player)
+        return tile
     
 
     def deal_tiles(self) -> None:
@@ -243,12 +439,9 @@ class GameState:
         for _ in range(3):
             for player in self.players:
                 for _ in range(4):
-                    self.add_tile_to_hand(self.draw_pool[0], player)
-                    self.remove_tile_from_draw_pool(self.draw_pool[0])
+                    self.draw_tile(player)
         
         for player in self.players:
-            self.add_tile_to_hand(self.draw_pool[0], player)
-            self.remove_tile_from_draw_pool(self.draw_pool[0])
+            self.draw_tile(player)
         
-        self.add_tile_to_hand(self.draw_pool[0], 'player1')
-        self.remove_tile_from_draw_pool(self.draw_pool[0])
\ No newline at end of file
+        self.draw_tile('player1')
@@ -4,39 +4,66 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 from gamestate import GameState
-from preprocessing import prepare_input
-from tile_utils import compute_score, is_winning_hand, is_set, is_run
-import random
+from preprocessing import (encode_observation, observation_length, prepare_input,
+                           TILE_ENCODING_TABLE, TILE_ENCODING_LEN, OBS_TILES, OBS_LENGTH)
+from hand_cache import HandCache, get_hand_cache
+from opponents import RandomOpponent
+from rewards import discard_reward
+from suit_table import waiting_tiles
+from tile_utils import is_winning_hand
 import copy
-import itertools
-from tile import Tile
+from tile import Tile, NUM_TILE_TYPES
 
-import os
 import logging
-from logging.handlers import RotatingFileHandler
+from logging_config import get_logger
 
-# Logging
-logger = logging.getLogger("gamestate_env_logger")
-logger.setLevel(logging.DEBUG)
+# Logging (the file is cleared when the first message of a run is written)
+logger = get_logger("gamestate_env_logger", "gamestate_env_logger.log", logging.DEBUG, clear=True)
 
-log_file_path = "logs/gamestate_env_logger.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+# Players whose turns are simulated between the agent's (player1's) turns
+OPPONENTS = ('player2', 'player3', 'player4')
 
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+# Action modes: 'index' discards the tile at a position of the hand (14 actions),
+# 'tile' discards a copy of a tile id (34 actions, duplicate tiles merged into one action)
+ACTION_MODES = ('index', 'tile')
 
-# Clear the logs before each execution
-open("logs/gamestate_env_logger.log", "w").close()
-
-logger.info("Starting gamestate_env logging.")
+# Encoding of each tile id as bytes, for patching observation buffers with slice assignments
+TILE_ENCODING_BYTES = [row.tobytes() for row in TILE_ENCODING_TABLE]
 
 class MahjongEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, encoding: str = 'vector', check_obs: bool = False, action_mode: str = 'index', opponents=None,
+                 hand_cache: HandCache = None):
         super().__init__()  # run the standard Gym environment setup
 
+        # opponent policies for player2-player4 (see opponents.py): one policy for all of them,
+        # or a dictionary from player to policy; random discards by default
+        if opponents is None:
+            opponents = RandomOpponent()
+        if not isinstance(opponents, dict):
+            opponents = {player: opponents for player in OPPONENTS}
+        self.opponents = opponents
+        # tiles that would complete each opponent's 13-tile hand, so a draw is only checked for a win when it can be one
+        self._opponent_waits = {}
+
+        # cache of the agent's win checks (see hand_cache.py); the process-wide cache by default
+        self.hand_cache = hand_cache if hand_cache is not None else get_hand_cache()
+
+        # observation encoding: 'vector' (1851 values) or 'planes' (280 values), see preprocessing.ENCODINGS
+        self.encoding = encoding
+
+        # action mode: 'index' or 'tile', see ACTION_MODES; action_masks gives the legal actions
+        if action_mode not in ACTION_MODES:
+            raise ValueError(f"Unknown action mode: {action_mode}")
+        self.action_mode = action_mode
+
+        # 'vector' observations are kept in a live buffer and only the tile slots that changed are re-encoded;
+        # check_obs compares every observation against a full prepare_input (for debugging, slow)
+        self.check_obs = check_obs
+        self._obs_buffer = bytearray(OBS_LENGTH)
+        self._obs = np.frombuffer(self._obs_buffer, dtype=np.int8)
+        self._obs_state = None
+        self._obs_hand_ids = []
+        self._obs_num_discards = 0
         self.state = GameState()
         self.player = 'player1'
         self.max_turns = 200
@@ -48,9 +75,10 @@ class MahjongEnv(gym.Env):
         self.action_space = spaces.Discrete(self._num_actions())
 
     def reset(self, seed=None, options=None):
-        logger.debug("="*40)
-        logger.debug("NEW GAME - Executing function: 'reset'")
-        logger.debug("="*40 + "\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("="*40)
+            logger.debug("NEW GAME - Executing function: 'reset'")
+            logger.debug("="*40 + "\n")
 
         super().reset(seed=seed)
 
@@ -59,18 +87,26 @@ class MahjongEnv(gym.Env):
         self.state.deal_tiles()
         self.player = 'player1'
         self.turn_count = 0
+        self._opponent_waits = {player: waiting_tiles(self.state.hand_counts[player]) for player in OPPONENTS}
 
         observation = self._get_obs()
         info = {}
         return observation, info
     
     def step(self, action):
-        logger.debug(f"Executing function: 'step'")
-        logger.debug(f"Turn count: {self.turn_count}.")
-        logger.debug(f"{self.player}'s hand: {self.state.players[self.player]}")
+        # Position in the hand of the tile to discard
+        action = self._hand_index(action)
+
+        # The debug messages format whole hands, so they are only built when debug logging is on
+        # (checked once per step; the level check is cached by logging)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Executing function: 'step'")
+            logger.debug(f"Turn count: {self.turn_count}.")
+            logger.debug(f"{self.player}'s hand: {self.state.players[self.player]}")
         if len(self.state.players[self.player]) != 14:
             logger.error(f"Length of {self.player}'s hand is {len(self.state.players[self.player])}. Should be 14.")
-        else:
+        elif debug:
             logger.debug(f"Action: discard tile in index {action} ({self.state.players[self.player][action]}).")
 
         info = {}
@@ -80,7 +116,6 @@ class MahjongEnv(gym.Env):
 
         # Compute reward using action
         reward, info = self._compute_reward(action, player, info)
-        observation = self._get_obs()
 
         # Apply action
         discarded_tile = self.state.players[player][action]
@@ -91,40 +126,35 @@ class MahjongEnv(gym.Env):
         terminated = False  # True if game is won
         truncated = False   # True if ended early by other rule/timer
 
-        # Cycle over other players - draw from top of draw pool and discard randomly
-        for player in ['player2', 'player3', 'player4']:
+        # Cycle over other players - draw from top of draw pool and discard with their policy
+        for player in OPPONENTS:
             if len(self.state.draw_pool) == 0:
-                logger.debug(f"Draw pool is empty. Exiting player loop and setting 'terminated' to True.")
+                logger.debug("Draw pool is empty. Exiting player loop and setting 'terminated' to True.")
                 terminated = True
-                break            
-            draw_tile = self.state.draw_pool[0]
-            self.state.add_tile_to_hand(draw_tile, player)
-            self.state.remove_tile_from_draw_pool(draw_tile)
-            is_winning, _ = is_winning_hand(self.state, player)
-            if is_winning:
-                logger.debug(f"{player} won. Exiting player loop and setting 'terminated' to True.")
+                break
+            draw_tile = self.state.draw_tile(player)
+            if draw_tile.id in self._opponent_waits[player]:
+                logger.debug("%s won. Exiting player loop and setting 'terminated' to True.", player)
                 terminated = True
                 break
-            random.shuffle(self.state.players[player])
-            discard_tile = self.state.players[player][0]
+            discard_tile = self.state.players[player][self.opponents[player].choose_discard(self.state, player)]
             self.state.remove_tile_from_hand(discard_tile, player)
             self.state.add_tile_to_discard_pool(discard_tile)
+            self._opponent_waits[player] = waiting_tiles(self.state.hand_counts[player])
 
         if len(self.state.draw_pool) == 0:
-            logger.debug(f"Draw pool is empty.")
+            logger.debug("Draw pool is empty.")
             terminated = True
         
         if not terminated:
             player = self.player
-            draw_tile = self.state.draw_pool[0]
-            self.state.add_tile_to_hand(draw_tile, player)
-            self.state.remove_tile_from_draw_pool(draw_tile)
-            is_winning, _ = is_winning_hand(self.state, player)
+            self.state.draw_tile(player)
+            is_winning, _ = is_winning_hand(self.state, player, cache=self.hand_cache)
             if len(self.state.draw_pool) == 0:
-                logger.debug(f"Draw pool is empty after {player} drew. Setting 'terminated' to True.")
+                logger.debug("Draw pool is empty after %s drew. Setting 'terminated' to True.", player)
                 terminated = True
             elif is_winning:
-                logger.debug(f"{player} won. Setting 'terminated' to True.")
+                logger.debug("%s won. Setting 'terminated' to True.", player)
                 terminated = True
 
         self.turn_count += 1
@@ -132,10 +162,13 @@ class MahjongEnv(gym.Env):
             truncated = True
             terminated = True
 
-        logger.debug(f"Reward: {reward}.")
-        logger.debug(f"terminated: {terminated}.")
-        logger.debug(f"truncated: {truncated}.\n")
+        if debug:
+            logger.debug(f"Reward: {reward}.")
+            logger.debug(f"terminated: {terminated}.")
+            logger.debug(f"truncated: {truncated}.\n")
 
+        # Observe the game after the other players and the agent have drawn
+        observation = self._get_obs()
         return observation, reward, terminated, truncated, info
     
     def render(self):
@@ -151,9 +184,65 @@ class MahjongEnv(gym.Env):
 
     def _get_obs(self):
         # One-hot encode GameState into a fixed-size vector
-        observation_tensor = prepare_input(self.state, self.player)
-        observation = observation_tensor.numpy().astype(np.int8) # Convert to Numpy array from PyTorch tensor
-        return observation
+        if self.encoding != 'vector':
+            return encode_observation(self.state, self.player, encoding=self.encoding)
+
+        # Between observations the agent's hand keeps its size (one discard, one draw) and the discard pool only grows,
+        # so only changed hand slots and new discards need encoding; a new game or hand size is encoded in full
+        hand_ids = [tile.id for tile in self.state.players[self.player]]
+        discard_pool = self.state.discard_pool
+        if (self._obs_state is not self.state or len(hand_ids) != len(self._obs_hand_ids)
+                or len(discard_pool) < self._obs_num_discards):
+            self._encode_obs(hand_ids)
+        else:
+            self._patch_obs(hand_ids)
+
+        self._obs_state = self.state
+        self._obs_hand_ids = hand_ids
+        self._obs_num_discards = len(discard_pool)
+
+        if self.check_obs:
+            self._check_obs()
+        return self._obs.copy()
+
+    def _encode_obs(self, hand_ids):
+        # Full re-encode into the live buffer; the discards directly follow the hand, so a hand smaller than 14 tiles
+        # (at the end of a game) leaves its unused slot blank at the end and the observation keeps its length
+        tiles = b''.join([TILE_ENCODING_BYTES[tile_id] for tile_id in hand_ids]
+                         + [TILE_ENCODING_BYTES[tile.id] for tile in self.state.discard_pool])
+        self._obs_buffer[:] = bytes(OBS_LENGTH)
+        self._obs_buffer[:len(tiles)] = tiles
+
+        direction_start = OBS_TILES * TILE_ENCODING_LEN
+        num_directions = len(self.state.directions)
+        self._obs_buffer[direction_start + self.state.macro_direction_to_idx[self.state.macro_direction[0]]] = 1
+        self._obs_buffer[direction_start + num_directions + self.state.micro_direction_to_idx[self.state.micro_direction[0]]] = 1
+
+    def _patch_obs(self, hand_ids):
+        # Hand slots from the first changed tile on (a discard shifts the tiles after it, sorting moves many)
+        first_changed = next((slot for slot, (old_id, new_id) in enumerate(zip(self._obs_hand_ids, hand_ids))
+                              if old_id != new_id), len(hand_ids))
+        if first_changed < len(hand_ids):
+            self._obs_buffer[first_changed * TILE_ENCODING_LEN:len(hand_ids) * TILE_ENCODING_LEN] = \
+                b''.join([TILE_ENCODING_BYTES[tile_id] for tile_id in hand_ids[first_changed:]])
+
+        # Discards since the last observation fill slots of the hidden draw pool
+        new_discards = self.state.discard_pool[self._obs_num_discards:]
+        if new_discards:
+            start = (len(hand_ids) + self._obs_num_discards) * TILE_ENCODING_LEN
+            self._obs_buffer[start:start + len(new_discards) * TILE_ENCODING_LEN] = \
+                b''.join([TILE_ENCODING_BYTES[tile.id] for tile in new_discards])
+
+    def _check_obs(self):
+        expected = prepare_input(self.state, self.player).numpy()
+        num_revealed = len(self.state.players[self.player]) + len(self.state.discard_pool)
+        padded = np.zeros(OBS_LENGTH, dtype=np.int8)
+        padded[:num_revealed * TILE_ENCODING_LEN] = expected[:num_revealed * TILE_ENCODING_LEN]
+        padded[OBS_TILES * TILE_ENCODING_LEN:] = expected[-(OBS_LENGTH - OBS_TILES * TILE_ENCODING_LEN):]
+        if not np.array_equal(self._obs, padded):
+            mismatched = np.nonzero(self._obs != padded)[0]
+            logger.error(f"Incremental observation differs from prepare_input at indices {mismatched.tolist()}")
+            raise RuntimeError("Incremental observation does not match prepare_input")
     
     def _obs_length(self):
         # Tiles in player's hand: 14*19 = 266
@@ -161,105 +250,41 @@ class MahjongEnv(gym.Env):
         # Macro game direction: 4
         # Micro game direction: 4
         # 266 + 1577 + 4 + 4 = 1851
-        return 1851
+        # (280 with the 'planes' encoding: 8 count planes of 34 tile types + 4 + 4)
+        return observation_length(self.encoding)
     
     def _num_actions(self):
-        # 14 (tiles in player's hand to discard)
-        return 14
+        # 14 (tiles in player's hand to discard), or 34 (tile types to discard) in 'tile' mode
+        return NUM_TILE_TYPES if self.action_mode == 'tile' else 14
+
+    def action_masks(self) -> np.ndarray:
+        '''
+        Returns a boolean array of which actions are legal in the current state
+        (the method sb3-contrib's MaskablePPO looks for)
+        '''
+        if self.action_mode == 'tile':
+            return np.array(self.state.hand_counts[self.player]) > 0
+        return np.arange(self.action_space.n) < len(self.state.players[self.player])
+
+    def _hand_index(self, action) -> int:
+        # Converts an action to the position in the hand of the tile to discard
+        hand = self.state.players[self.player]
+        if self.action_mode == 'tile':
+            for index, tile in enumerate(hand):
+                if tile.id == action:
+                    return index
+            logger.error(f"Illegal action {action}: no tile with that id in {self.player}'s hand.")
+            raise ValueError(f"Tile id {action} is not in {self.player}'s hand (see action_masks)")
+
+        if not 0 <= action < len(hand):
+            logger.error(f"Illegal action {action}: {self.player}'s hand has {len(hand)} tiles.")
+            raise ValueError(f"Hand index {action} is out of range for {len(hand)} tiles (see action_masks)")
+        return int(action)
     
     def _compute_reward(self, action, player, info):
+        # Constant time reward from the hand and discard pool count vectors (see rewards.discard_reward)
         discard_tile = self.state.players[player][action]
-        discard_suit = discard_tile.suit
-        discard_rank = discard_tile.rank
-        
-        reward = 0.0
-
-        hand_14 = copy.deepcopy(self.state.players[player])
-        hand_13 = copy.deepcopy(hand_14)
-        hand_13.pop(action)
-
-        # count number of sets/runs before discarding
-        groups = list(itertools.combinations(hand_14, 3))
-        valid_sets_14 = 0
-        valid_runs_14 = 0
-        for group in groups:
-            if is_set(group[0], group[1], group[2]):
-                valid_sets_14 += 1
-            elif is_run(group[0], group[1], group[2]):
-                valid_runs_14 += 1
-
-        # count number of sets/runs after discarding
-        groups = list(itertools.combinations(hand_13, 3))
-        valid_sets_13 = 0
-        valid_runs_13 = 0
-        for group in groups:
-            if is_set(group[0], group[1], group[2]):
-                valid_sets_13 += 1
-            elif is_run(group[0], group[1], group[2]):
-                valid_runs_13 += 1
-        
-        # penalize for breaking up a set/run
-        if valid_sets_14 > valid_sets_13:
-            reward -= 1.0
-        elif valid_runs_14 > valid_runs_13:
-            reward -= 1.0
-        
-        # colors - reward if unlikely/impossible to complete a color set
-        color_1_count_reward = 0.5
-        color_2plus_count_reward = 1.0
-
-        if discard_suit == 'red':
-            discard_count_red = sum(tile.suit == "red" for tile in self.state.discard_pool)
-            if discard_count_red == 1:
-                reward += color_1_count_reward
-            elif discard_count_red >= 2:
-                reward += color_2plus_count_reward
-        elif discard_suit == 'green':
-            discard_count_green = sum(tile.suit == "green" for tile in self.state.discard_pool)
-            if discard_count_green == 1:
-                reward += color_1_count_reward
-            elif discard_count_green >= 2:
-                reward += color_2plus_count_reward
-        elif discard_suit == 'white':
-            discard_count_white = sum(tile.suit == "white" for tile in self.state.discard_pool)
-            if discard_count_white == 1:
-                reward += color_1_count_reward
-            elif discard_count_white >= 2:
-                reward += color_2plus_count_reward
-
-        # directions - reward if unlikely/impossible to complete a direction set
-        macro_direction = self.state.macro_direction
-        micro_direction = self.state.micro_direction
-
-        macro_1_count_reward = 0.5
-        macro_2plus_count_reward = 1.0
-
-        micro_1_count_reward = 0.5
-        micro_2plus_count_reward = 1.0
-
-        if discard_suit == macro_direction:
-            discard_count_macro_direction = sum(tile.suit == macro_direction for tile in self.state.discard_pool)
-            if discard_count_macro_direction == 1:
-                reward += macro_1_count_reward
-            elif discard_count_macro_direction >= 2:
-                reward += macro_2plus_count_reward
-        elif discard_suit == micro_direction:
-            discard_count_micro_direction = sum(tile.suit == micro_direction for tile in self.state.discard_pool)
-            if discard_count_micro_direction == 1:
-                reward += micro_1_count_reward
-            elif discard_count_micro_direction >= 2:
-                reward += micro_2plus_count_reward
-
-        # potential sets: penalize for discarding if you already have another copy of the same tile
-        same_tile_count = sum(tile.suit == discard_suit and tile.rank == discard_rank for tile in hand_13)
-        if same_tile_count > 0:
-            reward -= 0.5
-
-        # boundary tiles: penalize 1 and 9 tiles since they're less flexible for making runs
-        if discard_rank == 1 or discard_rank == 9:
-            reward -= 0.1
-
-        # potential runs: penalize for discarding if you have nearby tiles of the same rank
+        reward = discard_reward(self.state.hand_counts[player], self.state.discard_counts, discard_tile.id)
 
         info = {}
         return reward, info
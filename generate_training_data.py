@@ -1,70 +1,59 @@
-import random
-import torch
+import argparse
+import multiprocessing
 import os
+import random
 import sqlite3
 import time
-import random
+
+import torch
 
 from tile_utils import compute_score
 from gamestate import GameState
+from hand_cache import get_hand_cache
 from preprocessing import prepare_input
-from training_data_utils import get_last_game_id, save_winner_data
-
-global_start_time = time.time()
-global_elapsed_time = 0
-
-# Define the database path
-db_folder = "G:\\VS Code\\Mahjong_Data"
-os.makedirs(db_folder, exist_ok=True)
-db_path = os.path.join(db_folder, "mahjong_eval_net_training_data.db")
-
-# Connect to SQLite database (or create it if it doesn't exist)
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# Create a table for storing winner history if it doesn't exist
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS winner_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        game_id INTEGER,
-        player TEXT,
-        turn INTEGER,
-        gamestate_tensor BLOB,
-        final_score INTEGER
-    )
-''')
-conn.commit()
-
-
-num_rounds = 150000
-game_id = get_last_game_id(conn)
-count = 0
-batch_winners = 0
-
-micro_dict = {'player1': 0,
-            'player2': 1,
-            'player3': 2,
-            'player4': 3}
-
-start_time = time.time()
-
-for i in range(num_rounds):
-    if count % 250 == 0:
-        print(f"Round: {count}")
-        end_time = time.time()
-        elapsed_time = end_time - start_time
-        # print(f"Batch time: {elapsed_time:.2f} s")
-        start_time = time.time()
+from training_data_utils import get_last_game_id, configure_connection, create_winner_history_table, WinnerHistoryWriter
+
+# Default database path
+DB_FOLDER = "G:\\VS Code\\Mahjong_Data"
+DB_PATH = os.path.join(DB_FOLDER, "mahjong_eval_net_training_data.db")
+
+# Length of gamestate_tensor
+GAMESTATE_TENSOR_LEN = 1851
+
+
+def round_rng(base_seed: int, round_index: int) -> random.Random:
+    '''
+    Returns the random number generator for one round
+
+    Each round is seeded from the base seed and its index alone, so the games played
+    do not depend on how rounds are split between workers
+    '''
+    return random.Random(f"{base_seed}:{round_index}")
+
+
+def play_round(rng: random.Random):
+    '''
+    Plays one round of random self-play
+
+    Inputs:
+    rng: random number generator used for every random choice in the round
+
+    Returns:
+    (player, score, winner_history) for the winning player, where winner_history is a numpy array
+    of the winner's gamestate tensor at each of their turns, or None if nobody won
+    '''
+    # Wins and scores are looked up in the process's hand cache (see hand_cache.py)
+    hand_cache = get_hand_cache()
 
     # Initialize game
     gamestate = GameState()
-    gamestate.randomize_macro_direction()
-    gamestate.randomize_micro_direction()
-    gamestate.initialize_draw_pool()
+    gamestate.randomize_macro_direction(rng)
+    gamestate.randomize_micro_direction(rng)
+    gamestate.initialize_draw_pool(rng)
     gamestate.deal_tiles()
 
-    # Initialize player hand histories (1851 is length of gamestate_tensor)
-    player_history = torch.zeros((4, len(gamestate.draw_pool), 1851))
+    # Initialize player hand histories
+    player_history = torch.zeros((4, len(gamestate.draw_pool), GAMESTATE_TENSOR_LEN))
 
     # Initialize number of turns each player has taken
     turns = {
@@ -80,31 +69,26 @@ for i in range(num_rounds):
             'player4']
 
     player = players[3]
+    score = 0
 
     while len(gamestate.draw_pool) != 0:
         # Move to the next player's turn based on whose turn it was previously
-        if player == player[0]:
-            player = player[1]
-        elif player == player[1]:
-            player = player[2]
-        elif player == player[2]:
-            player = player[3]
-        elif player == player[3]:
-            player = player[0]
-        
+        player = players[(players.index(player) + 1) % len(players)]
+
         turns[player] += 1
 
+        # Draw a tile (player1 is dealt 14 tiles, so they discard without drawing on their first turn)
+        if len(gamestate.players[player]) < 14:
+            gamestate.draw_tile(player)
+
         # Calculate score of player's hand
-        gamestate.add_tile_to_hand(gamestate.draw_pool[0], player)
-        gamestate.remove_tile_from_draw_pool(gamestate.draw_pool[0])
-        score = compute_score(gamestate, player)
+        score = compute_score(gamestate, player, cache=hand_cache)
 
-        # Generate one-hot encoded tensor to represent the gamestate
-        gamestate_tensor = prepare_input(gamestate, player)
-        player_history[gamestate.players_to_int[player], turns[player]-1, :] = gamestate_tensor
+        # Encode the gamestate directly into the player's history
+        prepare_input(gamestate, player, out=player_history[gamestate.players_to_int[player], turns[player]-1])
 
         # Discard tile
-        discard_idx = random.randint(0, len(gamestate.players[player])-1)
+        discard_idx = rng.randint(0, len(gamestate.players[player])-1)
         discard_tile = gamestate.players[player][discard_idx]
         gamestate.add_tile_to_discard_pool(discard_tile)
         gamestate.remove_tile_from_hand(discard_tile, player)
@@ -112,20 +96,110 @@ for i in range(num_rounds):
         # Check to see if player won
         if score != 0:
             break
-    
-    if score != 0:
-        winner_history = player_history[gamestate.players_to_int[player], 0:turns[player], :]
-        save_winner_data(conn, game_id, winner_history, player, score)
-        game_id += 1
-        print(f"$$$ WINNER $$$")
-        batch_winners += 1
-
-    count += 1
-
-global_end_time = time.time()
-global_elapsed_time += global_end_time - global_start_time
-print(f"Total elapsed time: {global_elapsed_time:.2f} s")
-print(f"Total number of new winning datasets added: {batch_winners}")
-
-# Close database
-conn.close()
\ No newline at end of file
+
+    if score == 0:
+        return None
+
+    winner_history = player_history[gamestate.players_to_int[player], 0:turns[player], :]
+    return player, score, winner_history.numpy()
+
+
+def play_rounds(task: tuple[int, int, int]) -> list[tuple]:
+    '''
+    Plays a contiguous block of rounds (run by each worker)
+
+    Inputs:
+    task: (base_seed, first round index, number of rounds)
+
+    Returns:
+    list of (round_index, player, score, winner_history) for every round that had a winner
+    '''
+    base_seed, first_round, num_rounds = task
+    results = []
+    for round_index in range(first_round, first_round + num_rounds):
+        result = play_round(round_rng(base_seed, round_index))
+        if result is not None:
+            results.append((round_index,) + result)
+    return results
+
+
+def init_worker() -> None:
+    '''
+    Keeps each worker process to a single torch thread so workers do not compete for cores
+    '''
+    torch.set_num_threads(1)
+
+
+def generate(num_rounds: int, db_path: str, num_workers: int, base_seed: int, chunk_size: int = 250) -> int:
+    '''
+    Plays num_rounds rounds of self-play across num_workers processes and saves every winner's history to db_path
+
+    Rounds are split into chunks of chunk_size and handed out to a worker pool. Results are written by this process
+    in round order, so for a given base seed the database contents do not depend on the number of workers.
+
+    Returns:
+    the number of new winning datasets added
+    '''
+    db_folder = os.path.dirname(db_path)
+    if db_folder:
+        os.makedirs(db_folder, exist_ok=True)
+
+    # Connect to SQLite database (or create it if it doesn't exist)
+    conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    create_winner_history_table(conn)
+
+    game_id = get_last_game_id(conn) + 1
+    batch_winners = 0
+    tasks = [(base_seed, first_round, min(chunk_size, num_rounds - first_round))
+             for first_round in range(0, num_rounds, chunk_size)]
+
+    if num_workers > 1:
+        pool = multiprocessing.Pool(num_workers, initializer=init_worker)
+        chunk_results = pool.imap(play_rounds, tasks)
+    else:
+        pool = None
+        chunk_results = map(play_rounds, tasks)
+
+    # The writer flushes buffered winners on the way out, including on Ctrl-C
+    try:
+        with WinnerHistoryWriter(conn) as writer:
+            start_time = time.time()
+            for (_, first_round, chunk_rounds), results in zip(tasks, chunk_results):
+                for round_index, player, score, winner_history in results:
+                    writer.add(game_id, torch.from_numpy(winner_history), player, score)
+                    game_id += 1
+                    batch_winners += 1
+
+                elapsed_time = time.time() - start_time
+                rounds_done = first_round + chunk_rounds
+                print(f"Round: {rounds_done} ({rounds_done / elapsed_time:.1f} rounds/s, {batch_winners} winners)")
+
+        # Workers keep their own caches, so statistics are only available when rounds are played in this process
+        if pool is None:
+            stats = get_hand_cache().stats()
+            print(f"Hand cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        conn.close()
+
+    return batch_winners
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate evaluation network training data from random self-play")
+    parser.add_argument('--rounds', type=int, default=150000, help="number of rounds to play")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--output', default=DB_PATH, help="path of the SQLite database to add winner histories to")
+    parser.add_argument('--seed', type=int, default=0, help="base random seed; each round is seeded from it and the round index")
+    parser.add_argument('--chunk-size', type=int, default=250, help="number of rounds handed to a worker at a time")
+    args = parser.parse_args()
+
+    global_start_time = time.time()
+    batch_winners = generate(args.rounds, args.output, args.workers, args.seed, args.chunk_size)
+
+    global_elapsed_time = time.time() - global_start_time
+    print(f"Total elapsed time: {global_elapsed_time:.2f} s")
+    print(f"Total number of new winning datasets added: {batch_winners}")
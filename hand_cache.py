@@ -0,0 +1,126 @@
+import os
+import weakref
+
+from scoring import best_decomposition
+from hand_counts import NUM_RANKED_TYPES
+from suit_table import get_suit_table, RANK_SUIT_OFFSETS
+
+# Default number of hands a HandCache holds before evicting the least recently used one
+DEFAULT_MAX_ENTRIES = 1 << 16
+
+# Result for hands that cannot be winning hands
+NOT_WINNING = (False, None, 0)
+
+# Every HandCache, so that forked children can reset their statistics
+_caches = weakref.WeakSet()
+
+
+class HandCache:
+    '''
+    Bounded LRU cache of win checks and best scores
+
+    Entries are keyed by the hand's canonical signature (the bytes of its 34-slot count vector, split by suit, so any
+    tile order gives the same key) and the scoring context (macro and micro direction). Values are immutable tuples,
+    so a forked worker process can keep using the entries it inherited; its statistics start from zero.
+
+    A hand with a ranked suit that is not a pattern of sets/runs/quads (and at most one double) cannot be a winning hand.
+    Checking that takes the same suit table lookups as building the key, so those hands, the large majority during
+    play, are answered without being stored and are counted as rejects rather than hits or misses.
+
+    Inputs:
+    max_entries: number of hands to keep
+    '''
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejects = 0
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, counts, macro_direction: str, micro_direction: str) -> tuple[bool, tuple[int, ...] | None, int]:
+        '''
+        Checks whether a hand is a winning hand and finds its highest scoring decomposition
+
+        Args:
+        counts: 34-slot count vector of the hand (see hand_counts.hand_to_counts)
+        macro_direction: global game direction (e.g. 'east')
+        micro_direction: direction of the player holding the hand (e.g. 'south')
+
+        Returns:
+        is_winning - boolean
+        groups - encoded groups of the best decomposition (None if the hand is not a winning hand)
+        score - score of the best decomposition (0 if the hand is not a winning hand)
+        '''
+        table = get_suit_table()
+        key = []
+        for offset in RANK_SUIT_OFFSETS:
+            pattern = bytes(counts[offset:offset + 9])
+            if pattern not in table:
+                self.rejects += 1
+                return NOT_WINNING
+            key.append(pattern)
+        key = (*key, bytes(counts[NUM_RANKED_TYPES:]), macro_direction, micro_direction)
+        entries = self._entries
+
+        # Dicts keep insertion order, so re-inserting a hit makes it the most recently used entry
+        result = entries.pop(key, None)
+        if result is not None:
+            self.hits += 1
+            entries[key] = result
+            return result
+
+        self.misses += 1
+        score, groups = best_decomposition(counts, macro_direction, micro_direction)
+        result = (groups is not None, groups, score)
+        if len(entries) >= self.max_entries:
+            del entries[next(iter(entries))]
+        entries[key] = result
+        return result
+
+    def stats(self) -> dict:
+        '''
+        Returns the hit/miss statistics (the hit rate is over lookups that were not rejects) and size of the cache
+        '''
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'rejects': self.rejects,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.rejects = 0
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.reset_stats()
+
+
+def _reset_stats_after_fork() -> None:
+    for cache in list(_caches):
+        cache.reset_stats()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_stats_after_fork)
+
+# Cache shared by MahjongEnv and generate_training_data in each process
+_hand_cache = HandCache()
+
+
+def get_hand_cache() -> HandCache:
+    '''
+    Returns the process-wide hand cache
+    '''
+    return _hand_cache
@@ -0,0 +1,69 @@
+from tile import Tile, TILE_TYPES, RANK_SUITS, HONOR_SUITS, NUM_TILE_TYPES, NUM_RANKED_TYPES
+
+# Count vectors have one slot per tile type id (see tile.py):
+#   0-8   stick 1-9
+#   9-17  circle 1-9
+#   18-26 10k 1-9
+#   27-33 red, green, white, east, south, west, north
+
+# Groups are encoded as a single integer: kind * NUM_TILE_TYPES + tile index
+# For runs the tile index is the lowest tile of the run
+# A set of four identical tiles (quad) counts as a set, and doubles sort after every other kind
+SET = 0
+RUN = 1
+QUAD = 2
+PAIR = 3
+
+# A winning hand is made up of this many sets/runs/quads and one double
+NUM_WINNING_GROUPS = 4
+
+
+def tile_to_index(tile: Tile) -> int:
+    '''
+    Converts a tile to its tile type index (0-33)
+    '''
+    return tile.id
+
+
+def index_to_tile(index: int) -> Tile:
+    '''
+    Converts a tile type index (0-33) to a Tile
+    '''
+    return TILE_TYPES[index]
+
+
+def hand_to_counts(hand: list[Tile]) -> list[int]:
+    '''
+    Converts a list of tiles to a 34-slot count vector
+
+    Args:
+    hand: list of Tile class objects
+
+    Returns:
+    counts: list of 34 integers, the number of copies of each tile type in hand
+    '''
+    counts = [0] * NUM_TILE_TYPES
+    for tile in hand:
+        counts[tile.id] += 1
+    return counts
+
+
+def group_to_indices(group: int) -> tuple[int, ...]:
+    '''
+    Expands an encoded group into the tile type indices it is made of
+    '''
+    kind, index = divmod(group, NUM_TILE_TYPES)
+    if kind == SET:
+        return (index, index, index)
+    if kind == RUN:
+        return (index, index + 1, index + 2)
+    if kind == QUAD:
+        return (index, index, index, index)
+    return (index, index)
+
+
+def group_to_tiles(group: int) -> tuple[Tile, ...]:
+    '''
+    Expands an encoded group into a tuple of Tile class objects
+    '''
+    return tuple(TILE_TYPES[index] for index in group_to_indices(group))
@@ -0,0 +1,121 @@
+import logging
+import os
+
+# Central logging configuration for every module's logger
+#
+# Logging modes:
+#   'default' - each module logs to its own rotating file in LOG_DIR at the module's level
+#   'performance' - no handlers are attached and module loggers only pass warnings and errors
+#                   (which logging prints to stderr), so disabled debug/info calls on hot paths return
+#                   after a cached level check
+# The mode is read from the MAHJONG_LOG_MODE environment variable at import, and can be switched
+# at any time with configure_logging
+#
+# Importing a module has no side effects on disk: its log directory and file are only created (or cleared)
+# when the first message is written
+LOG_MODES = ('default', 'performance')
+LOG_DIR = "logs"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+MAX_LOG_BYTES = 10*1024*1024
+LOG_BACKUP_COUNT = 5
+
+_mode = os.environ.get('MAHJONG_LOG_MODE', 'default')
+if _mode not in LOG_MODES:
+    raise ValueError(f"Unknown logging mode in MAHJONG_LOG_MODE: {_mode}")
+
+# Loggers created with get_logger: name -> (log file name, level, whether to clear the file)
+_loggers = {}
+
+
+def get_logger(name: str, log_file: str, level: int = logging.INFO, clear: bool = False) -> logging.Logger:
+    '''
+    Returns a module's logger, configured for the current logging mode
+
+    Args:
+    name: logger name (e.g. 'gamestate_logger')
+    log_file: file name of the module's log in LOG_DIR
+    level: level of the logger in 'default' mode
+    clear: whether to empty the log file before the first message of the run is written
+
+    Returns:
+    logger: the logging.Logger
+    '''
+    _loggers[name] = (log_file, level, clear)
+    logger = logging.getLogger(name)
+    _configure_logger(logger, log_file, level, clear)
+    return logger
+
+
+def _configure_logger(logger: logging.Logger, log_file: str, level: int, clear: bool) -> None:
+    # Replace any handler attached by an earlier configuration
+    for handler in list(logger.handlers):
+        if getattr(handler, 'from_logging_config', False):
+            logger.removeHandler(handler)
+            handler.close()
+
+    if _mode == 'performance':
+        logger.setLevel(logging.WARNING)
+        return
+
+    logger.setLevel(level)
+    handler = _LazyFileHandler(os.path.join(LOG_DIR, log_file), clear)
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.from_logging_config = True
+    logger.addHandler(handler)
+
+
+class _LazyFileHandler(logging.Handler):
+    '''
+    Rotating file handler that creates its directory and file when the first record is written
+    (logging.handlers, which pulls in socket and pickle, is only imported then too)
+    '''
+    def __init__(self, log_file_path: str, clear: bool):
+        super().__init__()
+        self.log_file_path = log_file_path
+        self.clear = clear
+        self.file_handler = None
+
+    def emit(self, record):
+        if self.file_handler is None:
+            from logging.handlers import RotatingFileHandler
+            try:
+                os.makedirs(os.path.dirname(self.log_file_path), exist_ok=True)
+                if self.clear:
+                    open(self.log_file_path, "w").close()
+                self.file_handler = RotatingFileHandler(self.log_file_path, maxBytes=MAX_LOG_BYTES,
+                                                        backupCount=LOG_BACKUP_COUNT)
+            except OSError:
+                self.handleError(record)
+                return
+            self.file_handler.setFormatter(self.formatter)
+        self.file_handler.emit(record)
+
+    def flush(self):
+        if self.file_handler is not None:
+            self.file_handler.flush()
+
+    def close(self):
+        if self.file_handler is not None:
+            self.file_handler.close()
+        super().close()
+
+
+def configure_logging(mode: str) -> None:
+    '''
+    Switches every module logger to a logging mode (see LOG_MODES)
+    '''
+    global _mode
+    if mode not in LOG_MODES:
+        raise ValueError(f"Unknown logging mode: {mode}")
+
+    _mode = mode
+    for name, (log_file, level, _) in _loggers.items():
+        _configure_logger(logging.getLogger(name), log_file, level, clear=False)
+
+
+def get_logging_mode() -> str:
+    '''
+    Returns the current logging mode
+    '''
+    return _mode
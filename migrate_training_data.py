@@ -0,0 +1,69 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from training_data_utils import (decode_gamestate, encode_gamestate, configure_connection,
+                                 create_winner_history_index, GAMESTATE_BLOB_MAGIC)
+
+
+def migrate(db_path: str, batch_size: int = 10000, vacuum: bool = True) -> int:
+    '''
+    Rewrites every legacy float32 gamestate_tensor blob in a training database in the bit-packed format
+    and adds the (game_id, turn) index used by load_training_data
+
+    Rows are converted in batches of batch_size, each committed separately, and rows that are
+    already bit-packed are skipped, so an interrupted migration can simply be run again.
+
+    Args:
+    db_path: path of the SQLite database
+    batch_size: number of rows converted per commit
+    vacuum: whether to VACUUM afterwards so the file actually shrinks
+
+    Returns:
+    the number of rows converted
+    '''
+    conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+
+    num_converted = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, gamestate_tensor FROM winner_history
+            WHERE id > ? AND substr(gamestate_tensor, 1, ?) != ?
+            ORDER BY id LIMIT ?
+        ''', (last_id, len(GAMESTATE_BLOB_MAGIC), GAMESTATE_BLOB_MAGIC, batch_size)).fetchall()
+        if not rows:
+            break
+
+        updates = [(encode_gamestate(decode_gamestate(blob)), row_id) for row_id, blob in rows]
+        with conn:
+            conn.executemany('UPDATE winner_history SET gamestate_tensor = ? WHERE id = ?', updates)
+
+        num_converted += len(rows)
+        last_id = rows[-1][0]
+        print(f"Converted {num_converted} rows")
+
+    create_winner_history_index(conn)
+
+    if vacuum:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+    conn.close()
+    return num_converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a training database's gamestate tensors to the bit-packed format")
+    parser.add_argument('db_path', help="path of the SQLite database to migrate in place")
+    parser.add_argument('--batch-size', type=int, default=10000, help="number of rows converted per commit")
+    parser.add_argument('--no-vacuum', action='store_true', help="skip the VACUUM that shrinks the file afterwards")
+    args = parser.parse_args()
+
+    start_size = os.path.getsize(args.db_path)
+    start_time = time.time()
+    num_converted = migrate(args.db_path, args.batch_size, vacuum=not args.no_vacuum)
+
+    print(f"Converted {num_converted} rows in {time.time() - start_time:.2f} s")
+    print(f"Database size: {start_size / 1e6:.1f} MB -> {os.path.getsize(args.db_path) / 1e6:.1f} MB")
@@ -0,0 +1,95 @@
+import random
+
+from gamestate import GameState
+from preprocessing import encode_observation
+from shanten import shanten
+
+# Opponent policies for MahjongEnv
+# A policy is any object with a choose_discard(gamestate, player) method returning the position in the player's
+# 14-tile hand of the tile to discard; MahjongEnv calls it for player2-player4 after they draw
+
+
+class RandomOpponent:
+    '''
+    Discards a uniformly random tile
+
+    Inputs:
+    rng: random number generator (default: the random module, so random.seed makes games reproducible)
+    '''
+    def __init__(self, rng: random.Random = None):
+        self.rng = rng or random
+
+    def choose_discard(self, gamestate: GameState, player: str) -> int:
+        return self.rng.randrange(len(gamestate.players[player]))
+
+
+class ShantenOpponent:
+    '''
+    Discards the tile that leaves the hand closest to winning (lowest shanten), choosing randomly between ties
+
+    Inputs:
+    rng: random number generator (default: the random module)
+    '''
+    def __init__(self, rng: random.Random = None):
+        self.rng = rng or random
+
+    def choose_discard(self, gamestate: GameState, player: str) -> int:
+        hand = gamestate.players[player]
+        counts = list(gamestate.hand_counts[player])
+
+        best_shanten = None
+        best_indices = []
+        seen = set()
+        for index, tile in enumerate(hand):
+            if tile.id in seen:
+                continue
+            seen.add(tile.id)
+
+            counts[tile.id] -= 1
+            tile_shanten = shanten(counts)
+            counts[tile.id] += 1
+
+            if best_shanten is None or tile_shanten < best_shanten:
+                best_shanten = tile_shanten
+                best_indices = [index]
+            elif tile_shanten == best_shanten:
+                best_indices.append(index)
+
+        return best_indices[self.rng.randrange(len(best_indices))]
+
+
+class ModelOpponent:
+    '''
+    Discards with a trained discard policy, e.g. a stable-baselines3 model loaded with PPO.load
+
+    Inputs:
+    model: object with a predict(observation, deterministic=...) method returning (action, state)
+    encoding: observation encoding the model was trained on ('vector' or 'planes')
+    action_mode: action mode the model was trained with ('index' or 'tile'); 'tile' models are given
+        action masks, so they must accept an action_masks argument (e.g. sb3-contrib's MaskablePPO)
+    deterministic: whether to take the most likely action instead of sampling
+    '''
+    def __init__(self, model, encoding: str = 'vector', action_mode: str = 'index', deterministic: bool = True):
+        self.model = model
+        self.encoding = encoding
+        self.action_mode = action_mode
+        self.deterministic = deterministic
+
+    def choose_discard(self, gamestate: GameState, player: str) -> int:
+        hand = gamestate.players[player]
+        observation = encode_observation(gamestate, player, encoding=self.encoding)
+
+        if self.action_mode == 'tile':
+            action_masks = [count > 0 for count in gamestate.hand_counts[player]]
+            action, _ = self.model.predict(observation, deterministic=self.deterministic, action_masks=action_masks)
+            tile_id = int(action)
+            for index, tile in enumerate(hand):
+                if tile.id == tile_id:
+                    return index
+            raise ValueError(f"Model chose tile id {tile_id}, which is not in {player}'s hand")
+
+        action, _ = self.model.predict(observation, deterministic=self.deterministic)
+        index = int(action)
+        if not 0 <= index < len(hand):
+            raise ValueError(f"Model chose hand index {index} for a hand of {len(hand)} tiles")
+        return index
@@ -2,37 +2,10 @@ from tile import Tile
 from gamestate import GameState
 from tile_utils import is_set, is_run, is_winning_hand, compute_score
 
-import logging
-from logging.handlers import RotatingFileHandler
-import os
-
-# Set up a dedicated logger for tile_utils
-logger = logging.getLogger("player_utils_logger")
-# level = logging.DEBUG # Set logging level
-level = logging.ERROR
-logger.setLevel(level)
-
-# Define handler with rotation settings
-handler = RotatingFileHandler('player_utils_logging.log', maxBytes=10*1024*1024, backupCount=5)
-handler.setLevel(level)  # Set logging level for this handler
-
-# Set log format
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-
-# Add handler to logger
-logger.addHandler(handler)
+from logging_config import get_logger
 
 # Logging
-logger = logging.getLogger("player_utils_logger")
-logger.setLevel(logging.INFO)
-
-log_file_path = "logs/player_utils_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+logger = get_logger("player_utils_logger", "player_utils_logging.log")
 
 
 def pon_possible(gamestate: GameState, tile: Tile, player: str) -> bool:
@@ -117,9 +90,7 @@ def gon(gamestate: GameState, tile: Tile, player: str) -> None:
 
     gamestate.add_tile_to_discard_pool(tile)
     gamestate.remove_tile_from_hand(tile, player)
-    last_tile = gamestate.draw_pool[-1]
-    gamestate.add_tile_to_hand(last_tile, player)
-    gamestate.draw_pool.pop()
+    gamestate.draw_tile_from_back(player)
 
     return
 
@@ -1,24 +1,64 @@
 import numpy as np
-from tile import Tile
-import torch
-from gamestate import GameState
+from tile import Tile, TILE_TYPES, NUM_TILE_TYPES, NUM_COPIES
+from gamestate import GameState, HAND_SORT_ORDER
 
-import logging
-from logging.handlers import RotatingFileHandler
-import os
+from logging_config import get_logger
 
 # Logging
-logger = logging.getLogger("preprocessing_logger")
-logger.setLevel(logging.INFO)
+logger = get_logger("preprocessing_logger", "preprocessing_logging.log")
 
-log_file_path = "logs/preprocessing_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
 
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+def __getattr__(name):
+    # torch is only needed by the functions returning tensors, so it is imported when they are first called
+    # (the numpy encoders load without it); preprocessing.torch still gives the module
+    if name == 'torch':
+        import torch
+        return torch
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 TILE_ENCODING_LEN = 19
+NUM_DIRECTIONS = 4
+
+# Row i is the one-hot suit/rank encoding of the tile with id i (see encode_tile);
+# the extra last row (BLANK_TILE) is all zeros and stands for unrevealed tiles
+BLANK_TILE = len(TILE_TYPES)
+TILE_ENCODING_TABLE = np.zeros((len(TILE_TYPES) + 1, TILE_ENCODING_LEN), dtype=np.int8)
+for _tile in TILE_TYPES:
+    TILE_ENCODING_TABLE[_tile.id, GameState.suit_to_idx[_tile.suit]] = 1
+    if _tile.rank is not None:
+        TILE_ENCODING_TABLE[_tile.id, len(GameState.suits) + GameState.rank_to_idx[_tile.rank]] = 1
+
+# Number of tiles encoded in an observation during play: the 14-tile hand, the discard pool and the draw pool
+# (every tile except the other three players' 13-tile hands)
+OBS_TILES = NUM_TILE_TYPES * NUM_COPIES - 3 * 13
+OBS_LENGTH = OBS_TILES * TILE_ENCODING_LEN + 2 * NUM_DIRECTIONS
+
+# Tile ids in the order GameState.sort_player_hand puts them
+SORTED_TILE_IDS = np.argsort(HAND_SORT_ORDER)
+
+# Observation encodings
+#   'vector': the hand and discard pool tile by tile, 19 one-hot values per tile (OBS_LENGTH = 1851 values)
+#   'planes': order-invariant count planes, 4 planes of 34 tile ids for the hand and 4 for the discard pool,
+#             where plane k is 1 for tile ids with more than k copies (PLANES_LENGTH = 280 values)
+# Both end with the macro and micro direction one-hots
+# Neither has planes for the other players' revealed melds: player_utils.pon/gon/eat move the called tile into the
+# caller's hand, but GameState does not record which of its tiles were revealed, so there is nothing to encode
+ENCODINGS = ('vector', 'planes')
+NUM_PLANES = 2 * NUM_COPIES
+PLANES_LENGTH = NUM_PLANES * NUM_TILE_TYPES + 2 * NUM_DIRECTIONS
+PLANE_THRESHOLDS = np.arange(NUM_COPIES)[:, None]
+
+
+def observation_length(encoding: str = 'vector') -> int:
+    '''
+    Returns the number of values in an observation during play for the given encoding (see ENCODINGS)
+    '''
+    if encoding == 'vector':
+        return OBS_LENGTH
+    if encoding == 'planes':
+        return PLANES_LENGTH
+    raise ValueError(f"Unknown observation encoding: {encoding}")
 
 def encode_tile(gamestate: GameState, tile: Tile) -> np.ndarray:
     '''
@@ -59,6 +99,7 @@ def encode_tile_batch(gamestate: GameState, tiles: list[Tile]):
     Returns:
     tile_encodings_tensor: a PyTorch tensor where each row is the encoding of a tile
     '''
+    import torch
     tile_encodings = np.array([encode_tile(gamestate, tile) for tile in tiles])
     tile_encodings_tensor = torch.from_numpy(tile_encodings).float()
     tile_encodings_tensor = torch.flatten(tile_encodings_tensor)
@@ -74,6 +115,7 @@ def encode_macro_direction(gamestate: GameState):
     Returns:
     macro_direction_encoding: a PyTorch tensor of 4 zeros/ones to represent the macro game direction
     '''
+    import torch
     macro_direction_encoding = np.zeros(4)
     macro_direction = gamestate.macro_direction[0]
 
@@ -91,6 +133,7 @@ def encode_micro_direction(gamestate: GameState):
     Returns:
     macro_direction_encoding: a numpy vector of 4 zeros/ones to represent the micro game direction
     '''
+    import torch
     micro_direction_encoding = np.zeros(4)
     micro_direction = gamestate.micro_direction[0]
 
@@ -99,7 +142,76 @@ def encode_micro_direction(gamestate: GameState):
     return micro_direction_tensor
 
 
-def prepare_input(gamestate: GameState, player: str):
+def encode_planes(gamestate: GameState, player: str, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Encodes the player's view of the game as count planes (the 'planes' encoding, see ENCODINGS)
+
+    Args:
+    gamestate: object of GameState class
+    player: 'player1', 'player2', etc.
+    out: optional preallocated array of PLANES_LENGTH (280) values to write into
+
+    Returns:
+    observation: out, or a new int8 numpy array if out is not given
+    '''
+    if out is None:
+        out = np.empty(PLANES_LENGTH, dtype=np.int8)
+    elif out.shape != (PLANES_LENGTH,):
+        raise ValueError(f"Output buffer has shape {out.shape}, expected ({PLANES_LENGTH},)")
+
+    counts = np.array([gamestate.hand_counts[player], gamestate.discard_counts], dtype=np.int8)
+    out[:NUM_PLANES * NUM_TILE_TYPES] = (counts[:, None, :] > PLANE_THRESHOLDS).reshape(-1)
+    out[NUM_PLANES * NUM_TILE_TYPES:] = 0
+    direction_start = NUM_PLANES * NUM_TILE_TYPES
+    out[direction_start + gamestate.macro_direction_to_idx[gamestate.macro_direction[0]]] = 1
+    out[direction_start + NUM_DIRECTIONS + gamestate.micro_direction_to_idx[gamestate.micro_direction[0]]] = 1
+    return out
+
+
+def encode_observation(gamestate: GameState, player: str, out: np.ndarray = None, encoding: str = 'vector') -> np.ndarray:
+    '''
+    Encodes the same information as prepare_input, in the same layout, directly into a numpy array
+
+    Args:
+    gamestate: object of GameState class
+    player: 'player1', 'player2', etc.
+    out: optional preallocated 1-D array to write into (any numeric dtype, e.g. int8 or float32);
+        it must have exactly the length of the encoding (1851 when the other players hold 13 tiles each)
+    encoding: 'vector' or 'planes' (see ENCODINGS)
+
+    Returns:
+    observation: out, or a new int8 numpy array if out is not given
+    '''
+    if encoding == 'planes':
+        return encode_planes(gamestate, player, out)
+    if encoding != 'vector':
+        raise ValueError(f"Unknown observation encoding: {encoding}")
+
+    hand = gamestate.players[player]
+    discard_pool = gamestate.discard_pool
+    num_revealed = len(hand) + len(discard_pool)
+    length = (num_revealed + len(gamestate.draw_pool)) * TILE_ENCODING_LEN + 2 * NUM_DIRECTIONS
+
+    if out is None:
+        out = np.zeros(length, dtype=np.int8)
+    elif out.shape != (length,):
+        raise ValueError(f"Output buffer has shape {out.shape}, expected ({length},)")
+    else:
+        out[num_revealed * TILE_ENCODING_LEN:] = 0
+
+    # 1) Tiles in player's hand and 2) tiles in discard pool (3) tiles in draw pool stay zeros because unrevealed)
+    tile_ids = [tile.id for tile in hand]
+    tile_ids.extend(tile.id for tile in discard_pool)
+    out[:num_revealed * TILE_ENCODING_LEN] = TILE_ENCODING_TABLE[tile_ids].reshape(-1)
+
+    # 4) Macro and 5) micro game direction
+    direction_start = length - 2 * NUM_DIRECTIONS
+    out[direction_start + gamestate.macro_direction_to_idx[gamestate.macro_direction[0]]] = 1
+    out[direction_start + NUM_DIRECTIONS + gamestate.micro_direction_to_idx[gamestate.micro_direction[0]]] = 1
+    return out
+
+
+def prepare_input(gamestate: GameState, player: str, out: 'torch.Tensor' = None, encoding: str = 'vector'):
     '''
     Compiles the following information to prepare for network input:
     1) Tiles in player's hand
@@ -111,53 +223,180 @@ def prepare_input(gamestate: GameState, player: str):
     Args:
     gamestate: object of GameState class
     player: 'player1', 'player2', etc.
+    out: optional preallocated float32 tensor to write into (see encode_observation)
+    encoding: 'vector' (the layout below) or 'planes' (280 count plane values, see ENCODINGS)
 
     Returns:
-    input_tensor: a PyTorch tensor with 2839 elements representing all information available to player
+    input_tensor: a PyTorch tensor with 1851 elements representing all information available to player
         Tiles in player's hand: 14*19 = 266
         Tiles in the draw/discard pool: (136 - 14 - 3*13)*19 = 1577
         Macro game direction: 4
         Micro game direction: 4
         266 + 1577 + 4 + 4 = 1851
     '''
-    logger.debug(f"player: {player}")
+    import torch
+    if out is None and encoding == 'vector':
+        out = torch.empty(
+            (len(gamestate.players[player]) + len(gamestate.discard_pool) + len(gamestate.draw_pool)) * TILE_ENCODING_LEN
+            + 2 * NUM_DIRECTIONS)
+    elif out is None:
+        out = torch.empty(observation_length(encoding))
+    encode_observation(gamestate, player, out.numpy(), encoding)
+
+    logger.debug("player: %s, size of input_tensor: %d", player, out.numel())
+    return out
+
+def counts_to_tile_ids(counts: np.ndarray, width: int = None) -> np.ndarray:
+    '''
+    Expands count vectors into tile ids in the order GameState.sort_player_hand puts them
 
-    # 1) Tiles in player's hand
-    tiles_in_hand_tensor = encode_tile_batch(gamestate, gamestate.players[player])
-    logger.debug(f"tiles_in_hand_tensor = \n{tiles_in_hand_tensor}")
-    logger.debug(f"size of tiles_in_hand_tensor: {tiles_in_hand_tensor.numel()}")
+    Args:
+    counts: (B, 34) array, the number of copies of each tile id in each hand
+    width: number of columns of the result (default: the largest hand)
 
-    # 2) Tiles in discard pool
-    if len(gamestate.discard_pool) == 0:
-        tiles_in_discard_pool_tensor = torch.empty(0)
-    elif len(gamestate.discard_pool) == 1:
-        tile_in_discard_pool_encoded = encode_tile(gamestate, gamestate.discard_pool[0])
-        tiles_in_discard_pool_tensor = torch.from_numpy(tile_in_discard_pool_encoded).float()
-    else:
-        tiles_in_discard_pool_tensor = encode_tile_batch(gamestate, gamestate.discard_pool)
-    logger.debug(f"tiles_in_discard_pool_tensor = \n{tiles_in_discard_pool_tensor}")
-    logger.debug(f"size of tiles_in_discard_pool_tensor: {tiles_in_discard_pool_tensor.numel()}")
+    Returns:
+    tile_ids: (B, width) array of tile ids, padded at the end with BLANK_TILE
+    '''
+    counts = np.asarray(counts)
+    num_rows = len(counts)
+    sizes = counts.sum(axis=1, dtype=np.intp)
+    if width is None:
+        width = int(sizes.max(initial=0))
+
+    tile_ids = np.full((num_rows, width), BLANK_TILE, dtype=np.intp)
+    rows = np.repeat(np.arange(num_rows), sizes)
+    columns = np.arange(len(rows)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    tile_ids[rows, columns] = np.repeat(np.tile(SORTED_TILE_IDS, num_rows), counts[:, SORTED_TILE_IDS].ravel())
+    return tile_ids
+
+
+def _encode_tile_ids_batch(tile_ids: np.ndarray, macro_directions, micro_directions, out: np.ndarray) -> np.ndarray:
+    # Encodes (B, num_tiles) tile ids (BLANK_TILE for hidden tiles) followed by the two direction one-hots
+    num_rows, num_tiles = tile_ids.shape
+    length = num_tiles * TILE_ENCODING_LEN + 2 * NUM_DIRECTIONS
+    if out is None:
+        out = np.empty((num_rows, length), dtype=np.int8)
+    elif out.shape != (num_rows, length):
+        raise ValueError(f"Output buffer has shape {out.shape}, expected ({num_rows}, {length})")
+
+    out[:, :num_tiles * TILE_ENCODING_LEN] = TILE_ENCODING_TABLE[tile_ids].reshape(num_rows, -1)
+    out[:, num_tiles * TILE_ENCODING_LEN:] = 0
+    direction_start = num_tiles * TILE_ENCODING_LEN
+    out[np.arange(num_rows), direction_start + np.asarray(macro_directions, dtype=np.intp)] = 1
+    out[np.arange(num_rows), direction_start + NUM_DIRECTIONS + np.asarray(micro_directions, dtype=np.intp)] = 1
+    return out
+
+
+def encode_observation_batch(discard_ids: np.ndarray, macro_directions, micro_directions, hand_ids: np.ndarray = None,
+                             hand_counts: np.ndarray = None, num_tiles: int = OBS_TILES, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Encodes B game states given as arrays, in the layout of encode_observation, without GameState objects
+
+    Args:
+    discard_ids: (B, D) tile ids of the discard pools in discard order, padded at the end with BLANK_TILE
+    macro_directions: (B,) indices of the macro directions (GameState.macro_direction_to_idx)
+    micro_directions: (B,) indices of the micro directions (GameState.micro_direction_to_idx)
+    hand_ids: (B, H) tile ids of the players' hands in hand order, padded at the end with BLANK_TILE
+    hand_counts: (B, 34) count vectors of the players' hands, encoded as sorted hands (instead of hand_ids)
+    num_tiles: number of tiles per observation, hidden draw pool included (97 during play)
+    out: optional preallocated (B, num_tiles * 19 + 8) array to write into
 
-    # 3) Tiles in draw pool (one-hot encoding of all zeros)
-    tiles_in_draw_pool_tensor = torch.zeros(len(gamestate.draw_pool) * TILE_ENCODING_LEN) # zeros because unrevealed
-    logger.debug(f"tiles_in_draw_pool_tensor = \n{tiles_in_draw_pool_tensor}")
-    logger.debug(f"size of tiles_in_draw_pool_tensor: {tiles_in_draw_pool_tensor.numel()}")
+    Returns:
+    observations: out, or a new (B, num_tiles * 19 + 8) int8 array
+    '''
+    if (hand_ids is None) == (hand_counts is None):
+        raise ValueError("Exactly one of hand_ids and hand_counts must be given")
+    if hand_ids is None:
+        hand_ids = counts_to_tile_ids(hand_counts)
+    hand_ids = np.asarray(hand_ids)
+    discard_ids = np.asarray(discard_ids)
+    num_rows = len(hand_ids)
+
+    # Hands followed directly by the discards, then hidden tiles
+    tile_ids = np.full((num_rows, num_tiles), BLANK_TILE, dtype=np.intp)
+    hand_sizes = (hand_ids != BLANK_TILE).sum(axis=1)
+    hand_width = min(hand_ids.shape[1], num_tiles)
+    tile_ids[:, :hand_width] = hand_ids[:, :hand_width]
+    discard_rows, discard_columns = np.nonzero(discard_ids != BLANK_TILE)
+    tile_columns = hand_sizes[discard_rows] + discard_columns
+    if len(tile_columns) and tile_columns.max() >= num_tiles:
+        raise ValueError(f"More than num_tiles={num_tiles} revealed tiles in an observation")
+    tile_ids[discard_rows, tile_columns] = discard_ids[discard_rows, discard_columns]
+
+    return _encode_tile_ids_batch(tile_ids, macro_directions, micro_directions, out)
+
+
+def encode_planes_batch(hand_counts: np.ndarray, discard_counts: np.ndarray, macro_directions, micro_directions,
+                        out: np.ndarray = None) -> np.ndarray:
+    '''
+    Encodes B game states given as count vectors in the 'planes' encoding (see ENCODINGS)
 
-    # 4) Macro game direction
-    macro_direction_tensor = encode_macro_direction(gamestate)
-    logger.debug(f"macro_direction_tensor = \n{macro_direction_tensor}")
-    logger.debug(f"size of macro_direction_tensor: {macro_direction_tensor.numel()}")
+    Args:
+    hand_counts: (B, 34) count vectors of the players' hands
+    discard_counts: (B, 34) count vectors of the discard pools
+    macro_directions: (B,) indices of the macro directions (GameState.macro_direction_to_idx)
+    micro_directions: (B,) indices of the micro directions (GameState.micro_direction_to_idx)
+    out: optional preallocated (B, 280) array to write into
 
-    # 5) Micro game direction
-    micro_direction_tensor = encode_micro_direction(gamestate)
-    logger.debug(f"micro_direction_tensor = \n{micro_direction_tensor}")
-    logger.debug(f"size of micro_direction_tensor: {micro_direction_tensor.numel()}")
+    Returns:
+    observations: out, or a new (B, 280) int8 array
+    '''
+    num_rows = len(hand_counts)
+    if out is None:
+        out = np.empty((num_rows, PLANES_LENGTH), dtype=np.int8)
+    elif out.shape != (num_rows, PLANES_LENGTH):
+        raise ValueError(f"Output buffer has shape {out.shape}, expected ({num_rows}, {PLANES_LENGTH})")
+
+    counts = np.stack([np.asarray(hand_counts), np.asarray(discard_counts)], axis=1)
+    out[:, :NUM_PLANES * NUM_TILE_TYPES] = (counts[:, :, None, :] > PLANE_THRESHOLDS).reshape(num_rows, -1)
+    out[:, NUM_PLANES * NUM_TILE_TYPES:] = 0
+    direction_start = NUM_PLANES * NUM_TILE_TYPES
+    out[np.arange(num_rows), direction_start + np.asarray(macro_directions, dtype=np.intp)] = 1
+    out[np.arange(num_rows), direction_start + NUM_DIRECTIONS + np.asarray(micro_directions, dtype=np.intp)] = 1
+    return out
+
+
+def prepare_input_batch(gamestates: list[GameState], players, out: np.ndarray = None, encoding: str = 'vector') -> np.ndarray:
+    '''
+    Encodes many game states at once, each in the layout of prepare_input
 
+    Args:
+    gamestates: list of B GameState objects (each with the same total number of tiles in hand, discard and draw pools)
+    players: the player to encode for, either one name for every game state or a list of B names
+    out: optional preallocated (B, 1851) array to write into (any numeric dtype, e.g. float32 for network input)
+    encoding: 'vector' or 'planes' (see ENCODINGS)
 
-    input_tensor = torch.hstack((tiles_in_hand_tensor, tiles_in_discard_pool_tensor, tiles_in_draw_pool_tensor, macro_direction_tensor, micro_direction_tensor))
-    logger.debug(f"size of input_tensor: {input_tensor.numel()}")
+    Returns:
+    observations: out, or a new (B, 1851) int8 numpy array ((B, 280) for 'planes')
+    '''
+    if isinstance(players, str):
+        players = [players] * len(gamestates)
+    if len(players) != len(gamestates):
+        raise ValueError(f"Got {len(players)} players for {len(gamestates)} game states")
+    if not gamestates:
+        return np.empty((0, observation_length(encoding)), dtype=np.int8) if out is None else out
+
+    macro_directions = [gamestate.macro_direction_to_idx[gamestate.macro_direction[0]] for gamestate in gamestates]
+    micro_directions = [gamestate.micro_direction_to_idx[gamestate.micro_direction[0]] for gamestate in gamestates]
+    if encoding == 'planes':
+        hand_counts = np.array([gamestate.hand_counts[player] for gamestate, player in zip(gamestates, players)], dtype=np.int8)
+        discard_counts = np.array([gamestate.discard_counts for gamestate in gamestates], dtype=np.int8)
+        return encode_planes_batch(hand_counts, discard_counts, macro_directions, micro_directions, out)
+    if encoding != 'vector':
+        raise ValueError(f"Unknown observation encoding: {encoding}")
+
+    num_tiles = len(gamestates[0].players[players[0]]) + len(gamestates[0].discard_pool) + len(gamestates[0].draw_pool)
+    tile_ids = np.full((len(gamestates), num_tiles), BLANK_TILE, dtype=np.intp)
+    for row, (gamestate, player) in enumerate(zip(gamestates, players)):
+        hand = gamestate.players[player]
+        discard_pool = gamestate.discard_pool
+        if len(hand) + len(discard_pool) + len(gamestate.draw_pool) != num_tiles:
+            raise ValueError(f"Game state {row} has a different number of tiles than game state 0")
+        tile_ids[row, :len(hand)] = [tile.id for tile in hand]
+        tile_ids[row, len(hand):len(hand) + len(discard_pool)] = [tile.id for tile in discard_pool]
+
+    return _encode_tile_ids_batch(tile_ids, macro_directions, micro_directions, out)
 
-    return input_tensor
 
 def decode_hand(gamestate: GameState, gamestate_tensor) -> list[Tile]:
     '''
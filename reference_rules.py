@@ -0,0 +1,183 @@
+import copy
+import itertools
+
+from gamestate import GameState
+from tile import Tile
+from tile_utils import is_set, is_run
+
+# Reference implementations of the original game rules, written the way the game first computed them
+# (walking tiles and groups one rule at a time). They are slow on purpose: the tests check the optimized
+# count-vector and table-driven versions against them, and benchmark.py times those versions against them.
+
+
+def reference_compute_reward(gamestate: GameState, player: str, action: int) -> float:
+    '''
+    The original MahjongEnv._compute_reward, which compares every triple of the hand before and after the discard
+    '''
+    discard_tile = gamestate.players[player][action]
+    discard_suit = discard_tile.suit
+    discard_rank = discard_tile.rank
+    
+    reward = 0.0
+
+    hand_14 = copy.deepcopy(gamestate.players[player])
+    hand_13 = copy.deepcopy(hand_14)
+    hand_13.pop(action)
+
+    # count number of sets/runs before discarding
+    groups = list(itertools.combinations(hand_14, 3))
+    valid_sets_14 = 0
+    valid_runs_14 = 0
+    for group in groups:
+        if is_set(group[0], group[1], group[2]):
+            valid_sets_14 += 1
+        elif is_run(group[0], group[1], group[2]):
+            valid_runs_14 += 1
+
+    # count number of sets/runs after discarding
+    groups = list(itertools.combinations(hand_13, 3))
+    valid_sets_13 = 0
+    valid_runs_13 = 0
+    for group in groups:
+        if is_set(group[0], group[1], group[2]):
+            valid_sets_13 += 1
+        elif is_run(group[0], group[1], group[2]):
+            valid_runs_13 += 1
+    
+    # penalize for breaking up a set/run
+    if valid_sets_14 > valid_sets_13:
+        reward -= 1.0
+    elif valid_runs_14 > valid_runs_13:
+        reward -= 1.0
+    
+    # colors - reward if unlikely/impossible to complete a color set
+    color_1_count_reward = 0.5
+    color_2plus_count_reward = 1.0
+
+    if discard_suit == 'red':
+        discard_count_red = sum(tile.suit == "red" for tile in gamestate.discard_pool)
+        if discard_count_red == 1:
+            reward += color_1_count_reward
+        elif discard_count_red >= 2:
+            reward += color_2plus_count_reward
+    elif discard_suit == 'green':
+        discard_count_green = sum(tile.suit == "green" for tile in gamestate.discard_pool)
+        if discard_count_green == 1:
+            reward += color_1_count_reward
+        elif discard_count_green >= 2:
+            reward += color_2plus_count_reward
+    elif discard_suit == 'white':
+        discard_count_white = sum(tile.suit == "white" for tile in gamestate.discard_pool)
+        if discard_count_white == 1:
+            reward += color_1_count_reward
+        elif discard_count_white >= 2:
+            reward += color_2plus_count_reward
+
+    # directions - reward if unlikely/impossible to complete a direction set
+    macro_direction = gamestate.macro_direction
+    micro_direction = gamestate.micro_direction
+
+    macro_1_count_reward = 0.5
+    macro_2plus_count_reward = 1.0
+
+    micro_1_count_reward = 0.5
+    micro_2plus_count_reward = 1.0
+
+    if discard_suit == macro_direction:
+        discard_count_macro_direction = sum(tile.suit == macro_direction for tile in gamestate.discard_pool)
+        if discard_count_macro_direction == 1:
+            reward += macro_1_count_reward
+        elif discard_count_macro_direction >= 2:
+            reward += macro_2plus_count_reward
+    elif discard_suit == micro_direction:
+        discard_count_micro_direction = sum(tile.suit == micro_direction for tile in gamestate.discard_pool)
+        if discard_count_micro_direction == 1:
+            reward += micro_1_count_reward
+        elif discard_count_micro_direction >= 2:
+            reward += micro_2plus_count_reward
+
+    # potential sets: penalize for discarding if you already have another copy of the same tile
+    same_tile_count = sum(tile.suit == discard_suit and tile.rank == discard_rank for tile in hand_13)
+    if same_tile_count > 0:
+        reward -= 0.5
+
+    # boundary tiles: penalize 1 and 9 tiles since they're less flexible for making runs
+    if discard_rank == 1 or discard_rank == 9:
+        reward -= 0.1
+
+    return reward
+
+
+def reference_score_grouped_hand(grouped_hand: tuple[tuple[Tile, ...], ...], macro_direction: str, micro_direction: str) -> int:
+    '''
+    The original tile_utils.compute_score walk over a winning hand's groups, one README scoring rule at a time
+
+    Two changes from the original: a hand whose only ranked group is its double gets no all sets/all runs bonus
+    (the original indexed an empty list), and the direction checks no longer stop at the first matching set,
+    so a double of directions always scores 2 as the README states
+
+    Inputs:
+    grouped_hand - the winning hand grouped into sets/runs and a double (see tile_utils.is_winning_hand)
+    macro_direction - global game direction (e.g. 'east')
+    micro_direction - direction of the player holding the hand (e.g. 'south')
+
+    Returns:
+    score - integer representing the score of the hand
+    '''
+    # Initialize score - a winning hand has a base value of 2 points
+    score = 2
+
+    rank_suits = ['stick', 'circle', '10k']
+    color_suits = ['red', 'green', 'white']
+    direction_suits = ['east', 'south', 'west', 'north']
+
+    # Score check 1 - add 3 points if all tiles with ranks are of the same suit
+    suit = None
+    num_groups = 0
+    count = 0
+    for group in grouped_hand:
+        if group[0].suit in rank_suits:
+            num_groups += 1
+            suit = group[0].suit
+    if suit != None:
+        for group in grouped_hand:
+            if group[0].suit == suit:
+                count += 1
+    if count == num_groups:
+        score += 3
+
+    # Score check 2 - add 3 points if all groups with ranks are sets, or 1 point if they are all runs
+    sets_runs = []
+    for group in grouped_hand:
+        if len(group) != 2 and group[0].suit in rank_suits:
+            if is_set(*group):
+                sets_runs.append('set')
+            else:
+                sets_runs.append('run')
+    if sets_runs and all(x == sets_runs[0] for x in sets_runs):
+        if sets_runs[0] == 'set':
+            score += 3
+        else:
+            score += 1
+
+    # Score check 3 - add 1 point for each set of colors
+    for group in grouped_hand:
+        if group[0].suit in color_suits:
+            if len(group) == 2:
+                return 2
+            score += 1
+
+    # Score check 4 - add 1 point for a set of the macro direction
+    for group in grouped_hand:
+        if group[0].suit in direction_suits:
+            if len(group) == 2:
+                return 2
+            if group[0].suit == macro_direction:
+                score += 1
+
+    # Score check 5 - add 1 point for a set of the micro direction
+    for group in grouped_hand:
+        if group[0].suit in direction_suits and group[0].suit == micro_direction:
+            score += 1
+
+    return score
@@ -0,0 +1,106 @@
+import numpy as np
+
+from tile import TILE_TYPES, NUM_TILE_TYPES, NUM_RANKED_TYPES
+
+# Rewards for discarding a tile from a 14-tile hand
+# (computed from count vectors: the number of copies of each tile id in the hand and in the discard pool)
+BREAK_GROUP_PENALTY = 1.0       # the discard breaks up a set or run in hand
+COLOR_1_COUNT_REWARD = 0.5      # a color tile with 1 copy already discarded
+COLOR_2PLUS_COUNT_REWARD = 1.0  # a color tile with 2+ copies already discarded
+DUPLICATE_PENALTY = 0.5         # another copy of the tile stays in hand (potential set)
+TERMINAL_PENALTY = 0.1          # 1 and 9 tiles are less flexible for making runs
+
+# Per tile id flags
+IS_COLOR = tuple(tile.suit in ('red', 'green', 'white') for tile in TILE_TYPES)
+IS_TERMINAL = tuple(tile.rank in (1, 9) for tile in TILE_TYPES)
+
+# For each tile id, the other two tiles of each of the (up to three) runs containing it
+RUN_PARTNERS = [[] for _ in range(NUM_TILE_TYPES)]
+for _low in range(NUM_RANKED_TYPES):
+    if _low % 9 <= 6:
+        for _tile_id in range(_low, _low + 3):
+            RUN_PARTNERS[_tile_id].append(tuple(other for other in range(_low, _low + 3) if other != _tile_id))
+RUN_PARTNERS = tuple(tuple(partners) for partners in RUN_PARTNERS)
+
+# The same tables as arrays for discard_rewards; runs are padded with tile id 34, an always-empty slot
+IS_COLOR_ARRAY = np.array(IS_COLOR)
+IS_TERMINAL_ARRAY = np.array(IS_TERMINAL)
+RUN_PARTNERS_ARRAY = np.array([list(partners) + [(NUM_TILE_TYPES, NUM_TILE_TYPES)] * (3 - len(partners))
+                               for partners in RUN_PARTNERS], dtype=np.intp)
+
+
+def discard_reward(hand_counts, discard_counts, tile_id: int) -> float:
+    '''
+    Computes the reward for discarding a tile in constant time
+
+    The terms are those of the original MahjongEnv reward, which compared every triple of the hand before and after
+    the discard: the number of sets drops exactly when the tile is held 3+ times, and the number of runs drops exactly
+    when the tile completes a run with two other tiles in hand. The original direction term compared the tile's suit
+    with the direction lists, so it never applied, and it is not included.
+
+    Inputs:
+    hand_counts: 34 counts of each tile id in the player's 14-tile hand, the discarded tile included
+    discard_counts: 34 counts of each tile id in the discard pool, before the discard
+    tile_id: id of the discarded tile
+
+    Returns:
+    reward: reward value
+    '''
+    reward = 0.0
+    count = hand_counts[tile_id]
+
+    # penalize for breaking up a set/run
+    if count >= 3 or any(hand_counts[first] and hand_counts[second] for first, second in RUN_PARTNERS[tile_id]):
+        reward -= BREAK_GROUP_PENALTY
+
+    # colors - reward if unlikely/impossible to complete a color set
+    if IS_COLOR[tile_id]:
+        if discard_counts[tile_id] == 1:
+            reward += COLOR_1_COUNT_REWARD
+        elif discard_counts[tile_id] >= 2:
+            reward += COLOR_2PLUS_COUNT_REWARD
+
+    # potential sets: penalize for discarding if you already have another copy of the same tile
+    if count > 1:
+        reward -= DUPLICATE_PENALTY
+
+    # boundary tiles: penalize 1 and 9 tiles since they're less flexible for making runs
+    if IS_TERMINAL[tile_id]:
+        reward -= TERMINAL_PENALTY
+
+    return reward
+
+
+def discard_rewards(hand_counts: np.ndarray, discard_counts: np.ndarray, tile_ids: np.ndarray) -> np.ndarray:
+    '''
+    Vectorized discard_reward over a batch of hands
+
+    Inputs:
+    hand_counts: (N, 34) counts of each tile id in the players' 14-tile hands
+    discard_counts: (N, 34) counts of each tile id in the discard pools
+    tile_ids: (N,) ids of the discarded tiles
+
+    Returns:
+    rewards: (N,) float32 reward values
+    '''
+    rows = np.arange(len(tile_ids))
+    counts = hand_counts[rows, tile_ids]
+    rewards = np.zeros(len(tile_ids), dtype=np.float32)
+
+    # penalize for breaking up a set/run
+    padded_hands = np.concatenate([hand_counts, np.zeros((len(tile_ids), 1), dtype=hand_counts.dtype)], axis=1)
+    breaks_run = (padded_hands[rows[:, None, None], RUN_PARTNERS_ARRAY[tile_ids]] > 0).all(axis=2).any(axis=1)
+    rewards -= np.float32(BREAK_GROUP_PENALTY) * ((counts >= 3) | breaks_run)
+
+    # colors - reward if unlikely/impossible to complete a color set
+    color_discards = np.where(IS_COLOR_ARRAY[tile_ids], discard_counts[rows, tile_ids], 0)
+    rewards += np.where(color_discards >= 2, COLOR_2PLUS_COUNT_REWARD,
+                        np.where(color_discards == 1, COLOR_1_COUNT_REWARD, 0.0)).astype(np.float32)
+
+    # potential sets: penalize for discarding if you already have another copy of the same tile
+    rewards -= np.float32(DUPLICATE_PENALTY) * (counts > 1)
+
+    # boundary tiles: penalize 1 and 9 tiles since they're less flexible for making runs
+    rewards -= np.float32(TERMINAL_PENALTY) * IS_TERMINAL_ARRAY[tile_ids]
+
+    return rewards
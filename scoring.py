@@ -0,0 +1,140 @@
+from hand_counts import NUM_TILE_TYPES, NUM_RANKED_TYPES, HONOR_SUITS, SET, RUN, QUAD, PAIR
+from suit_table import enumerate_decompositions
+
+# Tile type indices of the honor tiles (see hand_counts)
+COLOR_INDICES = range(NUM_RANKED_TYPES, NUM_RANKED_TYPES + 3)
+DIRECTIONS = ('east', 'south', 'west', 'north')
+DIRECTION_TO_INDEX = {suit: NUM_RANKED_TYPES + HONOR_SUITS.index(suit) for suit in DIRECTIONS}
+NUM_GROUPS = (PAIR + 1) * NUM_TILE_TYPES
+
+# Scores are computed from two lookups per group (see README for the rules):
+#   GROUP_MASKS - bits describing the group, OR-ed together over the hand
+#       bits 0-2: suit of a ranked group or double, bit 3: ranked set (or quad), bit 4: ranked run, bit 5: honor double
+#   GROUP_POINTS[macro_direction][micro_direction] - points the group adds on its own
+#       (1 for a set of colors, 1 each for a set of the macro direction and of the micro direction; quads count as sets)
+# and one lookup of the combined mask in MASK_SCORES (the base value with the flush and all sets/all runs bonuses)
+RANKED_SET_BIT = 1 << 3
+RANKED_RUN_BIT = 1 << 4
+HONOR_DOUBLE_BIT = 1 << 5
+HONOR_DOUBLE_SCORE = 2
+
+GROUP_MASKS = [0] * NUM_GROUPS
+for _group in range(NUM_GROUPS):
+    _kind, _index = divmod(_group, NUM_TILE_TYPES)
+    if _index >= NUM_RANKED_TYPES:
+        GROUP_MASKS[_group] = HONOR_DOUBLE_BIT if _kind == PAIR else 0
+    elif _kind == PAIR:
+        GROUP_MASKS[_group] = 1 << (_index // 9)
+    else:
+        GROUP_MASKS[_group] = (1 << (_index // 9)) | (RANKED_RUN_BIT if _kind == RUN else RANKED_SET_BIT)
+GROUP_MASKS = tuple(GROUP_MASKS)
+
+GROUP_POINTS = {}
+for _macro_direction in DIRECTIONS:
+    GROUP_POINTS[_macro_direction] = {}
+    for _micro_direction in DIRECTIONS:
+        _points = [0] * NUM_GROUPS
+        for _kind in (SET, QUAD):
+            for _index in COLOR_INDICES:
+                _points[_kind * NUM_TILE_TYPES + _index] += 1
+            _points[_kind * NUM_TILE_TYPES + DIRECTION_TO_INDEX[_macro_direction]] += 1
+            _points[_kind * NUM_TILE_TYPES + DIRECTION_TO_INDEX[_micro_direction]] += 1
+        GROUP_POINTS[_macro_direction][_micro_direction] = tuple(_points)
+
+MASK_SCORES = [0] * (HONOR_DOUBLE_BIT << 1)
+for _mask in range(len(MASK_SCORES)):
+    # A winning hand has a base value of 2 points
+    _score = 2
+    # Add 3 points if all tiles with ranks are of the same suit
+    if (_mask & 0b111) in (1, 2, 4):
+        _score += 3
+    # Add 3 points if all groups with ranks are sets, or 1 point if they are all runs
+    if _mask & (RANKED_SET_BIT | RANKED_RUN_BIT) == RANKED_SET_BIT:
+        _score += 3
+    elif _mask & (RANKED_SET_BIT | RANKED_RUN_BIT) == RANKED_RUN_BIT:
+        _score += 1
+    MASK_SCORES[_mask] = _score
+MASK_SCORES = tuple(MASK_SCORES)
+
+# numpy versions of the tables for score_decompositions, built on first use (the game core does not need numpy)
+_score_arrays = None
+
+
+def score_decomposition(groups: tuple[int, ...], macro_direction: str, micro_direction: str) -> int:
+    '''
+    Computes the score of a winning hand decomposed into sets/runs/quads and a double (see README)
+
+    Args:
+    groups: encoded groups of a winning hand (see hand_counts)
+    macro_direction: global game direction (e.g. 'east')
+    micro_direction: direction of the player holding the hand (e.g. 'south')
+
+    Returns:
+    score - integer representing the score of the hand
+    '''
+    group_points = GROUP_POINTS[macro_direction][micro_direction]
+    mask = 0
+    points = 0
+    for group in groups:
+        mask |= GROUP_MASKS[group]
+        points += group_points[group]
+
+    # A double of colors or directions is only ever worth the minimum score
+    if mask & HONOR_DOUBLE_BIT:
+        return HONOR_DOUBLE_SCORE
+    return MASK_SCORES[mask] + points
+
+
+def _get_score_arrays():
+    global _score_arrays
+    if _score_arrays is None:
+        import numpy as np
+        group_points = np.array([[GROUP_POINTS[macro_direction][micro_direction] for micro_direction in DIRECTIONS]
+                                 for macro_direction in DIRECTIONS], dtype=np.int64)
+        _score_arrays = (np.array(GROUP_MASKS, dtype=np.int64), group_points, np.array(MASK_SCORES, dtype=np.int64))
+    return _score_arrays
+
+
+def score_decompositions(groups, macro_directions, micro_directions):
+    '''
+    Vectorized score_decomposition over a batch of winning hands
+
+    Args:
+    groups: (N, 5) integer array of encoded groups, one decomposition per row (see hand_counts)
+    macro_directions: (N,) indices in DIRECTIONS of the global game direction, or a single index for every row
+    micro_directions: (N,) indices in DIRECTIONS of the directions of the players holding the hands, or a single index
+
+    Returns:
+    scores - (N,) int64 array of scores
+    '''
+    import numpy as np
+    group_masks, group_points, mask_scores = _get_score_arrays()
+
+    groups = np.asarray(groups)
+    masks = np.bitwise_or.reduce(group_masks[groups], axis=1)
+    rows = np.broadcast_to(np.asarray(macro_directions) * len(DIRECTIONS) + np.asarray(micro_directions), groups.shape[:1])
+    points = group_points.reshape(-1, NUM_GROUPS)[rows[:, None], groups].sum(axis=1)
+    return np.where(masks & HONOR_DOUBLE_BIT, HONOR_DOUBLE_SCORE, mask_scores[masks] + points)
+
+
+def best_decomposition(counts: list[int], macro_direction: str, micro_direction: str) -> tuple[int, tuple[int, ...] | None]:
+    '''
+    Finds the highest scoring decomposition of a hand
+
+    Args:
+    counts: 34-slot count vector (see hand_counts.hand_to_counts)
+    macro_direction: global game direction (e.g. 'east')
+    micro_direction: direction of the player holding the hand (e.g. 'south')
+
+    Returns:
+    score - score of the best decomposition (0 if the hand is not a winning hand)
+    groups - encoded groups of the best decomposition (None if the hand is not a winning hand)
+    '''
+    best_score = 0
+    best_groups = None
+    for groups in enumerate_decompositions(counts):
+        score = score_decomposition(groups, macro_direction, micro_direction)
+        if score > best_score:
+            best_score = score
+            best_groups = groups
+    return best_score, best_groups
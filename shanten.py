@@ -0,0 +1,282 @@
+from functools import lru_cache
+
+from hand_counts import hand_to_counts, NUM_TILE_TYPES
+
+# Shanten is the number of tiles a hand is away from being ready to win (0 = one tile away, -1 = winning hand)
+# For a hand of melds (sets/runs), partial melds (two tiles that need one more to become a meld), and a double:
+#   shanten = 8 - 2 * melds - partial_melds - double
+# where melds + partial_melds may not exceed 4 (a winning hand has four sets/runs and one double)
+#
+# Each suit is reduced to a "block vector": for each choice of taking the double from the suit (0 or 1)
+# and each number of blocks (melds + partial melds) the suit may use (0-4), the best value of
+# 2 * melds + partial_melds. Block vectors are interned as small integers and cached by suit pattern,
+# so once the caches are warm a hand's shanten is one lookup per suit plus one for the combination.
+MAX_BLOCKS = 4
+IMPOSSIBLE = -100
+
+_vectors = []
+_vector_ids = {}
+_ranked_cache = {}
+_honor_cache = {}
+_combine_cache = {}
+_shanten_cache = {}
+
+# Suit of each tile type (0-2 ranked suits, 3 honors) and the slice of the count vector holding that suit
+TILE_SUITS = tuple(min(index // 9, 3) for index in range(NUM_TILE_TYPES))
+SUIT_SLICES = ((0, 9), (9, 18), (18, 27), (27, 34))
+
+
+def _intern(vector: tuple[int, ...]) -> int:
+    vector_id = _vector_ids.get(vector)
+    if vector_id is None:
+        vector_id = len(_vectors)
+        _vectors.append(vector)
+        _vector_ids[vector] = vector_id
+    return vector_id
+
+
+@lru_cache(maxsize=None)
+def _blocks(pattern: tuple[int, ...], ranked: bool) -> frozenset[tuple[int, int, int]]:
+    '''
+    Recursively enumerates every way of splitting a suit pattern into blocks
+
+    Args:
+    pattern: counts of each tile of the suit (9 ranks, or one entry per honor tile)
+    ranked: whether runs and partial runs are possible
+
+    Returns:
+    frozenset of (melds, partial_melds, double) tuples
+    '''
+    index = 0
+    while index < len(pattern) and pattern[index] == 0:
+        index += 1
+    if index == len(pattern):
+        return frozenset([(0, 0, 0)])
+
+    def remove(*indices):
+        counts = list(pattern)
+        for i in indices:
+            counts[i] -= 1
+        return tuple(counts)
+
+    options = []
+    # Leave one copy of the tile unused
+    options.append((remove(index), 0, 0, 0))
+    if pattern[index] >= 2:
+        options.append((remove(index, index), 0, 1, 0))
+        options.append((remove(index, index), 0, 0, 1))
+    if pattern[index] >= 3:
+        options.append((remove(index, index, index), 1, 0, 0))
+    if ranked:
+        if index + 1 < len(pattern) and pattern[index + 1] > 0:
+            options.append((remove(index, index + 1), 0, 1, 0))
+        if index + 2 < len(pattern) and pattern[index + 2] > 0:
+            options.append((remove(index, index + 2), 0, 1, 0))
+            if pattern[index + 1] > 0:
+                options.append((remove(index, index + 1, index + 2), 1, 0, 0))
+
+    results = set()
+    for remaining, melds, partial_melds, double in options:
+        for sub_melds, sub_partial_melds, sub_double in _blocks(remaining, ranked):
+            if double and sub_double:
+                continue
+            results.add((melds + sub_melds, partial_melds + sub_partial_melds, double + sub_double))
+    return frozenset(results)
+
+
+def _block_vector(pattern: tuple[int, ...], ranked: bool) -> int:
+    '''
+    Computes the interned block vector of a suit pattern
+    '''
+    vector = [IMPOSSIBLE] * (2 * (MAX_BLOCKS + 1))
+    for melds, partial_melds, double in _blocks(pattern, ranked):
+        for max_blocks in range(MAX_BLOCKS + 1):
+            used_melds = min(melds, max_blocks)
+            value = 2 * used_melds + min(partial_melds, max_blocks - used_melds)
+            slot = double * (MAX_BLOCKS + 1) + max_blocks
+            if value > vector[slot]:
+                vector[slot] = value
+    return _intern(tuple(vector))
+
+
+def _combine(first_id: int, second_id: int) -> int:
+    '''
+    Combines the block vectors of two disjoint groups of tiles
+    '''
+    key = (first_id, second_id)
+    combined_id = _combine_cache.get(key)
+    if combined_id is not None:
+        return combined_id
+
+    first = _vectors[first_id]
+    second = _vectors[second_id]
+    vector = [IMPOSSIBLE] * (2 * (MAX_BLOCKS + 1))
+    for first_double in range(2):
+        for second_double in range(2 - first_double):
+            double = first_double + second_double
+            for first_blocks in range(MAX_BLOCKS + 1):
+                first_value = first[first_double * (MAX_BLOCKS + 1) + first_blocks]
+                if first_value == IMPOSSIBLE:
+                    continue
+                for second_blocks in range(MAX_BLOCKS + 1 - first_blocks):
+                    second_value = second[second_double * (MAX_BLOCKS + 1) + second_blocks]
+                    if second_value == IMPOSSIBLE:
+                        continue
+                    slot = double * (MAX_BLOCKS + 1) + first_blocks + second_blocks
+                    if first_value + second_value > vector[slot]:
+                        vector[slot] = first_value + second_value
+    # Allowing more blocks can never lower the value
+    for double in range(2):
+        for max_blocks in range(1, MAX_BLOCKS + 1):
+            slot = double * (MAX_BLOCKS + 1) + max_blocks
+            vector[slot] = max(vector[slot], vector[slot - 1])
+
+    combined_id = _intern(tuple(vector))
+    _combine_cache[key] = combined_id
+    return combined_id
+
+
+def _ranked_vector(pattern: bytes) -> int:
+    vector_id = _ranked_cache.get(pattern)
+    if vector_id is None:
+        vector_id = _block_vector(tuple(pattern), True)
+        _ranked_cache[pattern] = vector_id
+    return vector_id
+
+
+def _honor_vector(pattern: bytes) -> int:
+    vector_id = _honor_cache.get(pattern)
+    if vector_id is None:
+        # Honor tiles are interchangeable for shanten purposes, so their pattern is order independent
+        vector_id = _block_vector(tuple(sorted(pattern, reverse=True)), False)
+        _honor_cache[pattern] = vector_id
+    return vector_id
+
+
+def _vector_shanten(vector_id: int) -> int:
+    vector = _vectors[vector_id]
+    return 8 - max(vector[MAX_BLOCKS], vector[2 * MAX_BLOCKS + 1] + 1)
+
+
+def _suit_vector(suit: int, pattern: bytes) -> int:
+    '''
+    Returns the interned block vector of one suit of a hand (pattern is the bytes of the whole count vector)
+    '''
+    start, end = SUIT_SLICES[suit]
+    if suit == 3:
+        return _honor_vector(bytes(pattern[start:end]))
+    return _ranked_vector(bytes(pattern[start:end]))
+
+
+def _suits_shanten(stick_id: int, circle_id: int, tenk_id: int, honor_id: int) -> int:
+    key = (stick_id, circle_id, tenk_id, honor_id)
+    value = _shanten_cache.get(key)
+    if value is None:
+        value = _vector_shanten(_combine(_combine(_combine(stick_id, circle_id), tenk_id), honor_id))
+        _shanten_cache[key] = value
+    return value
+
+
+def shanten(counts: list[int]) -> int:
+    '''
+    Computes the shanten number of a 13-tile or 14-tile hand
+
+    Args:
+    counts: 34-slot count vector (see hand_counts.hand_to_counts)
+
+    Returns:
+    shanten: number of tiles away from being ready to win (0 = ready, -1 = winning hand)
+    '''
+    pattern = bytes(counts)
+    stick_id = _ranked_cache.get(pattern[0:9])
+    if stick_id is None:
+        stick_id = _ranked_vector(pattern[0:9])
+    circle_id = _ranked_cache.get(pattern[9:18])
+    if circle_id is None:
+        circle_id = _ranked_vector(pattern[9:18])
+    tenk_id = _ranked_cache.get(pattern[18:27])
+    if tenk_id is None:
+        tenk_id = _ranked_vector(pattern[18:27])
+    honor_id = _honor_cache.get(pattern[27:34])
+    if honor_id is None:
+        honor_id = _honor_vector(pattern[27:34])
+
+    return _suits_shanten(stick_id, circle_id, tenk_id, honor_id)
+
+
+def ukeire(counts: list[int], visible_counts: list[int] | None = None) -> dict[int, tuple[int, dict[int, int]]]:
+    '''
+    For each possible discard from a 14-tile hand, finds the tile types that would improve the hand
+    (lower its shanten, or complete it when it is ready) and how many live copies of each remain;
+    tile types with no live copies left cannot be drawn and are left out
+
+    The block vectors of the three suits untouched by a discard/draw pair are reused, so each candidate
+    only recomputes the one or two suits that change
+
+    Args:
+    counts: 34-slot count vector of the hand (see hand_counts.hand_to_counts)
+    visible_counts: 34-slot count vector of tiles visible outside the hand (e.g. the discard pool)
+
+    Returns:
+    dictionary mapping each tile type that can be discarded to (shanten after the discard, {tile type: live copies})
+    '''
+    hand = bytearray(counts)
+    suit_ids = [_suit_vector(suit, hand) for suit in range(4)]
+
+    live = [4 - count for count in counts]
+    if visible_counts is not None:
+        live = [max(copies - visible, 0) for copies, visible in zip(live, visible_counts)]
+
+    # Block vector of each drawn tile's suit when the discard comes from a different suit
+    draw_ids = [None] * NUM_TILE_TYPES
+    for draw in range(NUM_TILE_TYPES):
+        # All four copies of the tile are already accounted for by the hand
+        if counts[draw] < 4:
+            hand[draw] += 1
+            draw_ids[draw] = _suit_vector(TILE_SUITS[draw], hand)
+            hand[draw] -= 1
+
+    results = {}
+    for discard in range(NUM_TILE_TYPES):
+        if hand[discard] == 0:
+            continue
+        discard_suit = TILE_SUITS[discard]
+        hand[discard] -= 1
+        discard_ids = list(suit_ids)
+        discard_ids[discard_suit] = _suit_vector(discard_suit, hand)
+        current = _suits_shanten(*discard_ids)
+
+        improving_tiles = {}
+        for draw in range(NUM_TILE_TYPES):
+            if draw_ids[draw] is None or live[draw] == 0:
+                continue
+            draw_suit = TILE_SUITS[draw]
+            if draw_suit == discard_suit:
+                hand[draw] += 1
+                suit_id = _suit_vector(draw_suit, hand)
+                hand[draw] -= 1
+            else:
+                suit_id = draw_ids[draw]
+            candidate_ids = list(discard_ids)
+            candidate_ids[draw_suit] = suit_id
+            if _suits_shanten(*candidate_ids) < current:
+                improving_tiles[draw] = live[draw]
+
+        hand[discard] += 1
+        results[discard] = (current, improving_tiles)
+
+    return results
+
+
+def player_ukeire(gamestate, player: str) -> dict[int, tuple[int, dict[int, int]]]:
+    '''
+    Computes ukeire (see ukeire) for a player's hand, counting the discard pool as visible tiles
+
+    Args:
+    gamestate: object of GameState class
+    player: 'player1', 'player2', etc.
+
+    Returns:
+    dictionary mapping each tile type that can be discarded to (shanten after the discard, {tile type: live copies})
+    '''
+    return ukeire(hand_to_counts(gamestate.players[player]), hand_to_counts(gamestate.discard_pool))
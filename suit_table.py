@@ -0,0 +1,225 @@
+import itertools
+import os
+import pickle
+import time
+
+from hand_counts import NUM_TILE_TYPES, NUM_RANKED_TYPES, SET, RUN, QUAD, PAIR, NUM_WINNING_GROUPS
+
+# Lookup table of every legal tile pattern within a single ranked suit
+#   key - bytes of the 9 rank counts of the suit (e.g. b'\x03\x01\x01\x01\x00...')
+#   value - tuple of every decomposition of the pattern into sets/runs/quads and at most one double (stored last)
+# A pattern can have decompositions with different numbers of groups (e.g. three quads or four runs),
+# so the number of groups in the whole hand is only checked once the suits are combined
+# Groups are stored relative to the first tile of the suit, so adding the suit offset
+# (0 for stick, 9 for circle, 18 for 10k) gives the encoded group used by hand_counts
+SUIT_TABLE_VERSION = 2
+SUIT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables', 'suit_table.pkl')
+
+RANK_SUIT_OFFSETS = (0, 9, 18)
+
+_suit_table = None
+
+
+def build_suit_table() -> dict[bytes, tuple[tuple[int, ...], ...]]:
+    '''
+    Enumerates every combination of up to four sets/runs/quads and at most one double within a ranked suit
+
+    Returns:
+    table: dictionary mapping each legal 9-rank count pattern to all of its decompositions
+    '''
+    melds = ([SET * NUM_TILE_TYPES + rank for rank in range(9)]
+             + [RUN * NUM_TILE_TYPES + rank for rank in range(7)]
+             + [QUAD * NUM_TILE_TYPES + rank for rank in range(9)])
+    doubles = [None] + [PAIR * NUM_TILE_TYPES + rank for rank in range(9)]
+
+    table = {}
+    for num_melds in range(NUM_WINNING_GROUPS + 1):
+        for meld_combination in itertools.combinations_with_replacement(melds, num_melds):
+            for double in doubles:
+                groups = meld_combination if double is None else meld_combination + (double,)
+
+                pattern = [0] * 9
+                for group in groups:
+                    kind, rank = divmod(group, NUM_TILE_TYPES)
+                    if kind == RUN:
+                        pattern[rank] += 1
+                        pattern[rank + 1] += 1
+                        pattern[rank + 2] += 1
+                    elif kind == SET:
+                        pattern[rank] += 3
+                    elif kind == QUAD:
+                        pattern[rank] += 4
+                    else:
+                        pattern[rank] += 2
+
+                if max(pattern) > 4:
+                    continue
+                table.setdefault(bytes(pattern), []).append(groups)
+
+    return {pattern: tuple(decompositions) for pattern, decompositions in table.items()}
+
+
+def save_suit_table(table: dict, path: str = SUIT_TABLE_PATH) -> None:
+    '''
+    Writes the suit table to disk
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump({'version': SUIT_TABLE_VERSION, 'table': table}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_suit_table(path: str = SUIT_TABLE_PATH) -> dict:
+    '''
+    Loads the suit table from disk, building and saving it first if it does not exist or is outdated
+    '''
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            stored = pickle.load(f)
+        if stored.get('version') == SUIT_TABLE_VERSION:
+            return stored['table']
+
+    table = build_suit_table()
+    try:
+        save_suit_table(table, path)
+    except OSError:
+        # The table can always be rebuilt, so a read-only location is not an error
+        pass
+    return table
+
+
+def get_suit_table() -> dict:
+    '''
+    Returns the suit table, loading it on first use
+    '''
+    global _suit_table
+    if _suit_table is None:
+        _suit_table = load_suit_table()
+    return _suit_table
+
+
+def find_decomposition(counts: list[int]) -> list[int] | None:
+    '''
+    Decomposes a hand into four sets/runs/quads and a single double using one table lookup per suit
+
+    Args:
+    counts: 34-slot count vector (see hand_counts.hand_to_counts)
+
+    Returns:
+    groups: list of encoded groups with the double last, or None if the hand is not a winning hand
+    '''
+    for groups in enumerate_decompositions(counts):
+        return list(groups)
+    return None
+
+
+def is_winning_counts(counts: list[int]) -> bool:
+    '''
+    Checks whether a 34-slot count vector forms a winning hand
+    '''
+    return find_decomposition(counts) is not None
+
+
+def waiting_tiles(counts: list[int]) -> frozenset[int]:
+    '''
+    Finds every tile that would complete a hand
+
+    A drawn tile only changes its own suit, so every other suit must already be a legal pattern;
+    when two or more suits are not, the hand cannot win on the next draw and no tile is tried
+
+    Args:
+    counts: 34-slot count vector of a hand one tile short of winning (13 tiles, plus one for each quad)
+
+    Returns:
+    waits: tile type indices that make the hand a winning hand when added
+    '''
+    table = _suit_table if _suit_table is not None else get_suit_table()
+
+    candidates = None
+    for offset in RANK_SUIT_OFFSETS:
+        if bytes(counts[offset:offset + 9]) not in table:
+            if candidates is not None:
+                return frozenset()
+            candidates = range(offset, offset + 9)
+    for index in range(NUM_RANKED_TYPES, NUM_TILE_TYPES):
+        if counts[index] == 1:
+            if candidates is not None and candidates.start < NUM_RANKED_TYPES:
+                return frozenset()
+            candidates = range(NUM_RANKED_TYPES, NUM_TILE_TYPES)
+    if candidates is None:
+        candidates = range(NUM_TILE_TYPES)
+
+    waits = []
+    counts = list(counts)
+    for index in candidates:
+        if counts[index] < 4:
+            counts[index] += 1
+            if find_decomposition(counts) is not None:
+                waits.append(index)
+            counts[index] -= 1
+    return frozenset(waits)
+
+
+def enumerate_decompositions(counts: list[int]):
+    '''
+    Enumerates every decomposition of a hand into four sets/runs/quads and a single double
+
+    The suit table holds every decomposition of each ranked suit, so the decompositions
+    of the whole hand are the product of the per-suit entries (honor tiles only ever have one)
+
+    Args:
+    counts: 34-slot count vector (see hand_counts.hand_to_counts)
+
+    Yields:
+    groups: tuple of encoded groups with the double last
+    '''
+    table = _suit_table if _suit_table is not None else get_suit_table()
+
+    suit_options = []
+    for offset in RANK_SUIT_OFFSETS:
+        decompositions = table.get(bytes(counts[offset:offset + 9]))
+        if decompositions is None:
+            return
+        suit_options.append(decompositions)
+
+    honor_groups = []
+    num_honor_doubles = 0
+    for index in range(NUM_RANKED_TYPES, NUM_TILE_TYPES):
+        count = counts[index]
+        if count == 3:
+            honor_groups.append(SET * NUM_TILE_TYPES + index)
+        elif count == 4:
+            honor_groups.append(QUAD * NUM_TILE_TYPES + index)
+        elif count == 2:
+            honor_groups.append(PAIR * NUM_TILE_TYPES + index)
+            num_honor_doubles += 1
+        elif count != 0:
+            return
+
+    if num_honor_doubles > 1:
+        return
+
+    for suit_groups in itertools.product(*suit_options):
+        groups = [group + offset for offset, groups in zip(RANK_SUIT_OFFSETS, suit_groups) for group in groups]
+        groups += honor_groups
+        if len(groups) != NUM_WINNING_GROUPS + 1:
+            continue
+
+        # Move the double to the end, keeping the order of the other groups; there is
+        # exactly one double when only the last group is one
+        groups.sort(key=lambda group: group >= PAIR * NUM_TILE_TYPES)
+        if groups[-1] < PAIR * NUM_TILE_TYPES or groups[-2] >= PAIR * NUM_TILE_TYPES:
+            continue
+        yield tuple(groups)
+
+
+if __name__ == '__main__':
+    start_time = time.perf_counter()
+    table = build_suit_table()
+    save_suit_table(table)
+    elapsed_time = time.perf_counter() - start_time
+    print(f"Built {len(table)} suit patterns in {elapsed_time:.2f} s and saved to {SUIT_TABLE_PATH}")
+
+    start_time = time.perf_counter()
+    load_suit_table()
+    elapsed_time = time.perf_counter() - start_time
+    print(f"Loaded suit table in {elapsed_time * 1000:.1f} ms")
@@ -0,0 +1,169 @@
+import random
+import unittest
+from gamestate import GameState, Wall, Tile
+from hand_counts import hand_to_counts
+
+class TestGameState(unittest.TestCase):
+    def test_deal_tiles(self):
+        '''
+        Test that dealing leaves 14 tiles for player 1, 13 tiles for the other players, and 83 tiles in the draw pool
+        '''
+        gamestate = GameState()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+
+        self.assertEqual(gamestate.count('player1'), 14)
+        for player in ['player2', 'player3', 'player4']:
+            self.assertEqual(gamestate.count(player), 13)
+        self.assertEqual(gamestate.count('draw_pool'), 136 - 14 - 3*13)
+
+
+    def test_counts_in_sync(self):
+        '''
+        Test that the hand and discard pool count vectors match the tile lists after a game of random draws and discards
+        '''
+        random.seed(0)
+        gamestate = GameState()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+
+        players = list(gamestate.players)
+        turn = 0
+        while len(gamestate.draw_pool) > 0:
+            player = players[turn % 4]
+            if turn > 0:
+                gamestate.draw_tile(player)
+            discard_tile = random.choice(gamestate.players[player])
+            gamestate.remove_tile_from_hand(discard_tile, player)
+            gamestate.add_tile_to_discard_pool(discard_tile)
+            turn += 1
+
+        for player in players:
+            self.assertEqual(gamestate.hand_counts[player], hand_to_counts(gamestate.players[player]))
+        self.assertEqual(gamestate.discard_counts, hand_to_counts(gamestate.discard_pool))
+
+        gamestate.clear_hand('player1')
+        self.assertEqual(sum(gamestate.hand_counts['player1']), 0)
+
+
+    def test_draw_from_front_and_back(self):
+        '''
+        Test that draw_tile takes the first tile of the draw pool and draw_tile_from_back takes the last
+        '''
+        gamestate = GameState()
+        player = 'player1'
+        for tile in [Tile('stick', 1), Tile('circle', 2), Tile('red')]:
+            gamestate.add_tile_to_draw_pool(tile)
+
+        self.assertEqual(gamestate.draw_tile(player), Tile('stick', 1))
+        self.assertEqual(gamestate.draw_tile_from_back(player), Tile('red'))
+        self.assertEqual(list(gamestate.draw_pool), [Tile('circle', 2)])
+        self.assertEqual(gamestate.players[player], [Tile('stick', 1), Tile('red')])
+
+
+    def test_remove_missing_tile(self):
+        '''
+        Test that removing a tile that is not in a hand or pool raises a ValueError
+        '''
+        gamestate = GameState()
+        gamestate.add_tile_to_draw_pool(Tile('stick', 1))
+        gamestate.add_tile_to_discard_pool(Tile('stick', 2))
+
+        with self.assertRaises(ValueError):
+            gamestate.remove_tile_from_hand(Tile('stick', 1), 'player1')
+        with self.assertRaises(ValueError):
+            gamestate.remove_tile_from_draw_pool(Tile('stick', 2))
+        with self.assertRaises(ValueError):
+            gamestate.remove_tile_from_discard_pool(Tile('stick', 3))
+
+
+    def test_clone_is_independent(self):
+        '''
+        Test that a clone matches the original game and that playing the clone forward leaves the original unchanged
+        '''
+        random.seed(1)
+        gamestate = GameState()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+        gamestate.randomize_macro_direction()
+        before = gamestate.snapshot()
+
+        clone = gamestate.clone()
+        self.assertEqual(clone.snapshot(), before)
+
+        discard_tile = clone.players['player1'][0]
+        clone.remove_tile_from_hand(discard_tile, 'player1')
+        clone.add_tile_to_discard_pool(discard_tile)
+        clone.draw_tile('player2')
+        clone.draw_tile_from_back('player3')
+        clone.step_macro_direction()
+        clone.player_points[0] -= 1
+
+        self.assertEqual(gamestate.snapshot(), before)
+        self.assertNotEqual(clone.snapshot(), before)
+
+
+    def test_snapshot_restore(self):
+        '''
+        Test that restoring a snapshot undoes every change made since it was taken, and can be repeated
+        '''
+        random.seed(2)
+        gamestate = GameState()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+        snapshot = gamestate.snapshot()
+        hands = {player: list(hand) for player, hand in gamestate.players.items()}
+        draw_pool = list(gamestate.draw_pool)
+
+        for _ in range(2):
+            for player in gamestate.players:
+                gamestate.draw_tile(player)
+                discard_tile = gamestate.players[player][0]
+                gamestate.remove_tile_from_hand(discard_tile, player)
+                gamestate.add_tile_to_discard_pool(discard_tile)
+            gamestate.step_micro_direction()
+            gamestate.restore(snapshot)
+
+            self.assertEqual(gamestate.players, hands)
+            self.assertEqual(list(gamestate.draw_pool), draw_pool)
+            self.assertEqual(gamestate.discard_pool, [])
+            self.assertEqual(gamestate.discard_counts, [0] * 34)
+            self.assertEqual(gamestate.micro_direction, ['east', 'south', 'west', 'north'])
+            for player in gamestate.players:
+                self.assertEqual(gamestate.hand_counts[player], hand_to_counts(gamestate.players[player]))
+
+
+class TestWall(unittest.TestCase):
+    def test_list_operations(self):
+        '''
+        Test that the wall supports the list operations used on the draw pool
+        '''
+        tiles = [Tile('stick', 1), Tile('stick', 2), Tile('stick', 3), Tile('east')]
+        wall = Wall()
+        for tile in tiles:
+            wall.append(tile)
+
+        self.assertEqual(len(wall), 4)
+        self.assertEqual(wall[0], Tile('stick', 1))
+        self.assertEqual(wall[-1], Tile('east'))
+        self.assertEqual(list(wall), tiles)
+        self.assertIn(Tile('stick', 3), wall)
+        self.assertNotIn(Tile('west'), wall)
+
+        # Remove from the front, the middle, and the back
+        wall.remove(Tile('stick', 1))
+        wall.remove(Tile('stick', 3))
+        self.assertEqual(wall.pop(), Tile('east'))
+        self.assertEqual(list(wall), [Tile('stick', 2)])
+
+        # Appending after drawing from the back reuses the freed slot
+        wall.append(Tile('north'))
+        self.assertEqual(list(wall), [Tile('stick', 2), Tile('north')])
+
+        with self.assertRaises(ValueError):
+            wall.remove(Tile('west'))
+        with self.assertRaises(IndexError):
+            wall[2]
+
+if __name__ == '__main__':
+    unittest.main()
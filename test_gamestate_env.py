@@ -0,0 +1,84 @@
+import random
+import unittest
+import numpy as np
+from gamestate_env import MahjongEnv
+from preprocessing import prepare_input, TILE_ENCODING_TABLE
+
+class TestMahjongEnv(unittest.TestCase):
+    def test_incremental_observations(self):
+        '''
+        Test that observations patched in place match a full prepare_input on every step of several games
+        '''
+        random.seed(0)
+        env = MahjongEnv(check_obs=True)
+        for _ in range(5):
+            observation, _ = env.reset()
+            self.assertTrue(np.array_equal(observation, prepare_input(env.state, env.player).numpy()))
+
+            done = False
+            while not done:
+                observation, _, terminated, truncated, _ = env.step(random.randrange(14))
+                done = terminated or truncated
+                self.assertEqual(observation.shape, env.observation_space.shape)
+                if len(env.state.players[env.player]) == 14:
+                    self.assertTrue(np.array_equal(observation, prepare_input(env.state, env.player).numpy()))
+
+
+    def test_step_returns_next_observation(self):
+        '''
+        Test that step returns the observation after the discard, not the one the action was chosen from
+        '''
+        random.seed(1)
+        env = MahjongEnv()
+        observation, _ = env.reset()
+        discarded_tile = env.state.players[env.player][0]
+
+        next_observation, _, _, _, _ = env.step(0)
+        self.assertFalse(np.array_equal(observation, next_observation))
+        self.assertIs(env.state.discard_pool[0], discarded_tile)
+        self.assertTrue(np.array_equal(next_observation[14 * 19:15 * 19], TILE_ENCODING_TABLE[discarded_tile.id]))
+
+        # The returned observation is a copy of the live buffer
+        env.step(0)
+        self.assertTrue(np.array_equal(next_observation[14 * 19:15 * 19], TILE_ENCODING_TABLE[discarded_tile.id]))
+
+
+    def test_tile_actions(self):
+        '''
+        Test that tile actions discard a copy of the chosen tile id, that the mask allows exactly the tiles in hand,
+        and that illegal actions are rejected
+        '''
+        random.seed(2)
+        env = MahjongEnv(action_mode='tile')
+        self.assertEqual(env.action_space.n, 34)
+        env.reset()
+
+        for _ in range(10):
+            masks = env.action_masks()
+            self.assertEqual(masks.shape, (34,))
+            self.assertEqual(set(np.nonzero(masks)[0]), {tile.id for tile in env.state.players['player1']})
+
+            tile_id = random.choice(np.nonzero(masks)[0].tolist())
+            num_discards = len(env.state.discard_pool)
+            _, _, terminated, truncated, _ = env.step(tile_id)
+            self.assertEqual(env.state.discard_pool[num_discards].id, tile_id)
+            if terminated or truncated:
+                break
+
+        illegal = next(tile_id for tile_id in range(34) if not env.action_masks()[tile_id])
+        with self.assertRaises(ValueError):
+            env.step(illegal)
+
+
+    def test_index_action_masks(self):
+        '''
+        Test that every hand position is legal while the agent holds 14 tiles and out of range positions are rejected
+        '''
+        env = MahjongEnv()
+        env.reset()
+        self.assertTrue(env.action_masks().all())
+        with self.assertRaises(ValueError):
+            env.step(14)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from generate_training_data import play_rounds, generate, GAMESTATE_TENSOR_LEN
+
+def dump_winner_history(db_path: str) -> list[tuple]:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT * FROM winner_history ORDER BY id').fetchall()
+    conn.close()
+    return rows
+
+class TestGenerateTrainingData(unittest.TestCase):
+    def test_round_is_reproducible(self):
+        '''
+        Test that a round is replayed identically from the base seed and round index
+        (round 1160 of base seed 0 has a winner)
+        '''
+        results = play_rounds((0, 1160, 1))
+        self.assertEqual(len(results), 1)
+
+        round_index, player, score, winner_history = results[0]
+        self.assertEqual(round_index, 1160)
+        self.assertGreater(score, 0)
+        self.assertEqual(winner_history.shape[1], GAMESTATE_TENSOR_LEN)
+
+        replayed = play_rounds((0, 1160, 1))[0]
+        self.assertEqual(replayed[:3], results[0][:3])
+        self.assertTrue(np.array_equal(replayed[3], winner_history))
+
+
+    def test_output_independent_of_workers(self):
+        '''
+        Test that the database contents are the same whether rounds are played in one process or split across workers
+        '''
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            single_path = os.path.join(tmp_dir, 'single.db')
+            parallel_path = os.path.join(tmp_dir, 'parallel.db')
+
+            generate(6, single_path, num_workers=1, base_seed=3, chunk_size=2)
+            generate(6, parallel_path, num_workers=2, base_seed=3, chunk_size=2)
+
+            self.assertEqual(dump_winner_history(single_path), dump_winner_history(parallel_path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import multiprocessing
+import random
+import unittest
+from gamestate import GameState
+from hand_cache import HandCache, get_hand_cache
+from hand_counts import NUM_TILE_TYPES
+from scoring import best_decomposition
+from suit_table import find_decomposition
+from tile_utils import compute_score, is_winning_hand
+
+
+def child_stats(_) -> dict:
+    return get_hand_cache().stats()
+
+
+class TestHandCache(unittest.TestCase):
+    def test_lookup(self):
+        '''
+        Test that cached results match scoring the hand directly, that repeated hands are hits,
+        and that hands with an illegal ranked suit are rejected without being stored
+        '''
+        rng = random.Random(0)
+        wall = [index for index in range(NUM_TILE_TYPES) for _ in range(4)]
+        hands = []
+        for _ in range(200):
+            counts = [0] * NUM_TILE_TYPES
+            for index in rng.sample(wall, 14):
+                counts[index] += 1
+            hands.append(counts)
+
+        # Winning hands, and the same hands with one tile swapped for an honor tile (mostly not winning)
+        while len(hands) < 400:
+            counts = [0] * NUM_TILE_TYPES
+            for _ in range(4):
+                low = rng.randrange(NUM_TILE_TYPES)
+                if low < 27 and low % 9 <= 6 and rng.random() < 0.5:
+                    for index in range(low, low + 3):
+                        counts[index] += 1
+                else:
+                    counts[low] += 3
+            counts[rng.randrange(NUM_TILE_TYPES)] += 2
+            if max(counts) <= 4:
+                hands.append(counts)
+                swapped = counts[:]
+                swapped[rng.choice([index for index in range(NUM_TILE_TYPES) if counts[index]])] -= 1
+                swapped[rng.randrange(27, NUM_TILE_TYPES)] += 1
+                hands.append(swapped)
+
+        # 1-1-1, 2-2-2, 3-3-3 stick (three sets or three runs), red-red-red, 9-9 stick
+        winning = [0] * NUM_TILE_TYPES
+        winning[0:3] = [3, 3, 3]
+        winning[8] = 2
+        winning[27] = 3
+        hands.append(winning)
+
+        cache = HandCache()
+        for _ in range(2):
+            for counts in hands:
+                for macro_direction, micro_direction in (('east', 'east'), ('south', 'north')):
+                    score, groups = best_decomposition(counts, macro_direction, micro_direction)
+                    self.assertEqual(cache.lookup(counts, macro_direction, micro_direction),
+                                     (find_decomposition(counts) is not None, groups, score))
+
+        self.assertEqual(cache.lookup(winning, 'east', 'east')[2], 9)
+        stats = cache.stats()
+        self.assertGreater(stats['misses'], 200)
+        self.assertGreater(stats['rejects'], 200)
+        self.assertEqual(stats['hits'], stats['misses'] + 1)
+        self.assertEqual(stats['hits'] + stats['misses'] + stats['rejects'], 4 * len(hands) + 1)
+        self.assertEqual(stats['entries'], stats['misses'])
+
+
+    def test_eviction(self):
+        '''
+        Test that the least recently used hand is evicted when the cache is full
+        '''
+        hands = [[0] * NUM_TILE_TYPES for _ in range(3)]
+        for index, counts in enumerate(hands):
+            counts[27 + index] = 2
+
+        cache = HandCache(max_entries=2)
+        cache.lookup(hands[0], 'east', 'east')
+        cache.lookup(hands[1], 'east', 'east')
+        cache.lookup(hands[0], 'east', 'east')
+        cache.lookup(hands[2], 'east', 'east')
+        self.assertEqual(len(cache), 2)
+
+        cache.reset_stats()
+        cache.lookup(hands[0], 'east', 'east')
+        cache.lookup(hands[1], 'east', 'east')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        with self.assertRaises(ValueError):
+            HandCache(max_entries=0)
+
+
+    def test_tile_utils_cache(self):
+        '''
+        Test that is_winning_hand and compute_score give the same results with and without a cache
+        '''
+        random.seed(3)
+        cache = HandCache()
+        for _ in range(100):
+            gamestate = GameState()
+            gamestate.randomize_macro_direction()
+            gamestate.randomize_micro_direction()
+            gamestate.initialize_draw_pool()
+            gamestate.deal_tiles()
+            self.assertEqual(compute_score(gamestate, 'player1', cache=cache), compute_score(gamestate, 'player1'))
+            self.assertEqual(is_winning_hand(gamestate, 'player1', cache=cache)[0], is_winning_hand(gamestate, 'player1')[0])
+
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "requires the fork start method")
+    def test_forked_workers(self):
+        '''
+        Test that forked workers inherit the cached entries with their own statistics starting from zero
+        '''
+        cache = get_hand_cache()
+        counts = [0] * NUM_TILE_TYPES
+        counts[27] = 2
+        cache.lookup(counts, 'east', 'east')
+        cache.lookup(counts, 'east', 'east')
+        self.assertGreater(cache.hits, 0)
+
+        with multiprocessing.get_context('fork').Pool(1) as pool:
+            stats = pool.map(child_stats, [None])[0]
+        self.assertEqual((stats['hits'], stats['misses']), (0, 0))
+        self.assertEqual(stats['entries'], len(cache))
+
+if __name__ == '__main__':
+    unittest.main()
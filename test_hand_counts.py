@@ -0,0 +1,217 @@
+import os
+import tempfile
+import unittest
+from hand_counts import tile_to_index, index_to_tile, hand_to_counts, group_to_indices, Tile, NUM_TILE_TYPES, QUAD
+import random
+from suit_table import find_decomposition, is_winning_counts, enumerate_decompositions, build_suit_table, load_suit_table, waiting_tiles
+
+class TestHandCounts(unittest.TestCase):
+    def test_tile_index_round_trip(self):
+        '''
+        Test that every tile type index converts to a Tile and back to the same index
+        '''
+        for index in range(NUM_TILE_TYPES):
+            self.assertEqual(tile_to_index(index_to_tile(index)), index)
+
+
+    def test_hand_to_counts(self):
+        '''
+        Test that hand_to_counts counts the copies of each tile type
+        '''
+        hand = [Tile('stick', 1), Tile('stick', 1), Tile('10k', 9), Tile('north')]
+        counts = hand_to_counts(hand)
+
+        self.assertEqual(sum(counts), 4)
+        self.assertEqual(counts[tile_to_index(Tile('stick', 1))], 2)
+        self.assertEqual(counts[tile_to_index(Tile('10k', 9))], 1)
+        self.assertEqual(counts[tile_to_index(Tile('north'))], 1)
+
+
+    def test_find_decomposition_true(self):
+        '''
+        Test that a winning hand decomposes into four sets/runs followed by a double
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 1), Tile('stick', 1), Tile('stick', 1),
+            Tile('stick', 2), Tile('stick', 3),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('stick', 9), Tile('stick', 9), Tile('stick', 9),
+            Tile('stick', 4), Tile('stick', 4)
+        ]
+        counts = hand_to_counts(hand)
+        groups = find_decomposition(counts)
+
+        self.assertIsNotNone(groups)
+        self.assertEqual(len(groups), 5)
+        self.assertEqual(len(group_to_indices(groups[-1])), 2)
+
+        used = [0] * NUM_TILE_TYPES
+        for group in groups:
+            for index in group_to_indices(group):
+                used[index] += 1
+        self.assertEqual(used, counts)
+
+
+    def test_find_decomposition_false(self):
+        '''
+        Test that a hand with no valid double is not a winning hand
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('east'), Tile('east'), Tile('east'),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('stick', 9), Tile('stick', 9), Tile('stick', 9),
+            Tile('circle', 4), Tile('circle', 3)
+        ]
+        self.assertIsNone(find_decomposition(hand_to_counts(hand)))
+
+
+    def test_runs_do_not_cross_suits(self):
+        '''
+        Test that 8 stick, 9 stick, 1 circle is not treated as a run
+        '''
+        hand = [
+            Tile('stick', 8), Tile('stick', 9), Tile('circle', 1),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('10k', 1), Tile('10k', 2), Tile('10k', 3),
+            Tile('10k', 4), Tile('10k', 5), Tile('10k', 6),
+            Tile('west'), Tile('west')
+        ]
+        self.assertFalse(is_winning_counts(hand_to_counts(hand)))
+
+
+    def test_honors_do_not_form_runs(self):
+        '''
+        Test that consecutive honor tiles (east, south, west) are not treated as a run
+        '''
+        hand = [
+            Tile('east'), Tile('south'), Tile('west'),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('10k', 1), Tile('10k', 2), Tile('10k', 3),
+            Tile('10k', 4), Tile('10k', 5), Tile('10k', 6),
+            Tile('north'), Tile('north')
+        ]
+        self.assertFalse(is_winning_counts(hand_to_counts(hand)))
+
+
+    def test_wrong_hand_size(self):
+        '''
+        Test that a 13-tile hand is never a winning hand
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('10k', 1), Tile('10k', 2), Tile('10k', 3),
+            Tile('10k', 4), Tile('10k', 5), Tile('10k', 6),
+            Tile('north')
+        ]
+        self.assertFalse(is_winning_counts(hand_to_counts(hand)))
+
+
+class TestSuitTable(unittest.TestCase):
+    def test_all_decompositions_stored(self):
+        '''
+        Test that a suit pattern with more than one decomposition stores all of them
+        (1 1 1 2 2 2 3 3 3 can be three sets or three identical runs)
+        '''
+        table = build_suit_table()
+        decompositions = table[bytes([3, 3, 3, 0, 0, 0, 0, 0, 0])]
+        self.assertEqual(len(decompositions), 2)
+
+
+    def test_quad_decompositions(self):
+        '''
+        Test that sets of four are stored as quads, including patterns that can also be split into sets/runs
+        (1 1 1 1 2 2 2 2 3 3 3 3 can be three quads, four identical runs, or three sets and a run)
+        '''
+        table = build_suit_table()
+        self.assertEqual(table[bytes([4, 0, 0, 0, 0, 0, 0, 0, 0])], ((QUAD * NUM_TILE_TYPES,),))
+        decompositions = table[bytes([4, 4, 4, 0, 0, 0, 0, 0, 0])]
+        self.assertEqual(len(decompositions), 3)
+        self.assertIn((QUAD * NUM_TILE_TYPES, QUAD * NUM_TILE_TYPES + 1, QUAD * NUM_TILE_TYPES + 2), decompositions)
+
+
+    def test_illegal_pattern_missing(self):
+        '''
+        Test that a suit pattern that cannot be split into sets/runs and a double is not in the table
+        '''
+        table = build_suit_table()
+        self.assertNotIn(bytes([1, 1, 0, 0, 0, 0, 0, 0, 0]), table)
+        self.assertNotIn(bytes([2, 0, 0, 0, 2, 0, 0, 0, 0]), table)
+
+
+    def test_save_and_load(self):
+        '''
+        Test that the suit table is built and saved on first load and read back from disk afterwards
+        '''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'suit_table.pkl')
+            table = load_suit_table(path)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(load_suit_table(path), table)
+
+
+    def test_enumerate_decompositions(self):
+        '''
+        Test that every decomposition of a hand is enumerated
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('green'), Tile('green'), Tile('green'),
+            Tile('10k', 9), Tile('10k', 9)
+        ]
+        decompositions = list(enumerate_decompositions(hand_to_counts(hand)))
+
+        self.assertEqual(len(decompositions), 2)
+        self.assertEqual(len(set(decompositions)), 2)
+        for groups in decompositions:
+            self.assertEqual(len(group_to_indices(groups[-1])), 2)
+
+
+    def test_waiting_tiles(self):
+        '''
+        Test that the tiles completing a 13-tile hand match adding every tile type and checking for a win
+        '''
+        # 1-2-3 stick, 1-1-1 circle, 8-8-8 stick, red-red-red, 4 circle: waits on 4 circle only
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('circle', 1), Tile('circle', 1), Tile('circle', 1),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('circle', 4)
+        ]
+        self.assertEqual(waiting_tiles(hand_to_counts(hand)), {tile_to_index(Tile('circle', 4))})
+
+        rng = random.Random(0)
+        wall = [index for index in range(NUM_TILE_TYPES) for _ in range(4)]
+        hands = [hand_to_counts(hand)]
+        for _ in range(1000):
+            counts = [0] * NUM_TILE_TYPES
+            for index in rng.sample(wall, 13):
+                counts[index] += 1
+            hands.append(counts)
+
+        # Random winning hands with one tile removed, so that most have waits
+        while len(hands) < 1300:
+            counts = [0] * NUM_TILE_TYPES
+            for _ in range(4):
+                low = rng.randrange(NUM_TILE_TYPES)
+                if low < 27 and low % 9 <= 6 and rng.random() < 0.5:
+                    for index in range(low, low + 3):
+                        counts[index] += 1
+                else:
+                    counts[low] += 3
+            counts[rng.randrange(NUM_TILE_TYPES)] += 2
+            if max(counts) <= 4:
+                counts[rng.choice([index for index in range(NUM_TILE_TYPES) if counts[index]])] -= 1
+                hands.append(counts)
+
+        for counts in hands:
+            expected = {index for index in range(NUM_TILE_TYPES) if counts[index] < 4
+                        and is_winning_counts(counts[:index] + [counts[index] + 1] + counts[index + 1:])}
+            self.assertEqual(waiting_tiles(counts), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import logging
+import os
+import tempfile
+import unittest
+import logging_config
+from logging_config import get_logger, configure_logging, get_logging_mode
+
+class TestLoggingConfig(unittest.TestCase):
+    def setUp(self):
+        self.original_mode = get_logging_mode()
+        self.original_log_dir = logging_config.LOG_DIR
+        self.log_dir = tempfile.TemporaryDirectory()
+        logging_config.LOG_DIR = self.log_dir.name
+
+    def tearDown(self):
+        logging_config._loggers.pop("test_logging_config_logger", None)
+        logger = logging.getLogger("test_logging_config_logger")
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        logging_config.LOG_DIR = self.original_log_dir
+        configure_logging(self.original_mode)
+        self.log_dir.cleanup()
+
+
+    def test_performance_mode(self):
+        '''
+        Test that no handlers are attached in performance mode and that debug/info calls are disabled
+        '''
+        configure_logging('performance')
+        logger = get_logger("test_logging_config_logger", "test_logging_config.log", logging.DEBUG)
+        self.assertEqual(logger.handlers, [])
+        self.assertFalse(logger.isEnabledFor(logging.DEBUG))
+        self.assertFalse(logger.isEnabledFor(logging.INFO))
+        self.assertTrue(logger.isEnabledFor(logging.WARNING))
+
+        logger.info("not written")
+        self.assertFalse(os.path.exists(os.path.join(self.log_dir.name, "test_logging_config.log")))
+
+
+    def test_switch_modes(self):
+        '''
+        Test that configure_logging reconfigures existing loggers without duplicating their handlers
+        '''
+        configure_logging('default')
+        logger = get_logger("test_logging_config_logger", "test_logging_config.log", logging.DEBUG)
+        get_logger("test_logging_config_logger", "test_logging_config.log", logging.DEBUG)
+        self.assertEqual(len(logger.handlers), 1)
+        self.assertTrue(logger.isEnabledFor(logging.DEBUG))
+
+        configure_logging('performance')
+        self.assertEqual(logger.handlers, [])
+        self.assertFalse(logger.isEnabledFor(logging.DEBUG))
+
+        configure_logging('default')
+        self.assertEqual(len(logger.handlers), 1)
+        logger.debug("written")
+        logger.handlers[0].flush()
+        with open(os.path.join(self.log_dir.name, "test_logging_config.log")) as f:
+            self.assertIn("written", f.read())
+
+        with self.assertRaises(ValueError):
+            configure_logging('verbose')
+
+
+    def test_file_created_on_first_message(self):
+        '''
+        Test that the log file is only created, and cleared, when the first message is written
+        '''
+        configure_logging('default')
+        log_file_path = os.path.join(self.log_dir.name, "test_logging_config.log")
+        with open(log_file_path, "w") as f:
+            f.write("previous run\n")
+
+        logger = get_logger("test_logging_config_logger", "test_logging_config.log", logging.DEBUG, clear=True)
+        with open(log_file_path) as f:
+            self.assertEqual(f.read(), "previous run\n")
+
+        logger.debug("first message")
+        logger.handlers[0].flush()
+        with open(log_file_path) as f:
+            contents = f.read()
+        self.assertNotIn("previous run", contents)
+        self.assertIn("first message", contents)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import torch
+from migrate_training_data import migrate
+from training_data_utils import create_winner_history_table, load_winner_history, GAMESTATE_BLOB_MAGIC
+
+class TestMigrateTrainingData(unittest.TestCase):
+    def test_migrate_legacy_database(self):
+        '''
+        Test that migrating a database of raw float32 blobs bit-packs every row, keeps the tensors,
+        shrinks the file, and leaves nothing to do on a second run
+        '''
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'legacy.db')
+            conn = sqlite3.connect(db_path)
+            create_winner_history_table(conn)
+
+            histories = {game_id: (torch.rand((5, 1851)) < 0.05).float() for game_id in range(1, 21)}
+            for game_id, history in histories.items():
+                for turn, gamestate_tensor in enumerate(history):
+                    conn.execute("INSERT INTO winner_history (game_id, player, turn, gamestate_tensor, final_score) VALUES (?, ?, ?, ?, ?)",
+                                 (game_id, 'player1', turn, gamestate_tensor.numpy().tobytes(), 3))
+            conn.commit()
+            conn.close()
+            legacy_size = os.path.getsize(db_path)
+
+            self.assertEqual(migrate(db_path, batch_size=7), 100)
+            self.assertEqual(migrate(db_path), 0)
+            self.assertLess(os.path.getsize(db_path) * 5, legacy_size)
+
+            conn = sqlite3.connect(db_path)
+            blobs = conn.execute('SELECT gamestate_tensor FROM winner_history').fetchall()
+            self.assertTrue(all(blob.startswith(GAMESTATE_BLOB_MAGIC) for blob, in blobs))
+            for game_id, history in histories.items():
+                loaded = torch.stack([row[3] for row in load_winner_history(conn, game_id)])
+                self.assertTrue(torch.equal(loaded, history))
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,7 @@ from gamestate import GameState
 import time
 import os
 
-import logging
-from logging.handlers import RotatingFileHandler
+from logging_config import get_logger
 
 from stable_baselines3 import PPO
 from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
@@ -13,15 +12,7 @@ from gamestate_env import MahjongEnv
 
 
 # === Logging Setup ===
-logger = logging.getLogger("test_models_logger")
-logger.setLevel(logging.INFO)
-
-log_file_path = "logs/test_models_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+logger = get_logger("test_models_logger", "test_models_logging.log")
 
 logger.info("=== Starting Model Test ===")
 
@@ -0,0 +1,102 @@
+import random
+import unittest
+import numpy as np
+from gamestate import GameState
+from gamestate_env import MahjongEnv
+from opponents import RandomOpponent, ShantenOpponent, ModelOpponent
+from shanten import shanten
+from tile import Tile
+
+def dealt_gamestate(seed: int) -> GameState:
+    '''
+    Deals a game, discards player1's first tile, and has player2 draw, so player2 holds 14 tiles
+    '''
+    gamestate = GameState()
+    gamestate.initialize_draw_pool(random.Random(seed))
+    gamestate.deal_tiles()
+    discard_tile = gamestate.players['player1'][0]
+    gamestate.remove_tile_from_hand(discard_tile, 'player1')
+    gamestate.add_tile_to_discard_pool(discard_tile)
+    gamestate.draw_tile('player2')
+    return gamestate
+
+class FirstTilePolicy:
+    '''
+    Stand-in for a trained model: always predicts action 0
+    '''
+    def predict(self, observation, deterministic=True, action_masks=None):
+        self.observation = observation
+        if action_masks is not None:
+            return np.int64(np.argmax(action_masks)), None
+        return np.int64(0), None
+
+class TestOpponents(unittest.TestCase):
+    def test_random_opponent(self):
+        '''
+        Test that random discards are legal hand positions and reproducible from the generator
+        '''
+        gamestate = dealt_gamestate(0)
+        choices = [RandomOpponent(random.Random(1)).choose_discard(gamestate, 'player2') for _ in range(5)]
+        self.assertEqual(len(set(choices)), 1)
+        self.assertTrue(0 <= choices[0] < 14)
+
+
+    def test_shanten_opponent(self):
+        '''
+        Test that the greedy opponent discards a tile that leaves the lowest shanten
+        '''
+        for seed in range(20):
+            gamestate = dealt_gamestate(seed)
+            index = ShantenOpponent(random.Random(seed)).choose_discard(gamestate, 'player2')
+
+            counts = list(gamestate.hand_counts['player2'])
+            results = []
+            for tile in gamestate.players['player2']:
+                counts[tile.id] -= 1
+                results.append(shanten(counts))
+                counts[tile.id] += 1
+            self.assertEqual(results[index], min(results))
+
+        # An isolated honor tile is the only discard that keeps a complete hand one tile from winning
+        gamestate = GameState()
+        for tile in [Tile('stick', 1), Tile('stick', 2), Tile('stick', 3), Tile('circle', 4), Tile('circle', 5),
+                     Tile('circle', 6), Tile('10k', 7), Tile('10k', 8), Tile('10k', 9), Tile('red'), Tile('red'),
+                     Tile('red'), Tile('circle', 9), Tile('north')]:
+            gamestate.add_tile_to_hand(tile, 'player2')
+        self.assertIn(gamestate.players['player2'][ShantenOpponent().choose_discard(gamestate, 'player2')],
+                      [Tile('circle', 9), Tile('north')])
+
+
+    def test_model_opponent(self):
+        '''
+        Test that model actions are mapped to hand positions in both action modes
+        '''
+        gamestate = dealt_gamestate(2)
+        model = FirstTilePolicy()
+
+        self.assertEqual(ModelOpponent(model).choose_discard(gamestate, 'player2'), 0)
+        self.assertEqual(model.observation.shape, (1851,))
+
+        index = ModelOpponent(model, encoding='planes', action_mode='tile').choose_discard(gamestate, 'player2')
+        self.assertEqual(gamestate.players['player2'][index].id, min(tile.id for tile in gamestate.players['player2']))
+        self.assertEqual(model.observation.shape, (280,))
+
+
+    def test_env_with_opponents(self):
+        '''
+        Test that games run to the end with a different policy for each opponent
+        '''
+        random.seed(3)
+        env = MahjongEnv(opponents={'player2': RandomOpponent(), 'player3': ShantenOpponent(),
+                                    'player4': ModelOpponent(FirstTilePolicy())})
+        for _ in range(3):
+            env.reset()
+            done = False
+            while not done:
+                _, _, terminated, truncated, _ = env.step(random.randrange(14))
+                done = terminated or truncated
+            for player in ['player2', 'player3', 'player4']:
+                self.assertIn(len(env.state.players[player]), (13, 14))
+
+if __name__ == '__main__':
+    unittest.main()
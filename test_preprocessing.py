@@ -1,5 +1,10 @@
+import os
+import subprocess
+import sys
 import unittest
-from preprocessing import encode_tile, encode_tile_batch, Tile, GameState, np, torch, encode_macro_direction, encode_micro_direction, prepare_input, decode_hand
+from preprocessing import encode_tile, encode_tile_batch, Tile, GameState, np, torch, encode_macro_direction, encode_micro_direction, prepare_input, decode_hand, encode_observation, TILE_ENCODING_TABLE, \
+    prepare_input_batch, encode_observation_batch, counts_to_tile_ids, BLANK_TILE, \
+    encode_planes, observation_length
 
 class TestIsSetFunction(unittest.TestCase):
     def test_encode_tile_with_rank(self):
@@ -210,5 +215,157 @@ class TestIsSetFunction(unittest.TestCase):
         result = player_hand == test_decoded_hand
         self.assertTrue(result)
 
+    def test_encoding_table(self):
+        '''
+        Test that each row of the lookup table matches encode_tile and the last row is blank
+        '''
+        gamestate = GameState()
+        gamestate.initialize_draw_pool()
+        for tile in gamestate.draw_pool:
+            self.assertTrue(np.array_equal(TILE_ENCODING_TABLE[tile.id], encode_tile(gamestate, tile)))
+        self.assertFalse(TILE_ENCODING_TABLE[-1].any())
+
+
+    def test_encode_observation_matches_per_tile_encoding(self):
+        '''
+        Test that encode_observation and prepare_input match the tiles encoded one by one with encode_tile,
+        with int8 output by default and any dtype when writing into a preallocated buffer
+        '''
+        player = 'player1'
+        gamestate = GameState()
+        gamestate.randomize_macro_direction()
+        gamestate.randomize_micro_direction()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+        for _ in range(5):
+            gamestate.add_tile_to_discard_pool(gamestate.players[player][0])
+            gamestate.remove_tile_from_hand(gamestate.players[player][0], player)
+            gamestate.draw_tile(player)
+
+        expected = np.concatenate([encode_tile(gamestate, tile) for tile in gamestate.players[player] + gamestate.discard_pool]
+                                  + [np.zeros(19 * len(gamestate.draw_pool))]
+                                  + [encode_macro_direction(gamestate).numpy(), encode_micro_direction(gamestate).numpy()])
+
+        observation = encode_observation(gamestate, player)
+        self.assertEqual(observation.dtype, np.int8)
+        self.assertTrue(np.array_equal(observation, expected))
+        self.assertTrue(np.array_equal(prepare_input(gamestate, player).numpy(), expected))
+
+        # Buffers are fully overwritten, including stale values from earlier observations
+        buffer = np.ones(1851, dtype=np.float32)
+        self.assertIs(encode_observation(gamestate, player, out=buffer), buffer)
+        self.assertTrue(np.array_equal(buffer, expected))
+
+        tensor_buffer = torch.ones(1851)
+        self.assertIs(prepare_input(gamestate, player, out=tensor_buffer), tensor_buffer)
+        self.assertTrue(np.array_equal(tensor_buffer.numpy(), expected))
+
+        with self.assertRaises(ValueError):
+            encode_observation(gamestate, player, out=np.zeros(100, dtype=np.int8))
+
+    def test_prepare_input_batch(self):
+        '''
+        Test that batched encoding from game states and from hand/discard arrays matches encode_observation row by row
+        '''
+        gamestates = []
+        players = []
+        for num_discards in range(6):
+            player = f'player{num_discards % 4 + 1}'
+            gamestate = GameState()
+            gamestate.randomize_macro_direction()
+            gamestate.randomize_micro_direction()
+            gamestate.initialize_draw_pool()
+            gamestate.deal_tiles()
+            # Every player is encoded on their turn, holding 14 tiles while the others hold 13
+            if player != 'player1':
+                gamestate.add_tile_to_discard_pool(gamestate.players['player1'][0])
+                gamestate.remove_tile_from_hand(gamestate.players['player1'][0], 'player1')
+                gamestate.draw_tile(player)
+            for _ in range(num_discards):
+                gamestate.add_tile_to_discard_pool(gamestate.players[player][-1])
+                gamestate.remove_tile_from_hand(gamestate.players[player][-1], player)
+                gamestate.draw_tile(player)
+            gamestate.sort_player_hand(player)
+            gamestates.append(gamestate)
+            players.append(player)
+
+        expected = np.stack([encode_observation(gamestate, player) for gamestate, player in zip(gamestates, players)])
+        observations = prepare_input_batch(gamestates, players)
+        self.assertEqual(observations.dtype, np.int8)
+        self.assertTrue(np.array_equal(observations, expected))
+
+        buffer = np.ones(expected.shape, dtype=np.float32)
+        self.assertIs(prepare_input_batch(gamestates, players, out=buffer), buffer)
+        self.assertTrue(np.array_equal(buffer, expected))
+
+        # The same observations from arrays: hands as tile ids or count vectors, discards as padded tile ids
+        hand_ids = np.full((len(gamestates), 14), BLANK_TILE)
+        hand_counts = np.zeros((len(gamestates), 34), dtype=np.int8)
+        discard_ids = np.full((len(gamestates), 10), BLANK_TILE)
+        for row, (gamestate, player) in enumerate(zip(gamestates, players)):
+            hand = gamestate.players[player]
+            hand_ids[row, :len(hand)] = [tile.id for tile in hand]
+            hand_counts[row] = gamestate.hand_counts[player]
+            discard_ids[row, :len(gamestate.discard_pool)] = [tile.id for tile in gamestate.discard_pool]
+        macro_directions = [gamestate.macro_direction_to_idx[gamestate.macro_direction[0]] for gamestate in gamestates]
+        micro_directions = [gamestate.micro_direction_to_idx[gamestate.micro_direction[0]] for gamestate in gamestates]
+
+        self.assertTrue(np.array_equal(counts_to_tile_ids(hand_counts, width=14), hand_ids))
+        self.assertTrue(np.array_equal(
+            encode_observation_batch(discard_ids, macro_directions, micro_directions, hand_ids=hand_ids), expected))
+        self.assertTrue(np.array_equal(
+            encode_observation_batch(discard_ids, macro_directions, micro_directions, hand_counts=hand_counts), expected))
+
+        with self.assertRaises(ValueError):
+            encode_observation_batch(discard_ids, macro_directions, micro_directions)
+
+    def test_encode_planes(self):
+        '''
+        Test that the planes encoding holds thresholded hand and discard counts plus the directions,
+        does not depend on the order of the hand, and matches the batched encoders
+        '''
+        player = 'player1'
+        gamestate = GameState()
+        gamestate.randomize_macro_direction()
+        gamestate.randomize_micro_direction()
+        gamestate.initialize_draw_pool()
+        gamestate.deal_tiles()
+        for _ in range(20):
+            gamestate.add_tile_to_discard_pool(gamestate.players[player][0])
+            gamestate.remove_tile_from_hand(gamestate.players[player][0], player)
+            gamestate.draw_tile(player)
+
+        observation = encode_planes(gamestate, player)
+        self.assertEqual(observation.shape, (observation_length('planes'),))
+        self.assertEqual(observation.dtype, np.int8)
+
+        planes = observation[:8 * 34].reshape(2, 4, 34)
+        self.assertTrue(np.array_equal(planes[0].sum(axis=0), gamestate.hand_counts[player]))
+        self.assertTrue(np.array_equal(planes[1].sum(axis=0), gamestate.discard_counts))
+        self.assertTrue(np.array_equal(observation[8 * 34:], np.concatenate([encode_macro_direction(gamestate).numpy(),
+                                                                               encode_micro_direction(gamestate).numpy()])))
+
+        gamestate.players[player].reverse()
+        self.assertTrue(np.array_equal(encode_observation(gamestate, player, encoding='planes'), observation))
+        self.assertTrue(np.array_equal(prepare_input(gamestate, player, encoding='planes').numpy(), observation))
+        self.assertTrue(np.array_equal(prepare_input_batch([gamestate, gamestate], player, encoding='planes'),
+                                       np.stack([observation, observation])))
+
+        with self.assertRaises(ValueError):
+            encode_observation(gamestate, player, encoding='unknown')
+
+class TestLazyTorch(unittest.TestCase):
+    def test_numpy_encoders_without_torch(self):
+        '''
+        Test that preprocessing and its numpy encoders load without torch, and that preprocessing.torch imports it
+        '''
+        code = ("import sys, preprocessing; from gamestate import GameState; "
+                "gamestate = GameState(); gamestate.initialize_draw_pool(); gamestate.deal_tiles(); "
+                "preprocessing.encode_observation(gamestate, 'player1'); print('torch' in sys.modules); "
+                "preprocessing.torch; print('torch' in sys.modules)")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.split(), ['False', 'True'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+import random
+import unittest
+import numpy as np
+from gamestate import GameState
+from reference_rules import reference_compute_reward
+from rewards import discard_reward, discard_rewards
+
+def random_gamestate(rng: random.Random) -> GameState:
+    '''
+    Deals a game and plays a random number of turns of random draws and discards by player1
+    '''
+    gamestate = GameState()
+    gamestate.initialize_draw_pool(rng)
+    gamestate.deal_tiles()
+    for _ in range(rng.randint(0, 60)):
+        hand = gamestate.players['player1']
+        tile = hand[rng.randrange(len(hand))]
+        gamestate.remove_tile_from_hand(tile, 'player1')
+        gamestate.add_tile_to_discard_pool(tile)
+        gamestate.draw_tile('player1')
+    return gamestate
+
+class TestRewards(unittest.TestCase):
+    def test_matches_reference(self):
+        '''
+        Test that the count-vector reward matches the original triple-enumerating reward for every discard of random hands
+        '''
+        rng = random.Random(0)
+        for _ in range(60):
+            gamestate = random_gamestate(rng)
+            hand_counts = gamestate.hand_counts['player1']
+            for action in range(14):
+                tile_id = gamestate.players['player1'][action].id
+                reward = discard_reward(hand_counts, gamestate.discard_counts, tile_id)
+                self.assertAlmostEqual(reward, reference_compute_reward(gamestate, 'player1', action), places=9)
+
+
+    def test_batch_matches_single(self):
+        '''
+        Test that the vectorized rewards match discard_reward
+        '''
+        rng = random.Random(1)
+        gamestates = [random_gamestate(rng) for _ in range(50)]
+        hand_counts = np.array([gamestate.hand_counts['player1'] for gamestate in gamestates], dtype=np.int8)
+        discard_counts = np.array([gamestate.discard_counts for gamestate in gamestates], dtype=np.int8)
+        tile_ids = np.array([gamestate.players['player1'][rng.randrange(14)].id for gamestate in gamestates])
+
+        rewards = discard_rewards(hand_counts, discard_counts, tile_ids)
+        self.assertEqual(rewards.dtype, np.float32)
+        for reward, counts, discards, tile_id in zip(rewards, hand_counts, discard_counts, tile_ids):
+            self.assertAlmostEqual(float(reward), discard_reward(counts, discards, tile_id), places=5)
+
+if __name__ == '__main__':
+    unittest.main()
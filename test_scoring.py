@@ -0,0 +1,109 @@
+import random
+import unittest
+import numpy as np
+from hand_counts import NUM_TILE_TYPES, NUM_RANKED_TYPES, SET, RUN, QUAD, PAIR, group_to_tiles
+from reference_rules import reference_score_grouped_hand
+from scoring import score_decomposition, score_decompositions, best_decomposition, DIRECTIONS
+from suit_table import enumerate_decompositions
+
+
+def random_winning_counts(rng: random.Random) -> list[int]:
+    '''
+    Builds a random winning hand, often restricted to one suit plus honors so that every bonus comes up,
+    with some sets of four
+    '''
+    while True:
+        if rng.random() < 0.5:
+            suit = rng.randrange(3)
+            indices = list(range(suit * 9, suit * 9 + 9)) + list(range(NUM_RANKED_TYPES, NUM_TILE_TYPES))
+        else:
+            indices = list(range(NUM_TILE_TYPES))
+        run_probability = rng.choice([0.0, 0.5, 1.0])
+
+        counts = [0] * NUM_TILE_TYPES
+        for _ in range(4):
+            low = rng.choice(indices)
+            if low < NUM_RANKED_TYPES and low % 9 <= 6 and rng.random() < run_probability:
+                for index in range(low, low + 3):
+                    counts[index] += 1
+            else:
+                counts[low] += 4 if rng.random() < 0.2 else 3
+        counts[rng.choice(indices)] += 2
+        if max(counts) <= 4:
+            return counts
+
+
+class TestScoring(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.decompositions = []
+        for _ in range(2000):
+            counts = random_winning_counts(rng)
+            macro_direction = rng.choice(DIRECTIONS)
+            micro_direction = rng.choice(DIRECTIONS)
+            for groups in enumerate_decompositions(counts):
+                self.decompositions.append((groups, macro_direction, micro_direction))
+
+
+    def test_score_decomposition(self):
+        '''
+        Test that the table lookups match the original compute_score walk over the grouped tiles
+        '''
+        scores = set()
+        for groups, macro_direction, micro_direction in self.decompositions:
+            score = score_decomposition(groups, macro_direction, micro_direction)
+            grouped_hand = tuple(group_to_tiles(group) for group in groups)
+            self.assertEqual(score, reference_score_grouped_hand(grouped_hand, macro_direction, micro_direction), groups)
+            scores.add(score)
+        self.assertGreater(len(scores), 8)
+
+
+    def test_score_decompositions(self):
+        '''
+        Test that the batched scores match the original compute_score walk for per-row and shared directions
+        '''
+        groups = np.array([groups for groups, _, _ in self.decompositions])
+        macro_directions = np.array([DIRECTIONS.index(macro_direction) for _, macro_direction, _ in self.decompositions])
+        micro_directions = np.array([DIRECTIONS.index(micro_direction) for _, _, micro_direction in self.decompositions])
+
+        grouped_hands = [tuple(group_to_tiles(group) for group in groups) for groups, _, _ in self.decompositions]
+        expected = [reference_score_grouped_hand(grouped_hand, macro_direction, micro_direction)
+                    for grouped_hand, (_, macro_direction, micro_direction) in zip(grouped_hands, self.decompositions)]
+        self.assertEqual(score_decompositions(groups, macro_directions, micro_directions).tolist(), expected)
+
+        expected = [reference_score_grouped_hand(grouped_hand, 'south', 'west') for grouped_hand in grouped_hands]
+        self.assertEqual(score_decompositions(groups, 1, 2).tolist(), expected)
+
+
+    def test_best_decomposition(self):
+        '''
+        Test that the best decomposition of a hand that can be grouped two ways is the higher scoring one
+        '''
+        # 1-1-1, 2-2-2, 3-3-3 stick (three sets or three runs), red-red-red, 9-9 stick
+        counts = [0] * NUM_TILE_TYPES
+        for index in (0, 1, 2):
+            counts[index] = 3
+        counts[NUM_RANKED_TYPES] = 3
+        counts[8] = 2
+
+        # 2 base + 3 flush + 3 all sets + 1 color set
+        score, groups = best_decomposition(counts, 'east', 'east')
+        self.assertEqual(score, 9)
+        self.assertEqual(groups[-1], PAIR * NUM_TILE_TYPES + 8)
+        self.assertTrue(all(group < RUN * NUM_TILE_TYPES for group in groups[:-1]))
+
+        counts[8] = 1
+        self.assertEqual(best_decomposition(counts, 'east', 'east'), (0, None))
+
+        # A set of four counts as a set: 1-1-1-1, 2-2-2, 3-3-3 stick, red-red-red-red, 9-9 stick
+        counts[0] = 4
+        counts[8] = 2
+        counts[NUM_RANKED_TYPES] = 4
+        score, groups = best_decomposition(counts, 'east', 'east')
+        self.assertEqual(score, 9)
+        self.assertEqual(groups[-1], PAIR * NUM_TILE_TYPES + 8)
+        self.assertEqual(sorted(groups[:-1]), [SET * NUM_TILE_TYPES + 1, SET * NUM_TILE_TYPES + 2,
+                                               QUAD * NUM_TILE_TYPES, QUAD * NUM_TILE_TYPES + NUM_RANKED_TYPES])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import random
+import unittest
+from shanten import shanten, ukeire, player_ukeire
+from hand_counts import hand_to_counts, tile_to_index, NUM_TILE_TYPES, Tile
+from gamestate import GameState
+from suit_table import is_winning_counts
+
+class TestShanten(unittest.TestCase):
+    def test_winning_hand(self):
+        '''
+        Test that a winning 14-tile hand has a shanten of -1
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('circle', 1), Tile('circle', 1), Tile('circle', 1),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('circle', 4), Tile('circle', 4)
+        ]
+        self.assertEqual(shanten(hand_to_counts(hand)), -1)
+
+
+    def test_ready_hand(self):
+        '''
+        Test that a 13-tile hand waiting on a single tile has a shanten of 0
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('circle', 1), Tile('circle', 1), Tile('circle', 1),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('circle', 4)
+        ]
+        self.assertEqual(shanten(hand_to_counts(hand)), 0)
+
+
+    def test_one_away(self):
+        '''
+        Test that a 13-tile hand with three sets/runs, two partial runs, and no double has a shanten of 1
+        '''
+        hand = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('circle', 1), Tile('circle', 1), Tile('circle', 1),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('10k', 4), Tile('10k', 5),
+            Tile('10k', 7), Tile('10k', 9)
+        ]
+        self.assertEqual(shanten(hand_to_counts(hand)), 1)
+
+
+    def test_honors_do_not_form_partial_runs(self):
+        '''
+        Test that isolated honor tiles do not count as partial runs
+        '''
+        hand = [
+            Tile('red'), Tile('green'), Tile('white'),
+            Tile('east'), Tile('south'), Tile('west'), Tile('north'),
+            Tile('stick', 1), Tile('circle', 1), Tile('10k', 1),
+            Tile('stick', 9), Tile('circle', 9), Tile('10k', 9)
+        ]
+        self.assertEqual(shanten(hand_to_counts(hand)), 8)
+
+
+    def test_random_hands_consistent(self):
+        '''
+        Test on random hands that:
+        1) a 14-tile hand has shanten -1 exactly when it is a winning hand
+        2) a 14-tile hand's shanten is the best shanten over all discards
+        3) a 13-tile hand has shanten 0 exactly when some tile completes it
+        '''
+        rng = random.Random(0)
+        wall = [index for index in range(NUM_TILE_TYPES) for _ in range(4)]
+
+        for _ in range(200):
+            counts = [0] * NUM_TILE_TYPES
+            for index in rng.sample(wall, 14):
+                counts[index] += 1
+
+            value = shanten(counts)
+            self.assertEqual(value == -1, is_winning_counts(counts))
+
+            discards = []
+            for index in range(NUM_TILE_TYPES):
+                if counts[index] > 0:
+                    counts[index] -= 1
+                    discards.append(shanten(counts))
+
+                    ready = False
+                    for draw in range(NUM_TILE_TYPES):
+                        if counts[draw] < 4:
+                            counts[draw] += 1
+                            ready = ready or is_winning_counts(counts)
+                            counts[draw] -= 1
+                    self.assertEqual(ready, discards[-1] == 0)
+
+                    counts[index] += 1
+            self.assertEqual(value, min(discards))
+
+
+class TestUkeire(unittest.TestCase):
+    def test_ready_hand_waits(self):
+        '''
+        Test that discarding the isolated tile of a hand leaves it ready, waiting on the tiles that complete it,
+        and that live copies exclude tiles in the hand and the discard pool
+        '''
+        gamestate = GameState()
+        player = 'player1'
+
+        manual_tiles = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('circle', 1), Tile('circle', 1), Tile('circle', 1),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('10k', 4), Tile('north')
+        ]
+
+        for tile in manual_tiles:
+            gamestate.add_tile_to_hand(tile, player)
+        gamestate.add_tile_to_discard_pool(Tile('10k', 4))
+        gamestate.add_tile_to_discard_pool(Tile('north'))
+        gamestate.add_tile_to_discard_pool(Tile('north'))
+
+        results = player_ukeire(gamestate, player)
+
+        # Discarding north waits on 4 10k (1 in hand, 1 discarded)
+        current, improving_tiles = results[tile_to_index(Tile('north'))]
+        self.assertEqual(current, 0)
+        self.assertEqual(improving_tiles, {tile_to_index(Tile('10k', 4)): 2})
+
+        # Discarding 4 10k waits on north (1 in hand, 2 discarded)
+        current, improving_tiles = results[tile_to_index(Tile('10k', 4))]
+        self.assertEqual(current, 0)
+        self.assertEqual(improving_tiles, {tile_to_index(Tile('north')): 1})
+
+
+    def test_dead_tiles_left_out(self):
+        '''
+        Test that a tile with every live copy in the discard pool is not listed as an improving tile
+        '''
+        gamestate = GameState()
+        player = 'player1'
+
+        manual_tiles = [
+            Tile('stick', 1), Tile('stick', 2), Tile('stick', 3),
+            Tile('circle', 1), Tile('circle', 1), Tile('circle', 1),
+            Tile('stick', 8), Tile('stick', 8), Tile('stick', 8),
+            Tile('red'), Tile('red'), Tile('red'),
+            Tile('10k', 4), Tile('north')
+        ]
+
+        for tile in manual_tiles:
+            gamestate.add_tile_to_hand(tile, player)
+        for _ in range(3):
+            gamestate.add_tile_to_discard_pool(Tile('north'))
+
+        # Discarding 4 10k would wait on north, but the other three copies have been discarded
+        current, improving_tiles = player_ukeire(gamestate, player)[tile_to_index(Tile('10k', 4))]
+        self.assertEqual(current, 0)
+        self.assertEqual(improving_tiles, {})
+
+
+    def test_matches_shanten(self):
+        '''
+        Test on random hands that ukeire matches recomputing shanten for every discard/draw pair
+        '''
+        rng = random.Random(1)
+        wall = [index for index in range(NUM_TILE_TYPES) for _ in range(4)]
+
+        for _ in range(50):
+            counts = [0] * NUM_TILE_TYPES
+            for index in rng.sample(wall, 14):
+                counts[index] += 1
+
+            results = ukeire(counts)
+            for discard in range(NUM_TILE_TYPES):
+                if counts[discard] == 0:
+                    self.assertNotIn(discard, results)
+                    continue
+                counts[discard] -= 1
+                current = shanten(counts)
+                improving_tiles = {}
+                for draw in range(NUM_TILE_TYPES):
+                    # Copies held before the discard are not live
+                    held = counts[draw] + (draw == discard)
+                    if held < 4:
+                        counts[draw] += 1
+                        if shanten(counts) < current:
+                            improving_tiles[draw] = 4 - held
+                        counts[draw] -= 1
+                counts[discard] += 1
+                self.assertEqual(results[discard], (current, improving_tiles))
+
+if __name__ == '__main__':
+    unittest.main()
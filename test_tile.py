@@ -0,0 +1,98 @@
+import copy
+import pickle
+import unittest
+from tile import Tile, physical_tile, TILE_TYPES, NUM_TILE_TYPES, NUM_COPIES
+
+class TestTile(unittest.TestCase):
+    def test_tiles_are_interned(self):
+        '''
+        Test that constructing the same tile type twice returns the same instance
+        '''
+        self.assertIs(Tile('stick', 3), Tile('stick', 3))
+        self.assertIs(Tile('red'), Tile(suit='red'))
+
+
+    def test_tile_ids(self):
+        '''
+        Test that the 34 tile types have ids 0-33 in suit order
+        '''
+        self.assertEqual(Tile('stick', 1).id, 0)
+        self.assertEqual(Tile('circle', 1).id, 9)
+        self.assertEqual(Tile('10k', 9).id, 26)
+        self.assertEqual(Tile('red').id, 27)
+        self.assertEqual(Tile('north').id, 33)
+        self.assertEqual([tile.id for tile in TILE_TYPES], list(range(NUM_TILE_TYPES)))
+
+
+    def test_physical_copies(self):
+        '''
+        Test that the physical copies of a tile type are distinct objects that compare and hash equal
+        '''
+        copies = [physical_tile(Tile('circle', 5).id, i) for i in range(NUM_COPIES)]
+
+        self.assertEqual(len(set(map(id, copies))), NUM_COPIES)
+        self.assertEqual([tile.copy for tile in copies], list(range(NUM_COPIES)))
+        self.assertTrue(all(tile == Tile('circle', 5) for tile in copies))
+        self.assertEqual(len(set(copies)), 1)
+        self.assertNotEqual(copies[0], Tile('circle', 6))
+
+
+    def test_copy_and_pickle_keep_identity(self):
+        '''
+        Test that copying and pickling a tile return the same interned instance
+        '''
+        tile = physical_tile(Tile('west').id, 2)
+
+        self.assertIs(copy.deepcopy(tile), tile)
+        self.assertIs(copy.copy(tile), tile)
+        self.assertIs(pickle.loads(pickle.dumps(tile)), tile)
+
+
+    def test_immutable(self):
+        '''
+        Test that interned tiles cannot be modified
+        '''
+        with self.assertRaises(AttributeError):
+            Tile('stick', 1).rank = 2
+
+
+    def test_repr(self):
+        '''
+        Test that tiles print as rank and suit
+        '''
+        self.assertEqual(repr(Tile('10k', 7)), '7 10k')
+        self.assertEqual(repr(Tile('green')), 'green')
+
+
+    def test_invalid_tiles(self):
+        '''
+        Test that invalid suits and ranks raise a ValueError
+        '''
+        with self.assertRaises(ValueError):
+            Tile('dragon')
+        with self.assertRaises(ValueError):
+            Tile('stick', 10)
+        with self.assertRaises(ValueError):
+            Tile('stick')
+        with self.assertRaises(ValueError):
+            Tile(['stick'], 1)
+        with self.assertRaises(ValueError):
+            Tile('stick', [1])
+        with self.assertRaises(ValueError):
+            Tile('stick', 3.0)
+
+
+    def test_ordering(self):
+        '''
+        Test that tiles are ordered by tile type id with every comparison operator
+        '''
+        self.assertTrue(Tile('stick', 9) < Tile('circle', 1))
+        self.assertTrue(Tile('stick', 9) <= Tile('stick', 9))
+        self.assertTrue(Tile('north') > Tile('red'))
+        self.assertTrue(Tile('red') >= Tile('10k', 9))
+        self.assertFalse(Tile('red') > physical_tile(Tile('red').id, 1))
+        self.assertEqual(sorted([Tile('north'), Tile('10k', 2), Tile('stick', 5)]),
+                         [Tile('stick', 5), Tile('10k', 2), Tile('north')])
+
+if __name__ == '__main__':
+    unittest.main()
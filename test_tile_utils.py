@@ -1,5 +1,9 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
-from tile_utils import is_set, is_run, is_winning_hand, compute_score, Tile, GameState
+from tile_utils import is_set, is_run, is_winning_hand, compute_score, best_grouped_hand, Tile, GameState
 
 class TestIsSetFunction(unittest.TestCase):
     def test_is_set_3_true(self):
@@ -149,11 +153,74 @@ class TestIsSetFunction(unittest.TestCase):
 
         for tile in manual_tiles:
             gamestate.add_tile_to_hand(tile, player)
-        
+
         result, _ = is_winning_hand(gamestate, player)
         self.assertFalse(result)
 
 
+    def test_is_winning_hand_kong(self):
+        '''
+        Test that a set of four counts as one of the four groups, so a winning hand with one has 15 tiles
+        '''
+        gamestate = GameState()
+        player = 'player1'
+
+        manual_tiles = [
+            Tile('stick', 1),
+            Tile('stick', 1),
+            Tile('stick', 1),
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 2),
+            Tile('stick', 2),
+            Tile('circle', 5),
+            Tile('circle', 6),
+            Tile('circle', 7),
+            Tile('10k', 3),
+            Tile('10k', 3),
+            Tile('10k', 3),
+            Tile('red'),
+            Tile('red')
+        ]
+
+        for tile in manual_tiles:
+            gamestate.add_tile_to_hand(tile, player)
+
+        result, grouped_hand = is_winning_hand(gamestate, player)
+        self.assertTrue(result)
+        self.assertEqual(len(grouped_hand), 5)
+        self.assertIn((Tile('stick', 1),) * 4, grouped_hand)
+        self.assertEqual(compute_score(gamestate, player), 2)
+
+
+    def test_is_winning_hand_short(self):
+        '''
+        Test that a hand of three sets and a double is not a winning hand
+        '''
+        gamestate = GameState()
+        player = 'player1'
+
+        manual_tiles = [
+            Tile('stick', 1),
+            Tile('stick', 1),
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 2),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('stick', 3),
+            Tile('stick', 3),
+            Tile('red'),
+            Tile('red')
+        ]
+
+        for tile in manual_tiles:
+            gamestate.add_tile_to_hand(tile, player)
+
+        self.assertEqual(is_winning_hand(gamestate, player), (False, None))
+        self.assertEqual(compute_score(gamestate, player), 0)
+
+
     def test_score_2(self):
         '''
         Test lowest possible player hand score
@@ -647,5 +714,92 @@ class TestIsSetFunction(unittest.TestCase):
         result = (score == expected_score)
         self.assertTrue(result)
 
+
+    def test_score_multiple_groupings_sets(self):
+        '''
+        Test that a hand that can be grouped as three sets or three identical runs is scored using the best grouping
+
+        Grouping 1, 2, 3 stick as three sets makes every group a set: 2 + 3 = 5
+        Grouping them as three runs mixes runs and sets: 2
+        '''
+        gamestate = GameState()
+        player = 'player1'
+        expected_score = 5
+
+        manual_tiles = [
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('circle', 5),
+            Tile('circle', 5),
+            Tile('circle', 5),
+            Tile('10k', 9),
+            Tile('10k', 9)
+        ]
+
+        for tile in manual_tiles:
+            gamestate.add_tile_to_hand(tile, player)
+        
+        score, grouped_hand = best_grouped_hand(gamestate, player)
+        self.assertEqual(score, expected_score)
+        self.assertEqual(compute_score(gamestate, player), expected_score)
+        self.assertTrue(all(is_set(*group) for group in grouped_hand))
+
+
+    def test_score_multiple_groupings_runs(self):
+        '''
+        Test that a hand that can be grouped as three sets or three identical runs is scored using the best grouping
+
+        Grouping 1, 2, 3 stick as three runs makes every group a run: 2 + 1 = 3
+        Grouping them as three sets mixes runs and sets: 2
+        '''
+        gamestate = GameState()
+        player = 'player1'
+        expected_score = 3
+
+        manual_tiles = [
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('stick', 1),
+            Tile('stick', 2),
+            Tile('stick', 3),
+            Tile('circle', 5),
+            Tile('circle', 6),
+            Tile('circle', 7),
+            Tile('10k', 9),
+            Tile('10k', 9)
+        ]
+
+        for tile in manual_tiles:
+            gamestate.add_tile_to_hand(tile, player)
+        
+        score = compute_score(gamestate, player)
+        self.assertEqual(score, expected_score)
+
+class TestImports(unittest.TestCase):
+    def test_core_imports_without_heavy_packages(self):
+        '''
+        Test that the game core imports in a fresh interpreter without torch, gymnasium or numpy, and without
+        writing log files
+        '''
+        code = ("import sys, tile, gamestate, tile_utils, player_utils; "
+                "print(','.join(name for name in ('torch', 'gymnasium', 'numpy', 'logging.handlers') if name in sys.modules))")
+        with tempfile.TemporaryDirectory() as working_dir:
+            env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+            result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                    cwd=working_dir, env=env)
+            self.assertEqual(result.stdout.strip(), '')
+            self.assertEqual(os.listdir(working_dir), [])
+
 if __name__ == '__main__':
     unittest.main()
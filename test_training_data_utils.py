@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import torch
+from training_data_utils import (configure_connection, create_winner_history_table, save_winner_data,
+                                 load_winner_history, get_last_game_id, WinnerHistoryWriter,
+                                 encode_gamestate, decode_gamestate, pack_gamestate_batch, load_training_data)
+
+def random_binary_tensor(*size):
+    return (torch.rand(size) < 0.05).float()
+
+class TestGamestateCodec(unittest.TestCase):
+    def test_round_trip(self):
+        '''
+        Test that a bit-packed tensor decodes to the original values at about 1/30th of the float32 size
+        '''
+        tensor = random_binary_tensor(1851)
+        blob = encode_gamestate(tensor)
+
+        self.assertTrue(torch.equal(decode_gamestate(blob), tensor))
+        self.assertEqual(decode_gamestate(blob).dtype, torch.float32)
+        self.assertLess(len(blob) * 30, tensor.numpy().nbytes)
+
+
+    def test_legacy_blobs(self):
+        '''
+        Test that raw float32 blobs written before bit-packing still decode
+        '''
+        tensor = random_binary_tensor(1851)
+        self.assertTrue(torch.equal(decode_gamestate(tensor.numpy().tobytes()), tensor))
+
+
+    def test_pack_batch(self):
+        '''
+        Test that blobs are returned as packed bits, copied from bit-packed blobs and packed again from legacy ones
+        '''
+        tensors = random_binary_tensor(6, 1851)
+        expected = np.packbits(tensors.numpy().astype(np.uint8), axis=1)
+        blobs = [encode_gamestate(tensor) for tensor in tensors]
+
+        self.assertTrue(np.array_equal(pack_gamestate_batch(blobs, 1851), expected))
+        blobs[2] = tensors[2].numpy().tobytes()
+        self.assertTrue(np.array_equal(pack_gamestate_batch(blobs, 1851), expected))
+
+
+    def test_invalid_input(self):
+        '''
+        Test that non-binary tensors cannot be packed and unknown format versions are rejected
+        '''
+        with self.assertRaises(ValueError):
+            encode_gamestate(torch.tensor([0.0, 0.5, 1.0]))
+
+        blob = bytearray(encode_gamestate(random_binary_tensor(10)))
+        blob[2] = 99
+        with self.assertRaises(ValueError):
+            decode_gamestate(bytes(blob))
+
+
+class TestWinnerHistoryWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp_dir.name, 'test.db'))
+        configure_connection(self.conn)
+        create_winner_history_table(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+
+    def test_wal_mode(self):
+        '''
+        Test that configured connections use write-ahead logging
+        '''
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+
+    def test_round_trip(self):
+        '''
+        Test that histories written through the buffered writer load back like those saved with save_winner_data
+        '''
+        history = random_binary_tensor(3, 1851)
+        save_winner_data(self.conn, 1, history, 'player2', 5)
+        with WinnerHistoryWriter(self.conn) as writer:
+            writer.add(2, history, 'player2', 5)
+
+        saved = load_winner_history(self.conn, 1)
+        written = load_winner_history(self.conn, 2)
+        self.assertEqual(len(written), 3)
+        for (_, player, turn, tensor, score), (_, written_player, written_turn, written_tensor, written_score) in zip(saved, written):
+            self.assertEqual((player, turn, score), (written_player, written_turn, written_score))
+            self.assertTrue(torch.equal(tensor, written_tensor))
+            self.assertTrue(torch.equal(tensor, history[turn]))
+
+
+    def test_flush_on_size(self):
+        '''
+        Test that rows are buffered until the row threshold is reached
+        '''
+        writer = WinnerHistoryWriter(self.conn, max_rows=5, max_seconds=3600)
+        writer.add(1, torch.zeros((3, 1851)), 'player1', 2)
+        self.assertEqual(get_last_game_id(self.conn), 0)
+
+        writer.add(2, torch.zeros((3, 1851)), 'player1', 2)
+        self.assertEqual(get_last_game_id(self.conn), 2)
+        self.assertEqual(writer.rows_written, 6)
+
+
+    def test_flush_on_interrupt(self):
+        '''
+        Test that buffered rows are written when the writer's block is interrupted
+        '''
+        with self.assertRaises(KeyboardInterrupt):
+            with WinnerHistoryWriter(self.conn, max_rows=1000, max_seconds=3600) as writer:
+                writer.add(7, torch.zeros((2, 1851)), 'player3', 3)
+                raise KeyboardInterrupt
+
+        self.assertEqual(get_last_game_id(self.conn), 7)
+
+
+class TestLoadTrainingData(unittest.TestCase):
+    def test_decayed_targets(self):
+        '''
+        Test that every turn is loaded in game/turn order with its score decayed by the number of turns left,
+        across chunk boundaries and a mix of bit-packed and legacy float32 rows
+        '''
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            conn = sqlite3.connect(os.path.join(tmp_dir, 'test.db'))
+            create_winner_history_table(conn)
+
+            expected_data = []
+            expected_targets = []
+            # Insert games out of order to check the ordering
+            for game_id, num_turns, score in [(3, 4, 2), (1, 2, 6), (2, 5, 4)]:
+                history = random_binary_tensor(num_turns, 1851)
+                if game_id == 2:
+                    for turn, gamestate_tensor in enumerate(history):
+                        conn.execute("INSERT INTO winner_history (game_id, player, turn, gamestate_tensor, final_score) VALUES (?, ?, ?, ?, ?)",
+                                     (game_id, 'player1', turn, gamestate_tensor.numpy().tobytes(), score))
+                else:
+                    save_winner_data(conn, game_id, history, 'player1', score)
+                expected_data.append((game_id, history))
+                expected_targets.append((game_id, [score * 0.9 ** (num_turns - turn - 1) for turn in range(num_turns)]))
+            conn.commit()
+
+            data, targets = load_training_data(conn, decay=0.9, chunk_size=3)
+
+            expected_data = torch.cat([history for _, history in sorted(expected_data, key=lambda item: item[0])])
+            expected_targets = [target for _, game_targets in sorted(expected_targets) for target in game_targets]
+            self.assertTrue(torch.equal(data, expected_data))
+            self.assertEqual(targets.dtype, torch.float32)
+            self.assertTrue(torch.allclose(targets, torch.tensor(expected_targets)))
+
+            indexes = [row[1] for row in conn.execute("PRAGMA index_list(winner_history)")]
+            self.assertIn('idx_winner_history_game_turn', indexes)
+            conn.close()
+
+            # Loading only reads, so it also works on a read-only connection
+            conn = sqlite3.connect(f"file:{os.path.join(tmp_dir, 'test.db')}?mode=ro", uri=True)
+            read_only_data, read_only_targets = load_training_data(conn, decay=0.9, chunk_size=3)
+            self.assertTrue(torch.equal(read_only_data, data))
+            self.assertTrue(torch.equal(read_only_targets, targets))
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from training_data_utils import create_winner_history_table, save_winner_data, load_training_data
+from training_shards import export_shards, ShardedTrainingDataset, ShardBatchSampler
+
+class TestTrainingShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp_dir.name, 'test.db'))
+        create_winner_history_table(self.conn)
+        for game_id in range(1, 8):
+            history = (torch.rand((game_id + 2, 1851)) < 0.05).float()
+            save_winner_data(self.conn, game_id, history, 'player1', game_id)
+
+        self.shard_dir = os.path.join(self.tmp_dir.name, 'shards')
+        self.num_rows = export_shards(self.conn, self.shard_dir, decay=0.9, rows_per_shard=10, chunk_size=4)
+        self.data, self.targets = load_training_data(self.conn, decay=0.9)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+
+    def test_export_matches_database(self):
+        '''
+        Test that the shards hold every row of load_training_data, split into shards of at most rows_per_shard rows
+        '''
+        dataset = ShardedTrainingDataset(self.shard_dir)
+
+        self.assertEqual(self.num_rows, len(self.targets))
+        self.assertEqual(len(dataset), len(self.targets))
+        self.assertEqual([shard['rows'] for shard in dataset.shards], [10, 10, 10, 10, 2])
+
+        for index in [0, 9, 10, 25, len(dataset) - 1]:
+            observation, target = dataset[index]
+            self.assertTrue(torch.equal(observation, self.data[index]))
+            self.assertAlmostEqual(target.item(), self.targets[index].item(), places=5)
+
+
+    def test_batches(self):
+        '''
+        Test that batches read across shard boundaries, by slice or by index array, match the database rows
+        '''
+        dataset = ShardedTrainingDataset(self.shard_dir)
+
+        observations, targets = dataset[5:27]
+        self.assertTrue(torch.equal(observations, self.data[5:27]))
+        self.assertTrue(torch.allclose(targets, self.targets[5:27]))
+
+        indices = np.array([41, 3, 17, 18, 30])
+        observations, targets = dataset[indices]
+        self.assertTrue(torch.equal(observations, self.data[indices]))
+        self.assertTrue(torch.allclose(targets, self.targets[indices]))
+
+
+    def test_shuffled_loader(self):
+        '''
+        Test that one epoch of shuffled batches visits every row exactly once and epochs are shuffled differently
+        '''
+        dataset = ShardedTrainingDataset(self.shard_dir)
+        sampler = ShardBatchSampler(dataset, batch_size=8, shuffle=True, seed=3)
+        loader = DataLoader(dataset, sampler=sampler, batch_size=None, num_workers=2)
+
+        targets = torch.cat([batch_targets for _, batch_targets in loader])
+        self.assertEqual(len(loader), 6)
+        self.assertTrue(torch.allclose(targets.sort().values, self.targets.sort().values))
+
+        first_epoch = np.concatenate(list(sampler))
+        second_epoch = np.concatenate(list(sampler))
+        self.assertEqual(sorted(first_epoch), list(range(len(dataset))))
+        self.assertFalse(np.array_equal(first_epoch, second_epoch))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import random
+import unittest
+import numpy as np
+from vec_gamestate_env import VecMahjongEnv, winning_hands, SORTED_TILE_IDS, OBS_LENGTH
+from gamestate_env import MahjongEnv
+from gamestate import GameState
+from suit_table import is_winning_counts
+from tile import TILE_TYPES, NUM_TILE_TYPES
+
+def single_env(vec_env: VecMahjongEnv, index: int) -> MahjongEnv:
+    '''
+    Builds a MahjongEnv holding the agent's sorted hand, the discard pool, and the draw pool of one batched game
+    '''
+    env = MahjongEnv(encoding=vec_env.encoding)
+    env.state = GameState()
+    for tile_id in SORTED_TILE_IDS:
+        for _ in range(vec_env.hands[index, 0, tile_id]):
+            env.state.add_tile_to_hand(TILE_TYPES[tile_id], 'player1')
+    for tile_id in vec_env.discards[index, :vec_env.num_discards[index]]:
+        env.state.add_tile_to_discard_pool(TILE_TYPES[tile_id])
+    for tile_id in vec_env.walls[index, vec_env.heads[index]:]:
+        env.state.add_tile_to_draw_pool(TILE_TYPES[tile_id])
+    return env
+
+class TestVecMahjongEnv(unittest.TestCase):
+    def test_winning_hands(self):
+        '''
+        Test that the vectorized win check matches the single-hand win check on random and winning hands
+        '''
+        rng = random.Random(0)
+        wall = [index for index in range(NUM_TILE_TYPES) for _ in range(4)]
+        hands = []
+        for _ in range(2000):
+            counts = [0] * NUM_TILE_TYPES
+            for index in rng.sample(wall, 14):
+                counts[index] += 1
+            hands.append(counts)
+
+        # 1-2-3 stick, 1-1-1 circle, 8-8-8 stick, red-red-red, 4-4 circle
+        winning = [0] * NUM_TILE_TYPES
+        for index, count in [(0, 1), (1, 1), (2, 1), (9, 3), (7, 3), (27, 3), (12, 2)]:
+            winning[index] += count
+        hands.append(winning)
+
+        results = winning_hands(np.array(hands, dtype=np.int8))
+        self.assertEqual(list(results), [is_winning_counts(counts) for counts in hands])
+        self.assertTrue(results[-1])
+
+
+    def test_reset_deals_tiles(self):
+        '''
+        Test that every game starts with 14 tiles for player 1, 13 tiles for the other players, and an empty discard pool
+        '''
+        env = VecMahjongEnv(num_envs=8, seed=0)
+        observations = env.reset()
+
+        self.assertEqual(observations.shape, (8, OBS_LENGTH))
+        self.assertEqual(env.hands.sum(axis=2).tolist(), [[14, 13, 13, 13]] * 8)
+        self.assertTrue((env.num_discards == 0).all())
+        self.assertTrue((env.heads == 14 + 3 * 13).all())
+
+
+    def test_matches_single_env(self):
+        '''
+        Test that observations and rewards match MahjongEnv for the same hand, discard pool, and draw pool,
+        and that every tile stays in exactly one hand, the discard pool, or the wall
+        '''
+        env = VecMahjongEnv(num_envs=4, seed=1)
+        observations = env.reset()
+        rng = np.random.default_rng(1)
+
+        for _ in range(4):
+            actions = rng.integers(0, 14, size=env.num_envs)
+            for index in range(env.num_envs):
+                single = single_env(env, index)
+                self.assertTrue((single._get_obs() == observations[index]).all())
+
+                reward, _ = single._compute_reward(actions[index], 'player1', {})
+                discard_tiles = env._hand_tile_at(env.hands[:, 0], actions)
+                self.assertAlmostEqual(env._compute_rewards(discard_tiles)[index], reward, places=5)
+
+            observations, rewards, dones, infos = env.step(actions)
+
+            for index in range(env.num_envs):
+                counts = env.hands[index].sum(axis=0) + env.discard_counts[index]
+                counts += np.bincount(env.walls[index, env.heads[index]:], minlength=NUM_TILE_TYPES)
+                self.assertTrue((counts == 4).all())
+
+
+    def test_planes_match_single_env(self):
+        '''
+        Test that count plane observations match MahjongEnv with the same encoding
+        '''
+        env = VecMahjongEnv(num_envs=4, seed=3, encoding='planes')
+        observations = env.reset()
+        self.assertEqual(observations.shape, (4, env.observation_space.n))
+        rng = np.random.default_rng(3)
+
+        for _ in range(4):
+            for index in range(env.num_envs):
+                self.assertTrue((single_env(env, index)._get_obs() == observations[index]).all())
+            observations, _, _, _ = env.step(rng.integers(0, 14, size=env.num_envs))
+
+
+    def test_tile_actions(self):
+        '''
+        Test that tile actions discard the chosen tile id and that the masks, per game through env_method
+        as MaskablePPO reads them, allow exactly the tiles in hand
+        '''
+        env = VecMahjongEnv(num_envs=8, seed=4, action_mode='tile')
+        env.reset()
+        rng = np.random.default_rng(4)
+
+        for _ in range(5):
+            masks = np.stack(env.env_method('action_masks'))
+            self.assertEqual(masks.shape, (8, 34))
+            self.assertTrue(np.array_equal(masks, env.hands[:, 0] > 0))
+            self.assertTrue(np.array_equal(masks, env.action_masks()))
+
+            actions = np.array([rng.choice(np.nonzero(mask)[0]) for mask in masks])
+            num_discards = env.num_discards.copy()
+            _, _, dones, _ = env.step(actions)
+            for index in np.nonzero(~dones)[0]:
+                self.assertEqual(env.discards[index, num_discards[index]], actions[index])
+
+        with self.assertRaises(ValueError):
+            env.step(np.argmin(env.action_masks(), axis=1))
+
+
+    def test_games_reset_when_done(self):
+        '''
+        Test that finished games return their last observation in the info and start a new game
+        '''
+        env = VecMahjongEnv(num_envs=16, seed=2)
+        env.reset()
+        rng = np.random.default_rng(2)
+
+        finished = 0
+        for _ in range(40):
+            observations, rewards, dones, infos = env.step(rng.integers(0, 14, size=env.num_envs))
+            for index in np.nonzero(dones)[0]:
+                self.assertEqual(infos[index]['terminal_observation'].shape, (OBS_LENGTH,))
+                self.assertEqual(env.num_discards[index], 0)
+                self.assertEqual(env.turn_counts[index], 0)
+                finished += 1
+        self.assertGreater(finished, 0)
+
+if __name__ == '__main__':
+    unittest.main()
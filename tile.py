@@ -1,35 +1,83 @@
-import logging
-from logging.handlers import RotatingFileHandler
-import os
+import functools
+
+from logging_config import get_logger
 
 # Logging
-logger = logging.getLogger("tile_logger")
-logger.setLevel(logging.INFO)
+logger = get_logger("tile_logger", "tile_logging.log")
+
+# Each of the 34 tile types has an integer id following the suit order used by GameState.suits:
+#   0-8   stick 1-9
+#   9-17  circle 1-9
+#   18-26 10k 1-9
+#   27-33 red, green, white, east, south, west, north
+RANK_SUITS = ['stick', 'circle', '10k']
+HONOR_SUITS = ['red', 'green', 'white', 'east', 'south', 'west', 'north']
+VALID_SUITS = RANK_SUITS + HONOR_SUITS
+NUM_TILE_TYPES = 34
+NUM_RANKED_TYPES = 27
+NUM_COPIES = 4
 
-log_file_path = "logs/tile_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+# Interned tiles: (suit, rank) -> tile type id, and every physical tile indexed by id * NUM_COPIES + copy
+_type_ids = {}
+_physical_tiles = []
 
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
 
 # Define Tile class to represent game pieces
+@functools.total_ordering
 class Tile:
+    '''
+    A Mahjong tile
+
+    Tiles are interned: Tile(suit, rank) always returns the same instance for a given tile type,
+    so comparing and hashing tiles is an integer check on the tile type id.
+    Each tile type also has NUM_COPIES physical copies (see physical_tile) that compare equal to each other.
+    Tiles are immutable.
+    '''
+    __slots__ = ('suit', 'rank', 'id', 'copy')
+
     # Iniitialization
-    def __init__(self, suit: str, rank: int=None):
-        valid_suits = ['stick', 'circle', '10k', 'red', 'green', 'white', 'east', 'south', 'west', 'north']
-        if suit in valid_suits:
-            self.suit = suit
-        else:
+    def __new__(cls, suit: str, rank: int=None):
+        # A rank that only compares equal to an int (e.g. 3.0) would otherwise match an interned tile
+        if rank is not None and not isinstance(rank, int):
+            logger.error(f"Error: {rank} is an invalid rank")
+            raise ValueError(f"{rank} is an invalid rank")
+
+        try:
+            tile_id = _type_ids.get((suit, rank))
+        except TypeError:
+            # Unhashable suits are never valid
+            tile_id = None
+        if tile_id is not None:
+            return _physical_tiles[tile_id * NUM_COPIES]
+
+        if suit not in VALID_SUITS:
             logger.error(f"Error: {suit} is an invalid suit")
             raise ValueError(f"{suit} is an invalid suit")
-        
-        if rank is None or (isinstance(rank, int) and 1 <= rank <= 9):
-            self.rank = rank
-        else:
-            logger.error(f"Error: {rank} is an invalid rank")
-            raise ValueError(f"{rank} is an invalid rank")    
-        
+        logger.error(f"Error: {rank} is an invalid rank")
+        raise ValueError(f"{rank} is an invalid rank")
+
+    @classmethod
+    def _create(cls, suit: str, rank: int, tile_id: int, copy: int) -> 'Tile':
+        tile = object.__new__(cls)
+        object.__setattr__(tile, 'suit', suit)
+        object.__setattr__(tile, 'rank', rank)
+        object.__setattr__(tile, 'id', tile_id)
+        object.__setattr__(tile, 'copy', copy)
+        return tile
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Tile objects are immutable")
+
+    # Interned tiles are shared, so copies and pickles resolve to the same instance
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (physical_tile, (self.id, self.copy))
+
     # Customize representation for print statements to aid in debugging
     def __repr__(self):
         if self.rank:
@@ -37,18 +85,52 @@ class Tile:
         else:
             return f"{self.suit}"
 
-    # Allow comparison of two Tile objects 
+    # Allow comparison of two Tile objects
     def __eq__(self, other):
-            if isinstance(other, Tile):
-                if self.rank:
-                    return self.suit == other.suit and self.rank == other.rank
-                else:
-                    return self.suit == other.suit
-            return False
+        if isinstance(other, Tile):
+            return self.id == other.id
+        return False
+
+    def __hash__(self):
+        return self.id
+
+    # Order tiles by tile type id (functools.total_ordering fills in <=, > and >=)
+    def __lt__(self, other):
+        if isinstance(other, Tile):
+            return self.id < other.id
+        return NotImplemented
 
     # Allow tiles to be displayed via "tile.display()"
     def display(self):
         if self.rank:
             print(f"{self.rank} {self.suit}")
         else:
-            print(f"{self.suit}")
\ No newline at end of file
+            print(f"{self.suit}")
+
+
+def physical_tile(tile_id: int, copy: int = 0) -> Tile:
+    '''
+    Returns one of the NUM_COPIES physical copies of a tile type
+
+    Args:
+    tile_id: tile type id (0-33)
+    copy: copy index (0-3)
+    '''
+    return _physical_tiles[tile_id * NUM_COPIES + copy]
+
+
+def _intern_tiles() -> None:
+    types = [(suit, rank) for suit in RANK_SUITS for rank in range(1, 10)] + [(suit, None) for suit in HONOR_SUITS]
+    for tile_id, (suit, rank) in enumerate(types):
+        _type_ids[(suit, rank)] = tile_id
+        for copy in range(NUM_COPIES):
+            _physical_tiles.append(Tile._create(suit, rank, tile_id, copy))
+
+
+_intern_tiles()
+
+# The canonical (copy 0) instance of each tile type, indexed by tile type id
+TILE_TYPES = tuple(_physical_tiles[tile_id * NUM_COPIES] for tile_id in range(NUM_TILE_TYPES))
+
+# Every physical tile, indexed by tile type id * NUM_COPIES + copy
+PHYSICAL_TILES = tuple(_physical_tiles)
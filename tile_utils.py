@@ -1,22 +1,14 @@
 from tile import Tile
 from gamestate import GameState
-import itertools
-import copy
+from hand_counts import hand_to_counts, group_to_tiles
+from suit_table import find_decomposition
+from scoring import best_decomposition
+from hand_cache import HandCache
 
-import logging
-from logging.handlers import RotatingFileHandler
-import os
+from logging_config import get_logger
 
 # Logging
-logger = logging.getLogger("tile_utils_logger")
-logger.setLevel(logging.INFO)
-
-log_file_path = "logs/tile_utils_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+logger = get_logger("tile_utils_logger", "tile_utils_logging.log")
 
 
 # Method to check if three tiles form a set
@@ -83,14 +75,14 @@ def is_run(tile1: Tile, tile2: Tile, tile3: Tile) -> bool:
         
         # Check that all tiles are of the same suit
         if not(tile1.suit == tile2.suit == tile3.suit):
-            logger.debug(f"Tiles have different suits: {tile1.suit}, {tile2.suit}, {tile3.suit}")
+            logger.debug("Tiles have different suits: %s, %s, %s", tile1.suit, tile2.suit, tile3.suit)
             return False
         
         # Check that the tiles are eligible to form a run (that they have a rank)
         if (tile1.rank == None
             or tile2.rank == None
             or tile3.rank == None):
-            logger.debug(f"One or more tiles do not have a rank.")
+            logger.debug("One or more tiles do not have a rank.")
             return False
         
         # Sort the tiles by rank
@@ -101,8 +93,8 @@ def is_run(tile1: Tile, tile2: Tile, tile3: Tile) -> bool:
                 sorted_tiles[2].rank == sorted_tiles[0].rank + 2):
             return True
         else:
-            logger.debug("Tiles are not consecutive: "
-                            f"{sorted_tiles[0].rank}, {sorted_tiles[1].rank}, {sorted_tiles[2].rank}")
+            logger.debug("Tiles are not consecutive: %s, %s, %s",
+                         sorted_tiles[0].rank, sorted_tiles[1].rank, sorted_tiles[2].rank)
             return False
     
     except Exception as e:
@@ -110,19 +102,18 @@ def is_run(tile1: Tile, tile2: Tile, tile3: Tile) -> bool:
         return False
 
 
-# Features to add:
-# 1) handle sets with multiple win conditions
-def is_winning_hand(gamestate: GameState, player: str):
+def is_winning_hand(gamestate: GameState, player: str, cache: HandCache = None):
     '''
     Checks whether a player's hand meets any win conditions
 
     Inputs:
     gamestate - state of the game
     player - key to GameState players dictionary (e.g. 'player1')
+    cache - optional HandCache to look the hand up in (the grouping returned is then the highest scoring one)
 
     Returns:
     is_winning - boolean
-    grouped_hand - the winning hand grouped into sets
+    grouped_hand - the winning hand grouped into sets (None if the hand is not winning)
         e.g. ((1 circle, 1 circle, 1 circle), (1 stick, 2 stick, 3 stick), (8 stick, 8 stick, 8 stick), (9 stick, 9 stick, 9 stick), (4 circle, 4 circle))
     '''
     if not isinstance(player, str):
@@ -133,68 +124,64 @@ def is_winning_hand(gamestate: GameState, player: str):
         logger.error(f"Error: cannot retrieve player hand. Player {player} does not exist.")
         raise ValueError(f"Player {player} does not exist.")
     
-    # Initialize return values
-    is_winning = False
-    combination = []
-
-    # Sort and retrieve player hand
+    # Sort player hand and decompose its tile counts into sets/runs/quads and a double
     gamestate.sort_player_hand(player)
-    player_hand = copy.deepcopy(gamestate.players[player])
+    if cache is not None:
+        macro_direction = gamestate.macro_direction[0]
+        micro_direction = gamestate.micro_direction[gamestate.players_to_int[player]]
+        _, groups, _ = cache.lookup(gamestate.hand_counts[player], macro_direction, micro_direction)
+    else:
+        counts = hand_to_counts(gamestate.players[player])
+        groups = find_decomposition(counts)
 
-    # Generate a list of all valid runs/sets
-    groups = list(itertools.combinations(player_hand, 3))
-    valid_groups = []
-    for group in groups:
-        # if is_set(*group):
-        if is_set(group[0], group[1], group[2]):
-            valid_groups.append(group)
-        elif is_run(group[0], group[1], group[2]):
-            valid_groups.append(group)
-    
-    # Check if there are enough valid groups to form a winning hand
-    if len(valid_groups) < 4:
-        logger.debug("len(valid_groups) < 4")
-        return is_winning, None
-    
-    # Generate all combinations of four groups
-    combinations = list(itertools.combinations(valid_groups, 4))
+    if groups is None:
+        return False, None
 
-    # Check all possible combinations of four groups for a valid winning hand
-    for grouped_hand in combinations:
-        # Reset player_hand for each check
-        player_hand = copy.deepcopy(gamestate.players[player])
+    grouped_hand = tuple(group_to_tiles(group) for group in groups)
+    return True, grouped_hand
 
-        # Boolean controls whether or not to check for final double
-        win_possible = True
+def best_grouped_hand(gamestate: GameState, player: str):
+    '''
+    Finds the highest scoring way to group a player's winning hand
+    Some hands can be grouped more than one way (e.g. three identical runs or three sets), and each grouping can score differently
 
-        # Flatten combination of four groups
-        flattened_hand = [tile for group in grouped_hand for tile in group]
+    Inputs:
+    gamestate - state of the game
+    player - key to GameState players dictionary (e.g. 'player1')
 
-        # Check whether the combination of four groups can be made using tiles in player_hand (i.e. no repeat tiles used)
-        for tile in flattened_hand:
-            if tile in player_hand:
-                player_hand.remove(tile)
-            else:
-                win_possible = False
-                break
-        
-        # Check whether final two tiles are identical
-        if win_possible and is_set(player_hand[0], player_hand[1]):
-            is_winning = True
-            # Add the last two tiles as a group of two to combination
-            double = (player_hand[0], player_hand[1])
-            grouped_hand += (double,)
-            return is_winning, grouped_hand
+    Returns:
+    score - integer representing the score of the best grouping (0 if the hand is not winning)
+    grouped_hand - the best grouping of the winning hand (None if the hand is not winning)
+    '''
+    if not isinstance(player, str):
+        logger.error(f"Error: player input {player} is not a string.")
+        raise ValueError(f"Player input {player} is not a string.")
     
-    return is_winning, grouped_hand
+    if player not in gamestate.players:
+        logger.error(f"Error: cannot retrieve player hand. Player {player} does not exist.")
+        raise ValueError(f"Player {player} does not exist.")
+
+    gamestate.sort_player_hand(player)
+    counts = hand_to_counts(gamestate.players[player])
+    macro_direction = gamestate.macro_direction[0]
+    micro_direction = gamestate.micro_direction[gamestate.players_to_int[player]]
+    score, groups = best_decomposition(counts, macro_direction, micro_direction)
 
-def compute_score(gamestate: GameState, player: str) -> int:
+    if groups is None:
+        return 0, None
+
+    grouped_hand = tuple(group_to_tiles(group) for group in groups)
+    return score, grouped_hand
+
+def compute_score(gamestate: GameState, player: str, cache: HandCache = None) -> int:
     '''
     Computes score of a player's hand
+    If the hand can be grouped more than one way, the highest scoring grouping is used
 
     Inputs:
     gamestate - state of the game
     player - key to GameState players dictionary (e.g. 'player1')
+    cache - optional HandCache to look the hand up in
 
     Returns:
     score - integer representing the score of a player's hand
@@ -207,98 +194,12 @@ def compute_score(gamestate: GameState, player: str) -> int:
         logger.error(f"Error: cannot retrieve player hand. Player {player} does not exist.")
         raise ValueError(f"Player {player} does not exist.")
     
-    is_winning, grouped_hand = is_winning_hand(gamestate, player)
-
-    if not is_winning:
-        score = 0
+    # Score the hand's count vector directly; the winning grouping itself is not needed
+    gamestate.sort_player_hand(player)
+    macro_direction = gamestate.macro_direction[0]
+    micro_direction = gamestate.micro_direction[gamestate.players_to_int[player]]
+    if cache is not None:
+        _, _, score = cache.lookup(gamestate.hand_counts[player], macro_direction, micro_direction)
         return score
-
-    # Initialize score - a winning hand has a base value of 2 points
-    score = 2
-
-    rank_suits = ['stick', 'circle', '10k']
-    color_suits = ['red', 'green', 'white']
-    direction_suits = ['east', 'south', 'west', 'north']
-
-    ####################################################################################################################
-    # Score check 1 - check whether all tiles with ranks are of the same suit
-    # Initializations
-    same_suit = False
-    suit = None
-    num_groups = 0
-    count = 0
-
-    # Count the number of groups that have suits and select a suit to compare against
-    for group in grouped_hand:
-        if group[0].suit in rank_suits:
-            num_groups += 1
-            suit = group[0].suit
-
-    # Check whether all tiles with ranks have the same suits
-    if suit != None:
-        for group in grouped_hand:
-            if group[0].suit == suit:
-                count += 1 
-    if count == num_groups:
-        same_suit = True
-
-    # Add 3 points to the score if all tiles with ranks have the same suit
-    if same_suit:
-        score += 3
-
-    ####################################################################################################################
-    # Score check 2 - check whether all groups are sets/runs
-    # If all groups are sets, add 3 points to the score
-    # If all groups are runs, add 1 point to the score
-    sets_runs = []
-    for group in grouped_hand:
-        if (len(group) != 2
-            and group[0].suit in rank_suits):
-            if is_set(*group):
-                sets_runs.append('set')
-            else:
-                sets_runs.append('run')
-    
-    if all(x == sets_runs[0] for x in sets_runs):
-        # Add 3 points if all groups are sets
-        if sets_runs[0] == 'set':
-            score += 3
-        # Add 1 point if all groups are runs
-        else:
-            score += 1
-
-    ####################################################################################################################
-    # Score check 3 - check whether any groups are colors
-    for group in grouped_hand:
-        if group[0].suit in color_suits:
-            if len(group) == 2:
-                score = 2
-                return score
-            else:
-                score += 1
-
-
-    ####################################################################################################################
-    # Score check 4 - check for macro direction
-    for group in grouped_hand:
-        if group[0].suit in direction_suits:
-            if len(group) == 2:
-                score = 2
-                return score
-            elif group[0].suit == gamestate.macro_direction[0]:
-                score += 1
-                break
-
-
-    ####################################################################################################################
-    # Score check 5 - check for micro direction
-    for group in grouped_hand:
-        if group[0].suit in direction_suits:
-            if len(group) == 2:
-                score = 2
-                return score
-            elif group[0].suit == gamestate.micro_direction[gamestate.players_to_int[player]]:
-                score += 1
-                break
-
+    score, _ = best_decomposition(gamestate.hand_counts[player], macro_direction, micro_direction)
     return score
@@ -1,23 +1,15 @@
 import os
-import logging
-from logging.handlers import RotatingFileHandler
+from logging_config import get_logger
 import time
 
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+from stable_baselines3.common.vec_env import VecMonitor
 
 from gamestate_env import MahjongEnv
+from vec_gamestate_env import VecMahjongEnv
 
 # === Logging Setup ===
-logger = logging.getLogger("train_discard_logger")
-logger.setLevel(logging.INFO)
-
-log_file_path = "logs/train_discard_logging.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-
-file_handler = RotatingFileHandler(log_file_path, maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+logger = get_logger("train_discard_logger", "train_discard_logging.log")
 
 logger.info("=== Starting Mahjong discard model training ===")
 
@@ -28,16 +20,29 @@ log_dir = f"logs/{model_name}"
 os.makedirs(log_dir, exist_ok=True)
 
 # === Environment Setup ===
-env = DummyVecEnv([lambda: MahjongEnv()])
+# Number of games stepped together by the batched environment
+num_envs = 64
+# Observation encoding: 'vector' (1851 values) or 'planes' (280 values); a saved model only works with the
+# encoding it was trained on, so change model_name along with it
+encoding = "vector"
+# Action mode: 'index' (14 hand positions) or 'tile' (34 tile types, duplicate tiles merged); 'tile' trains with
+# sb3-contrib's MaskablePPO so only tiles in hand are sampled
+action_mode = "index"
+env = VecMahjongEnv(num_envs=num_envs, encoding=encoding, action_mode=action_mode)
 env = VecMonitor(env, filename=os.path.join(log_dir, "vec_monitor.csv"))
 
 # === Model Setup ===
+if action_mode == "tile":
+    from sb3_contrib import MaskablePPO as Algorithm
+else:
+    Algorithm = PPO
+
 if os.path.exists(model_path + ".zip"):
     logger.info("Loading existing model...")
-    model = PPO.load(model_path, env=env, device="cpu")
+    model = Algorithm.load(model_path, env=env, device="cpu")
 else:
     logger.info("Creating new model...")
-    model = PPO("MlpPolicy", env, verbose=1, device="cpu")
+    model = Algorithm("MlpPolicy", env, verbose=1, device="cpu")
 
 # === Training ===
 logger.info("Initialized PPO model.")
@@ -53,7 +58,7 @@ logger.info(f"Model saved to {model_path}")
 
 # === Evaluation ===
 logger.info("Starting evaluation episode.")
-test_env = MahjongEnv()
+test_env = MahjongEnv(encoding=encoding, action_mode=action_mode)
 obs, _ = test_env.reset()
 done = False
 
@@ -61,7 +66,10 @@ print("Initial hand:")
 test_env.render()
 
 while not done:
-    action, _ = model.predict(obs)
+    if action_mode == "tile":
+        action, _ = model.predict(obs, action_masks=test_env.action_masks())
+    else:
+        action, _ = model.predict(obs)
     obs, reward, terminated, truncated, info = test_env.step(action)
     done = terminated or truncated
 
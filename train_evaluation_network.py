@@ -1,8 +1,8 @@
-from training_data_utils import load_training_data
+from training_shards import export_shards, ShardedTrainingDataset, ShardBatchSampler, SHARD_INDEX_FILE
 import os
 import sqlite3
 import torch
-from torch.utils.data import TensorDataset, DataLoader
+from torch.utils.data import DataLoader
 import torch.optim as optim
 import torch.nn as nn
 from evaluation_network import EvaluationNet
@@ -11,19 +11,25 @@ from evaluation_network import EvaluationNet
 db_folder = "G:\\VS Code\\Mahjong_Data"
 os.makedirs(db_folder, exist_ok=True)
 db_path = os.path.join(db_folder, "mahjong_eval_net_training_data.db")
+shard_dir = os.path.join(db_folder, "mahjong_eval_net_training_shards")
 
-# Connect to SQLite database (or create it if it doesn't exist)
-conn = sqlite3.connect(db_path)
+# Export the database to memory-mapped shards once (delete shard_dir to re-export after adding data)
+if not os.path.exists(os.path.join(shard_dir, SHARD_INDEX_FILE)):
+    conn = sqlite3.connect(db_path)
+    export_shards(conn, shard_dir, decay=0.95)
+    conn.close()
 
-data, targets = load_training_data(conn, decay=0.95)
-
-# Create data loader
-dataset = TensorDataset(data, targets)
-train_loader = DataLoader(dataset, batch_size=32, shuffle=True)
+# Create data loader (each batch is read from the shards as a whole, so batch_size=None)
+# The dataset can be shared by DataLoader workers, but this script has no __main__ guard,
+# so workers are only safe where processes are forked (not on Windows)
+num_workers = 0
+dataset = ShardedTrainingDataset(shard_dir)
+train_loader = DataLoader(dataset, sampler=ShardBatchSampler(dataset, batch_size=32, shuffle=True), batch_size=None,
+                          num_workers=num_workers, persistent_workers=num_workers > 0)
 
 # Initialize model, optimizer, and loss function
 model_save_path = "G:\\VS Code\\Mahjong AI\\Evaluation_Network.pth"
-model = EvaluationNet()
+model = EvaluationNet(input_size=dataset.num_values)
 
 optimizer = optim.Adam(model.parameters(), lr=0.001)
 criterion = nn.MSELoss()
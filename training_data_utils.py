@@ -1,6 +1,162 @@
+import time
+
 import numpy as np
 import torch
 
+# Pragmas for bulk writes: write-ahead logging lets readers work while data is generated,
+# and synchronous=NORMAL only syncs at checkpoints instead of on every commit
+WRITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
+# Storage format of winner_history.gamestate_tensor
+#   version 1: MAGIC, the version byte, the number of values (uint16, little endian), then the values packed as bits
+#   legacy (no MAGIC): the raw float32 bytes of the tensor
+GAMESTATE_BLOB_MAGIC = b'MJ'
+GAMESTATE_BLOB_VERSION = 1
+GAMESTATE_BLOB_HEADER_LEN = len(GAMESTATE_BLOB_MAGIC) + 3
+
+INSERT_WINNER_HISTORY = "INSERT INTO winner_history (game_id, player, turn, gamestate_tensor, final_score) VALUES (?, ?, ?, ?, ?)"
+
+def encode_gamestate(gamestate_tensor):
+    """
+    Pack a one-hot gamestate tensor into a versioned bit-packed blob
+
+    Args:
+        gamestate_tensor (torch.Tensor): 1-D tensor of 0s and 1s (e.g. from prepare_input)
+
+    Returns:
+        bytes: Blob to store in winner_history.gamestate_tensor
+    """
+    values = gamestate_tensor.numpy() if isinstance(gamestate_tensor, torch.Tensor) else np.asarray(gamestate_tensor)
+    values = values.reshape(-1)
+    bits = values != 0
+    if not np.array_equal(bits, values == 1):
+        raise ValueError("Only tensors of 0s and 1s can be bit-packed.")
+
+    header = GAMESTATE_BLOB_MAGIC + bytes([GAMESTATE_BLOB_VERSION]) + len(values).to_bytes(2, 'little')
+    return header + np.packbits(bits).tobytes()
+
+
+def decode_gamestate(blob):
+    """
+    Convert a winner_history.gamestate_tensor blob back to a float32 tensor,
+    whether it is bit-packed or in the legacy raw float32 format
+
+    Args:
+        blob (bytes): Stored gamestate blob
+
+    Returns:
+        torch.Tensor: 1-D float32 gamestate tensor
+    """
+    if blob[:len(GAMESTATE_BLOB_MAGIC)] != GAMESTATE_BLOB_MAGIC:
+        return torch.from_numpy(np.frombuffer(blob, dtype=np.float32).copy())
+
+    version = blob[len(GAMESTATE_BLOB_MAGIC)]
+    if version != GAMESTATE_BLOB_VERSION:
+        raise ValueError(f"Unknown gamestate blob version {version}.")
+
+    num_values = int.from_bytes(blob[len(GAMESTATE_BLOB_MAGIC) + 1:GAMESTATE_BLOB_HEADER_LEN], 'little')
+    bits = np.frombuffer(blob, dtype=np.uint8, offset=GAMESTATE_BLOB_HEADER_LEN)
+    return torch.from_numpy(np.unpackbits(bits, count=num_values).astype(np.float32))
+
+
+def decode_gamestate_batch(blobs, out):
+    """
+    Decode a list of gamestate blobs into the rows of a float32 array
+
+    Blobs that share one format and length (the usual case) are decoded with a single
+    numpy call; mixed batches fall back to decode_gamestate for each blob.
+
+    Args:
+        blobs (list): Stored gamestate blobs
+        out (np.ndarray): float32 array of shape (len(blobs), number of values) to decode into
+    """
+    first = blobs[0]
+    if len({blob[:GAMESTATE_BLOB_HEADER_LEN] for blob in blobs}) == 1 and len({len(blob) for blob in blobs}) == 1:
+        joined = np.frombuffer(b''.join(blobs), dtype=np.uint8).reshape(len(blobs), len(first))
+        if first[:len(GAMESTATE_BLOB_MAGIC)] != GAMESTATE_BLOB_MAGIC:
+            out[:] = joined.view(np.float32)
+            return
+        if first[len(GAMESTATE_BLOB_MAGIC)] == GAMESTATE_BLOB_VERSION:
+            out[:] = np.unpackbits(joined[:, GAMESTATE_BLOB_HEADER_LEN:], axis=1, count=out.shape[1])
+            return
+
+    for row, blob in enumerate(blobs):
+        out[row] = decode_gamestate(blob).numpy()
+
+
+def pack_gamestate_batch(blobs, num_values):
+    """
+    Return a list of gamestate blobs as the rows of a uint8 array of bits packed with np.packbits
+
+    Bit-packed blobs already hold their values in this layout, so blobs that share one header and length
+    (the usual case) are copied without decoding; legacy and mixed batches are decoded and packed again.
+
+    Args:
+        blobs (list): Stored gamestate blobs
+        num_values (int): Number of values per gamestate
+
+    Returns:
+        np.ndarray: uint8 array of shape (len(blobs), ceil(num_values / 8))
+    """
+    first = blobs[0]
+    if (first[:len(GAMESTATE_BLOB_MAGIC)] == GAMESTATE_BLOB_MAGIC and first[len(GAMESTATE_BLOB_MAGIC)] == GAMESTATE_BLOB_VERSION
+            and len({blob[:GAMESTATE_BLOB_HEADER_LEN] for blob in blobs}) == 1 and len({len(blob) for blob in blobs}) == 1):
+        joined = np.frombuffer(b''.join(blobs), dtype=np.uint8).reshape(len(blobs), len(first))
+        return joined[:, GAMESTATE_BLOB_HEADER_LEN:]
+
+    decoded = np.empty((len(blobs), num_values), dtype=np.float32)
+    decode_gamestate_batch(blobs, decoded)
+    return np.packbits(decoded.astype(np.uint8), axis=1)
+
+
+def configure_connection(conn):
+    """
+    Apply the bulk write pragmas to a database connection
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+    """
+    for pragma in WRITE_PRAGMAS:
+        conn.execute(pragma)
+
+
+def create_winner_history_table(conn):
+    """
+    Create the table for storing winner history if it doesn't exist
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS winner_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id INTEGER,
+            player TEXT,
+            turn INTEGER,
+            gamestate_tensor BLOB,
+            final_score INTEGER
+        )
+    ''')
+    create_winner_history_index(conn)
+    conn.commit()
+
+
+def create_winner_history_index(conn):
+    """
+    Create the (game_id, turn) index used to read games back in turn order if it doesn't exist
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_winner_history_game_turn ON winner_history (game_id, turn)")
+    conn.commit()
+
+
 def get_last_game_id(conn):
     """
     Retrieve the last game_id from the database
@@ -26,7 +182,7 @@ def load_and_inspect_winner_data(conn, game_id):
     for row in rows:
         player, turn, tensor_blob, final_score = row
         # Convert the BLOB back to a PyTorch tensor
-        gamestate_tensor = torch.from_numpy(np.frombuffer(tensor_blob, dtype=np.float32))
+        gamestate_tensor = decode_gamestate(tensor_blob)
 
         print(f"Game ID: {game_id}")
         print(f"Player: {player}")
@@ -54,7 +210,7 @@ def load_winner_history(conn, game_id):
     for row in rows:
         game_id, player, turn, tensor_blob, final_score = row
         # Convert the BLOB back to a PyTorch tensor
-        gamestate_tensor = torch.from_numpy(np.frombuffer(tensor_blob, dtype=np.float32).copy())
+        gamestate_tensor = decode_gamestate(tensor_blob)
         winner_history.append((game_id, player, turn, gamestate_tensor, final_score))
 
     return winner_history
@@ -70,51 +226,166 @@ def save_winner_data(conn, game_id, winner_history, player, score):
         player (str): Player identifier (e.g., 'player1')
         score (int): Final winning score
     """
-    cursor = conn.cursor()
-    for turn, gamestate_tensor in enumerate(winner_history):
-        gamestate_blob = gamestate_tensor.numpy().tobytes()  # Convert tensor to bytes for SQLite storage
-        cursor.execute("INSERT INTO winner_history (game_id, player, turn, gamestate_tensor, final_score) VALUES (?, ?, ?, ?, ?)",
-                       (game_id, player, turn, gamestate_blob, score))
+    conn.executemany(INSERT_WINNER_HISTORY, winner_history_rows(game_id, winner_history, player, score))
     conn.commit()
 
-def load_training_data(conn, decay=0.95):
+
+def winner_history_rows(game_id, winner_history, player, score):
     """
-    Load training data from the database and apply a decaying score factor to earlier turns.
-    
+    Convert a winner's history into winner_history table rows
+
     Args:
-    conn (sqlite3.Connection): SQLite database connection
-    decay (float): Decay factor to apply to earlier turns' scores
+        game_id (int): Unique identifier for each game
+        winner_history (torch.Tensor): Tensor of winner's gamestate history
+        player (str): Player identifier (e.g., 'player1')
+        score (int): Final winning score
 
     Returns:
-    tuple: (data, targets) where data is a tensor of game states and targets are their corresponding scores.
+        list: List of (game_id, player, turn, gamestate_blob, final_score) tuples
     """
-    cursor = conn.cursor()
-    cursor.execute('SELECT game_id, turn, gamestate_tensor, final_score FROM winner_history ORDER BY game_id, turn')
-    rows = cursor.fetchall()
+    # Convert tensors to bit-packed bytes for SQLite storage
+    return [(game_id, player, turn, encode_gamestate(gamestate_tensor), score)
+            for turn, gamestate_tensor in enumerate(winner_history)]
 
-    data = []
-    targets = []
-    current_game_id = None
-    turn_count = 0
 
-    for row in rows:
-        game_id, turn, tensor_blob, final_score = row
+class WinnerHistoryWriter:
+    """
+    Buffered writer that inserts winner histories of many games with one executemany and commit
+
+    The buffer is written once it holds max_rows rows or max_seconds have passed since the last write,
+    and on flush/close. Used as a context manager, the buffer is also written when the block exits
+    through an exception (including KeyboardInterrupt), so finished games are never lost.
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+        max_rows (int): Number of buffered rows that triggers a write
+        max_seconds (float): Time since the last write that triggers a write
+    """
+    def __init__(self, conn, max_rows=5000, max_seconds=5.0):
+        self.conn = conn
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.rows = []
+        self.rows_written = 0
+        self.last_flush_time = time.monotonic()
 
-        # Reset turn count for each new game
-        if game_id != current_game_id:
-            current_game_id = game_id
-            turn_count = cursor.execute('SELECT COUNT(*) FROM winner_history WHERE game_id = ?', (game_id,)).fetchone()[0]
+    def add(self, game_id, winner_history, player, score):
+        """
+        Buffer a winner's history, writing the buffer if a threshold is reached
+
+        Args:
+            game_id (int): Unique identifier for each game
+            winner_history (torch.Tensor): Tensor of winner's gamestate history
+            player (str): Player identifier (e.g., 'player1')
+            score (int): Final winning score
+        """
+        self.rows.extend(winner_history_rows(game_id, winner_history, player, score))
+        if len(self.rows) >= self.max_rows or time.monotonic() - self.last_flush_time >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Write and commit all buffered rows
+        """
+        if self.rows:
+            with self.conn:
+                self.conn.executemany(INSERT_WINNER_HISTORY, self.rows)
+            self.rows_written += len(self.rows)
+            self.rows = []
+        self.last_flush_time = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def count_training_rows(conn):
+    """
+    Count the rows of the winner_history table
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+
+    Returns:
+        int: Number of rows
+    """
+    return conn.execute('SELECT COUNT(*) FROM winner_history').fetchone()[0]
+
+
+def iter_training_chunks(conn, decay=0.95, chunk_size=10000, limit=-1):
+    """
+    Stream the winner_history table in game/turn order with a decaying score factor applied to earlier turns.
+
+    A single query returns every row together with its game's number of turns (a window function),
+    and rows are fetched chunk_size at a time.
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+        decay (float): Decay factor to apply to earlier turns' scores
+        chunk_size (int): Number of rows per chunk
+        limit (int): Maximum number of rows to read (-1 for all rows)
+
+    Yields:
+        tuple: (blobs, targets) where blobs is a list of gamestate blobs and targets is a float32 numpy array of their scores
+    """
+    # The (game_id, turn) index, created with the table (or by migrate_training_data for older databases),
+    # lets SQLite read games in that order without sorting the whole table
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT turn, final_score, COUNT(*) OVER (PARTITION BY game_id) AS turn_count, gamestate_tensor
+        FROM winner_history
+        ORDER BY game_id, turn
+        LIMIT ?
+    ''', (limit,))
+
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        turns, final_scores, turn_counts, blobs = zip(*rows)
 
         # Apply decay based on how far the turn is from the final turn
-        adjusted_score = final_score * (decay ** (turn_count - turn - 1))
+        exponents = np.array(turn_counts, dtype=np.float64) - np.array(turns, dtype=np.float64) - 1
+        targets = (np.array(final_scores, dtype=np.float64) * decay ** exponents).astype(np.float32)
+        yield list(blobs), targets
 
-        # Convert the tensor BLOB back to a PyTorch tensor
-        gamestate_tensor = torch.from_numpy(np.frombuffer(tensor_blob, dtype=np.float32).copy())
-        data.append(gamestate_tensor)
-        targets.append(adjusted_score)
 
-    # Stack all the tensors for efficient batch processing
-    data = torch.stack(data)
-    targets = torch.tensor(targets, dtype=torch.float32)
+def load_training_data(conn, decay=0.95, chunk_size=10000):
+    """
+    Load training data from the database and apply a decaying score factor to earlier turns.
+
+    Rows are streamed by iter_training_chunks and decoded chunk by chunk straight into preallocated tensors.
     
-    return data, targets
\ No newline at end of file
+    Args:
+    conn (sqlite3.Connection): SQLite database connection
+    decay (float): Decay factor to apply to earlier turns' scores
+    chunk_size (int): Number of rows fetched and decoded at a time
+
+    Returns:
+    tuple: (data, targets) where data is a tensor of game states and targets are their corresponding scores.
+    """
+    num_rows = count_training_rows(conn)
+    if num_rows == 0:
+        return torch.empty((0, 0)), torch.empty(0)
+
+    data = None
+    targets = torch.empty(num_rows, dtype=torch.float32)
+    start = 0
+    for blobs, chunk_targets in iter_training_chunks(conn, decay, chunk_size, limit=num_rows):
+        if data is None:
+            data = torch.empty((num_rows, len(decode_gamestate(blobs[0]))), dtype=torch.float32)
+            data_array = data.numpy()
+        end = start + len(blobs)
+
+        # Convert the tensor BLOBs back to game states
+        decode_gamestate_batch(blobs, data_array[start:end])
+        targets[start:end] = torch.from_numpy(chunk_targets)
+        start = end
+
+    # Rows deleted by another connection since the count leave the end unfilled
+    return data[:start], targets[:start]
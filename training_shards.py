@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import sqlite3
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler
+
+from training_data_utils import count_training_rows, iter_training_chunks, decode_gamestate, pack_gamestate_batch
+
+# Layout of an exported shard directory
+#   index.json - format version, number of values per observation, decay, and the shards with their row counts
+#   shard_XXXXX_observations.npy - uint8 (rows, ceil(num_values / 8)) observations packed as bits (np.packbits)
+#   shard_XXXXX_targets.npy - float32 (rows,) decayed scores
+SHARD_FORMAT_VERSION = 1
+SHARD_INDEX_FILE = 'index.json'
+
+
+def export_shards(conn, shard_dir, decay=0.95, rows_per_shard=1_000_000, chunk_size=10000):
+    """
+    Export the winner_history table to memory-mappable training shards
+
+    Rows are streamed from the database in game/turn order, so memory use does not depend on the table size.
+
+    Args:
+        conn (sqlite3.Connection): SQLite connection object
+        shard_dir (str): Directory to write the shards and index to
+        decay (float): Decay factor to apply to earlier turns' scores
+        rows_per_shard (int): Maximum number of rows per shard
+        chunk_size (int): Number of rows read from the database at a time
+
+    Returns:
+        int: Number of rows exported
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    num_rows = count_training_rows(conn)
+
+    shards = []
+    observations = targets = None
+    num_values = 0
+    shard_row = 0
+    row = 0
+    for blobs, chunk_targets in iter_training_chunks(conn, decay, chunk_size, limit=num_rows):
+        if row == 0:
+            num_values = len(decode_gamestate(blobs[0]))
+        packed = pack_gamestate_batch(blobs, num_values)
+
+        start = 0
+        while start < len(blobs):
+            # Start a new shard when the current one is full
+            if observations is None or shard_row == len(targets):
+                shard_rows = min(rows_per_shard, num_rows - row)
+                name = f"shard_{len(shards):05d}"
+                observations = np.lib.format.open_memmap(os.path.join(shard_dir, f"{name}_observations.npy"), mode='w+',
+                                                         dtype=np.uint8, shape=(shard_rows, packed.shape[1]))
+                targets = np.lib.format.open_memmap(os.path.join(shard_dir, f"{name}_targets.npy"), mode='w+',
+                                                    dtype=np.float32, shape=(shard_rows,))
+                shards.append({'observations': f"{name}_observations.npy", 'targets': f"{name}_targets.npy", 'rows': shard_rows})
+                shard_row = 0
+
+            end = min(len(blobs), start + len(targets) - shard_row)
+            observations[shard_row:shard_row + end - start] = packed[start:end]
+            targets[shard_row:shard_row + end - start] = chunk_targets[start:end]
+            shard_row += end - start
+            row += end - start
+            start = end
+
+            if shard_row == len(targets):
+                observations.flush()
+                targets.flush()
+
+    if observations is not None:
+        observations.flush()
+        targets.flush()
+
+    index = {
+        'version': SHARD_FORMAT_VERSION,
+        'num_values': num_values,
+        'decay': decay,
+        'shards': shards,
+    }
+    with open(os.path.join(shard_dir, SHARD_INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+
+    return row
+
+
+class ShardedTrainingDataset(Dataset):
+    """
+    Training data read from exported shards through memory maps
+
+    Indexing with an int returns one (observation, target) pair. Indexing with a slice or a sequence of
+    indices returns a whole batch as (observations, targets) tensors, reading only those rows from the maps;
+    pair it with ShardBatchSampler and DataLoader(batch_size=None) to load batches this way.
+
+    The shards are mapped lazily in each process, so DataLoader workers share the OS page cache
+    instead of copying the data.
+
+    Args:
+        shard_dir (str): Directory written by export_shards
+    """
+    def __init__(self, shard_dir):
+        with open(os.path.join(shard_dir, SHARD_INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get('version') != SHARD_FORMAT_VERSION:
+            raise ValueError(f"Unknown shard format version {index.get('version')}.")
+
+        self.shard_dir = shard_dir
+        self.num_values = index['num_values']
+        self.shards = index['shards']
+        self.offsets = np.cumsum([0] + [shard['rows'] for shard in self.shards])
+        self._maps = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getstate__(self):
+        # Memory maps are reopened in each worker rather than pickled
+        state = self.__dict__.copy()
+        state['_maps'] = None
+        return state
+
+    def _open(self):
+        self._maps = [(np.load(os.path.join(self.shard_dir, shard['observations']), mmap_mode='r'),
+                       np.load(os.path.join(self.shard_dir, shard['targets']), mmap_mode='r'))
+                      for shard in self.shards]
+
+    def __getitem__(self, index):
+        if self._maps is None:
+            self._open()
+
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("dataset index out of range")
+            shard = int(np.searchsorted(self.offsets, index, side='right')) - 1
+            observations, targets = self._maps[shard]
+            row = index - self.offsets[shard]
+            observation = np.unpackbits(observations[row], count=self.num_values).astype(np.float32)
+            return torch.from_numpy(observation), torch.tensor(targets[row])
+
+        if isinstance(index, slice):
+            indices = np.arange(len(self))[index]
+        else:
+            indices = np.asarray(index, dtype=np.int64)
+        return self.get_batch(indices)
+
+    def get_batch(self, indices):
+        """
+        Read a batch of rows
+
+        Args:
+            indices (np.ndarray): Dataset indices of the rows
+
+        Returns:
+            tuple: (observations, targets) float32 tensors of shape (len(indices), num_values) and (len(indices),)
+        """
+        if self._maps is None:
+            self._open()
+
+        packed = np.empty((len(indices), (self.num_values + 7) // 8), dtype=np.uint8)
+        targets = np.empty(len(indices), dtype=np.float32)
+        shards = np.searchsorted(self.offsets, indices, side='right') - 1
+        for shard in np.unique(shards):
+            in_shard = np.nonzero(shards == shard)[0]
+            rows = indices[in_shard] - self.offsets[shard]
+            shard_observations, shard_targets = self._maps[shard]
+
+            # Contiguous rows are read as one slice of the map
+            if np.all(np.diff(rows) == 1):
+                packed[in_shard] = shard_observations[rows[0]:rows[-1] + 1]
+                targets[in_shard] = shard_targets[rows[0]:rows[-1] + 1]
+            else:
+                packed[in_shard] = shard_observations[rows]
+                targets[in_shard] = shard_targets[rows]
+
+        observations = np.unpackbits(packed, axis=1, count=self.num_values).astype(np.float32)
+        return torch.from_numpy(observations), torch.from_numpy(targets)
+
+
+class ShardBatchSampler(Sampler):
+    """
+    Yields batches of dataset indices, shuffled across all shards every epoch
+
+    The indices within each batch are sorted, so rows from the same shard are read from the maps in order.
+
+    Args:
+        dataset (ShardedTrainingDataset): Dataset to sample from
+        batch_size (int): Number of rows per batch
+        shuffle (bool): Whether to shuffle the rows each epoch
+        drop_last (bool): Whether to drop the last batch if it is smaller than batch_size
+        seed (int): Seed of the shuffle (epoch e uses seed + e)
+    """
+    def __init__(self, dataset, batch_size, shuffle=True, drop_last=False, seed=0):
+        self.num_rows = len(dataset)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self):
+        if self.drop_last:
+            return self.num_rows // self.batch_size
+        return (self.num_rows + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if self.shuffle:
+            order = np.random.default_rng(self.seed + self.epoch).permutation(self.num_rows)
+        else:
+            order = np.arange(self.num_rows)
+        self.epoch += 1
+
+        for batch in range(len(self)):
+            yield np.sort(order[batch * self.batch_size:(batch + 1) * self.batch_size])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a training database to memory-mappable shards")
+    parser.add_argument('db_path', help="path of the SQLite training database")
+    parser.add_argument('shard_dir', help="directory to write the shards to")
+    parser.add_argument('--decay', type=float, default=0.95, help="decay factor applied to earlier turns' scores")
+    parser.add_argument('--rows-per-shard', type=int, default=1_000_000, help="maximum number of rows per shard")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_path)
+    num_rows = export_shards(conn, args.shard_dir, args.decay, args.rows_per_shard)
+    conn.close()
+    print(f"Exported {num_rows} rows to {args.shard_dir}")
@@ -0,0 +1,309 @@
+## FOR DISCARDING TILES - BATCHED VERSION OF gamestate_env.MahjongEnv ##
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from preprocessing import (BLANK_TILE, OBS_TILES, OBS_LENGTH, SORTED_TILE_IDS, encode_observation_batch, encode_planes_batch,
+                           observation_length)
+from gamestate_env import ACTION_MODES
+from rewards import discard_rewards
+from hand_counts import QUAD
+from suit_table import get_suit_table
+from tile import TILE_TYPES, NUM_TILE_TYPES, NUM_RANKED_TYPES, NUM_COPIES
+
+from logging_config import get_logger
+
+# Logging
+logger = get_logger("vec_gamestate_env_logger", "vec_gamestate_env_logging.log")
+
+NUM_PLAYERS = 4
+NUM_TILES = NUM_TILE_TYPES * NUM_COPIES
+HAND_SIZE = 14
+
+# Every tile of a full set as a tile id; each game shuffles its own copy
+WALL_TILE_IDS = np.repeat(np.arange(NUM_TILE_TYPES, dtype=np.uint8), NUM_COPIES)
+
+# Player index receiving each of the first 53 tiles of the wall in GameState.deal_tiles
+DEAL_ORDER = np.array(
+    [player for _ in range(3) for player in range(NUM_PLAYERS) for _ in range(4)]
+    + list(range(NUM_PLAYERS)) + [0], dtype=np.intp)
+NUM_DEALT = len(DEAL_ORDER)
+
+# Unrevealed tiles and padding are encoded with the blank last row of TILE_ENCODING_TABLE
+EMPTY_TILE = BLANK_TILE
+
+# Powers of 5 to turn the 9 rank counts of a suit into an index into the dense suit lookup
+SUIT_POWERS = 5 ** np.arange(9, dtype=np.int64)
+
+_suit_lookup = None
+
+
+def get_suit_lookup() -> np.ndarray:
+    '''
+    Returns a dense boolean array over every 9-rank count pattern (indexed by the base-5 number of the counts)
+    that is True where the pattern can be split into sets/runs and at most one double
+
+    Built on first use from suit_table, so it matches the single-hand win check exactly for the 14-tile hands
+    of VecMahjongEnv (no player calls gon, so a winning hand never holds a quad and quads are left out)
+    '''
+    global _suit_lookup
+    if _suit_lookup is None:
+        patterns = [pattern for pattern, decompositions in get_suit_table().items()
+                    if any(all(group // NUM_TILE_TYPES != QUAD for group in groups) for groups in decompositions)]
+        patterns = np.frombuffer(b''.join(patterns), dtype=np.uint8).reshape(-1, 9)
+        _suit_lookup = np.zeros(5 ** 9, dtype=bool)
+        _suit_lookup[patterns.astype(np.int64) @ SUIT_POWERS] = True
+    return _suit_lookup
+
+
+def winning_hands(counts: np.ndarray) -> np.ndarray:
+    '''
+    Vectorized suit_table.is_winning_counts
+
+    Args:
+    counts: (N, 34) array of 14-tile hand count vectors
+
+    Returns:
+    is_winning: (N,) boolean array
+    '''
+    suit_lookup = get_suit_lookup()
+    ranked = counts[:, :NUM_RANKED_TYPES].reshape(-1, 3, 9).astype(np.int64)
+    suits_ok = suit_lookup[ranked @ SUIT_POWERS].all(axis=1)
+
+    # A ranked suit holds the double exactly when its tile count is 2 mod 3
+    num_doubles = (ranked.sum(axis=2) % 3 == 2).sum(axis=1)
+
+    honors = counts[:, NUM_RANKED_TYPES:]
+    honors_ok = ((honors == 0) | (honors == 2) | (honors == 3)).all(axis=1)
+    num_doubles += (honors == 2).sum(axis=1)
+
+    return suits_ok & honors_ok & (num_doubles == 1)
+
+
+class VecMahjongEnv(VecEnv):
+    '''
+    num_envs independent copies of gamestate_env.MahjongEnv stepped together with NumPy
+
+    Each game is held as arrays instead of a GameState:
+        walls: (N, 136) shuffled tile ids, drawn from the front through heads
+        hands: (N, 4, 34) count vectors of each player's hand
+        discards: (N, 136) tile ids of the discard pool in discard order, discard_counts: (N, 34) its count vector
+        macro_directions/micro_directions: (N,) index of the current direction into GameState.directions
+
+    Observations, actions, and rewards follow MahjongEnv, except that the hand is always encoded (and indexed by actions)
+    in GameState.sort_player_hand order, which MahjongEnv only uses from the second turn on.
+    Finished games are reset automatically and their last observation is returned in info['terminal_observation'].
+    '''
+    def __init__(self, num_envs: int = 64, seed: int = None, encoding: str = 'vector', action_mode: str = 'index'):
+        self.render_mode = None
+        self.max_turns = 200
+        self.encoding = encoding
+        if action_mode not in ACTION_MODES:
+            raise ValueError(f"Unknown action mode: {action_mode}")
+        self.action_mode = action_mode
+
+        observation_space = spaces.MultiBinary(observation_length(encoding))
+        action_space = spaces.Discrete(NUM_TILE_TYPES if action_mode == 'tile' else HAND_SIZE)
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.np_random = np.random.default_rng(seed)
+        self.walls = np.zeros((num_envs, NUM_TILES), dtype=np.uint8)
+        self.heads = np.zeros(num_envs, dtype=np.intp)
+        self.hands = np.zeros((num_envs, NUM_PLAYERS, NUM_TILE_TYPES), dtype=np.int8)
+        self.discards = np.full((num_envs, NUM_TILES), EMPTY_TILE, dtype=np.uint8)
+        self.num_discards = np.zeros(num_envs, dtype=np.intp)
+        self.discard_counts = np.zeros((num_envs, NUM_TILE_TYPES), dtype=np.int8)
+        self.macro_directions = np.zeros(num_envs, dtype=np.intp)
+        self.micro_directions = np.zeros(num_envs, dtype=np.intp)
+        self.turn_counts = np.zeros(num_envs, dtype=np.intp)
+        self.actions = None
+        logger.info(f"Created VecMahjongEnv with {num_envs} games.")
+
+
+    def reset(self) -> np.ndarray:
+        if self._seeds[0] is not None:
+            self.np_random = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+
+        rows = np.arange(self.num_envs)
+        self._reset_games(rows)
+        return self._get_obs(rows)
+
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.actions = np.asarray(actions, dtype=np.intp).reshape(self.num_envs)
+
+
+    def step_wait(self):
+        rows = np.arange(self.num_envs)
+        agent_hands = self.hands[:, 0]
+
+        # Compute reward using action, then apply action
+        if self.action_mode == 'tile':
+            if (agent_hands[rows, self.actions] == 0).any():
+                illegal = np.nonzero(agent_hands[rows, self.actions] == 0)[0]
+                logger.error(f"Illegal actions in games {illegal.tolist()}: tile ids not in hand.")
+                raise ValueError(f"Discarded tile ids are not in hand in games {illegal.tolist()} (see action_masks)")
+            discard_tiles = self.actions
+        else:
+            discard_tiles = self._hand_tile_at(agent_hands, self.actions)
+        rewards = self._compute_rewards(discard_tiles)
+        self._discard(rows, 0, discard_tiles)
+
+        # Cycle over other players - draw from top of draw pool and discard randomly
+        ended = np.zeros(self.num_envs, dtype=bool)
+        for player in range(1, NUM_PLAYERS):
+            ended |= self.heads == NUM_TILES
+            drawing = rows[~ended]
+            self._draw(drawing, player)
+            won = winning_hands(self.hands[drawing, player])
+            ended[drawing[won]] = True
+
+            discarding = drawing[~won]
+            positions = self.np_random.integers(0, HAND_SIZE, size=len(discarding))
+            self._discard(discarding, player, self._hand_tile_at(self.hands[discarding, player], positions))
+
+        ended |= self.heads == NUM_TILES
+
+        # The agent draws for its next turn
+        drawing = rows[~ended]
+        self._draw(drawing, 0)
+        ended[drawing] = (self.heads[drawing] == NUM_TILES) | winning_hands(self.hands[drawing, 0])
+
+        self.turn_counts += 1
+        truncated = self.turn_counts >= self.max_turns
+        dones = ended | truncated
+
+        observations = self._get_obs(rows)
+        infos = [{} for _ in range(self.num_envs)]
+        done_rows = rows[dones]
+        for row in done_rows:
+            infos[row]['terminal_observation'] = observations[row].copy()
+            infos[row]['TimeLimit.truncated'] = bool(truncated[row] and not ended[row])
+
+        if len(done_rows) > 0:
+            self._reset_games(done_rows)
+            observations[done_rows] = self._get_obs(done_rows)
+
+        return observations, rewards, dones, infos
+
+
+    def close(self) -> None:
+        pass
+
+
+    def get_attr(self, attr_name: str, indices=None) -> list:
+        '''
+        Returns the attribute of the batched environment once for each requested game
+        '''
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+
+    def set_attr(self, attr_name: str, value, indices=None) -> None:
+        '''
+        Sets an attribute of the batched environment, which is shared by every game
+        '''
+        setattr(self, attr_name, value)
+
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> list:
+        '''
+        Calls a method of the batched environment once for each requested game, passing the game index first
+        '''
+        method = getattr(self, method_name)
+        return [method(index, *method_args, **method_kwargs) for index in self._get_indices(indices)]
+
+
+    def action_masks(self, index: int = None) -> np.ndarray:
+        '''
+        Returns which actions are legal, (num_envs, num_actions) for every game or (num_actions,) for one game
+        (env_method('action_masks'), as used by sb3-contrib's MaskablePPO, calls it once per game)
+        '''
+        rows = np.arange(self.num_envs) if index is None else index
+        if self.action_mode == 'tile':
+            return self.hands[rows, 0] > 0
+        # The agent always holds 14 tiles when choosing a discard
+        return np.ones((self.num_envs, HAND_SIZE) if index is None else HAND_SIZE, dtype=bool)
+
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> list[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+
+    def render_game(self, index: int) -> None:
+        '''
+        Prints the agent's hand in one game
+        '''
+        print(f"\n--- player1's hand (game {index}) ---")
+        for tile_id in SORTED_TILE_IDS:
+            for _ in range(self.hands[index, 0, tile_id]):
+                TILE_TYPES[tile_id].display()
+
+
+    def _reset_games(self, rows: np.ndarray) -> None:
+        '''
+        Shuffles a new wall and deals the tiles for the games in rows
+        '''
+        walls = self.np_random.permuted(np.broadcast_to(WALL_TILE_IDS, (len(rows), NUM_TILES)), axis=1)
+        self.walls[rows] = walls
+
+        hands = np.zeros((len(rows), NUM_PLAYERS, NUM_TILE_TYPES), dtype=np.int8)
+        np.add.at(hands, (np.arange(len(rows))[:, None], DEAL_ORDER, walls[:, :NUM_DEALT]), 1)
+        self.hands[rows] = hands
+        self.heads[rows] = NUM_DEALT
+
+        self.discards[rows] = EMPTY_TILE
+        self.num_discards[rows] = 0
+        self.discard_counts[rows] = 0
+        self.macro_directions[rows] = 0
+        self.micro_directions[rows] = 0
+        self.turn_counts[rows] = 0
+
+
+    def _draw(self, rows: np.ndarray, player: int) -> None:
+        '''
+        Moves the tile at the front of the wall into player's hand for the games in rows
+        '''
+        tiles = self.walls[rows, self.heads[rows]]
+        self.hands[rows, player, tiles] += 1
+        self.heads[rows] += 1
+
+
+    def _discard(self, rows: np.ndarray, player: int, tiles: np.ndarray) -> None:
+        '''
+        Moves one tile of each id in tiles from player's hand to the discard pool for the games in rows
+        '''
+        self.hands[rows, player, tiles] -= 1
+        self.discards[rows, self.num_discards[rows]] = tiles
+        self.num_discards[rows] += 1
+        self.discard_counts[rows, tiles] += 1
+
+
+    @staticmethod
+    def _hand_tile_at(hands: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        '''
+        Returns the tile id at each position of the sorted hands
+        '''
+        cumulative_counts = np.cumsum(hands[:, SORTED_TILE_IDS], axis=1)
+        return SORTED_TILE_IDS[(cumulative_counts > positions[:, None]).argmax(axis=1)]
+
+
+    def _compute_rewards(self, discard_tiles: np.ndarray) -> np.ndarray:
+        '''
+        MahjongEnv._compute_reward for the agent discarding discard_tiles from its 14-tile hand in every game
+        '''
+        return discard_rewards(self.hands[:, 0], self.discard_counts, discard_tiles)
+
+
+    def _get_obs(self, rows: np.ndarray) -> np.ndarray:
+        '''
+        Encodes the games in rows like preprocessing.prepare_input: the agent's sorted hand, the discard pool,
+        zeros for the draw pool, and one-hot macro and micro directions (or count planes with encoding='planes')
+        '''
+        if self.encoding == 'planes':
+            return encode_planes_batch(self.hands[rows, 0], self.discard_counts[rows],
+                                       self.macro_directions[rows], self.micro_directions[rows])
+        return encode_observation_batch(self.discards[rows], self.macro_directions[rows], self.micro_directions[rows],
+                                        hand_counts=self.hands[rows, 0], num_tiles=OBS_TILES)